@@ -0,0 +1,143 @@
+# benchmarks/corpus.py
+# Deterministic synthetic typan sources for benchmarks.
+#
+#   python -m benchmarks.corpus nested 1MB > nested.tp
+from __future__ import annotations
+
+import random
+import sys
+from typing import Callable, Iterator
+
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_size(s: str) -> int:
+    """
+    "1KB" -> 1024, "50MB" -> 52428800, "300" -> 300
+    """
+    s = s.strip().upper()
+    for unit in ("GB", "MB", "KB", "B"):
+        if s.endswith(unit):
+            return int(float(s[: -len(unit)]) * _UNITS[unit])
+    return int(s)
+
+
+def format_size(n: int) -> str:
+    for unit in ("GB", "MB", "KB"):
+        if n >= _UNITS[unit] and n % _UNITS[unit] == 0:
+            return f"{n // _UNITS[unit]}{unit}"
+    return f"{n}B"
+
+
+# ------------------------------------------------------------
+# shapes: each yields complete top-level statements forever
+# ------------------------------------------------------------
+
+def _nested(rnd: random.Random) -> Iterator[str]:
+    n = 0
+    while True:
+        depth = rnd.randint(4, 15)
+        out = [f"def f_{n}(a, b) {{\n"]
+        for d in range(depth):
+            pad = "    " * (d + 1)
+            kw = rnd.choice(("if a > {d}", "while b < {d}", "for i in range({d})", "with ctx({d}) as c"))
+            out.append(f"{pad}{kw.format(d=d)} {{\n")
+            out.append(f"{pad}    b = b + {d}\n")
+        for d in reversed(range(depth)):
+            out.append("    " * (d + 1) + "}\n")
+        out.append("    return b\n}\n\n")
+        n += 1
+        yield "".join(out)
+
+
+def _long_lines(rnd: random.Random) -> Iterator[str]:
+    n = 0
+    while True:
+        terms = " + ".join(f"v{rnd.randint(0, 999)} * {rnd.randint(1, 99)}" for _ in range(rnd.randint(100, 300)))
+        call = ", ".join(f"k{i}=({rnd.randint(0, 9)}, [{rnd.randint(0, 9)}])" for i in range(rnd.randint(50, 150)))
+        yield f"x_{n} = {terms}\nif x_{n} {{\n    y_{n} = call({call})\n}}\n"
+        n += 1
+
+
+def _dicts(rnd: random.Random) -> Iterator[str]:
+    n = 0
+    while True:
+        out = [f"CONFIG_{n} = {{\n"]
+        for i in range(rnd.randint(50, 400)):
+            if rnd.random() < 0.2:
+                out.append(f'    "section_{i}": {{\n        "a": {i},\n        "b": [{i}, {{{i}}}],\n    }},\n')
+            else:
+                out.append(f'    "key_{i}": {rnd.randint(0, 10 ** 6)},\n')
+        out.append("}\n\n")
+        n += 1
+        yield "".join(out)
+
+
+def _strings(rnd: random.Random) -> Iterator[str]:
+    n = 0
+    while True:
+        yield (
+            f'def s_{n}(name) {{\n'
+            f'    a = "braces {{ inside }} a string {n}"\n'
+            f"    b = 'single {{quoted}} \\' escaped {n}'\n"
+            f'    c = f"{{name}} has {{len(name)}} chars {{{{literal}}}}"\n'
+            f'    d = r"raw \\d+ {{{n}}}"\n'
+            f'    e = """triple\n    {{ not a block }}\n    line {n}\n    """\n'
+            f'    return a + b + c + d + e  # comment with {{ braces }}\n'
+            f'}}\n\n'
+        )
+        n += 1
+
+
+def _inline(rnd: random.Random) -> Iterator[str]:
+    n = 0
+    while True:
+        yield (
+            f"if a_{n} {{ b_{n} = 1 }}\n"
+            f"for i in range({n % 7}) {{ total += i }}\n"
+            f"while q_{n} {{ }}\n"
+            f"def g_{n}(x) {{ return x * {n} }}\n"
+        )
+        n += 1
+
+
+def _dense(rnd: random.Random) -> Iterator[str]:
+    n = 0
+    while True:
+        yield (
+            f"d_{n} = {{1: {{2: {{3: {{{n}: set()}}}}}}}}; s_{n} = {{1, 2, {n}}}\n"
+            f"if d_{n} {{ e_{n} = {{k: {{v}} for k, v in d_{n}.items()}} }}\n"
+            f"m_{n} = [{{i: {{j}}}} for i in range(3) for j in ({{1}}, {{2}})]\n"
+        )
+        n += 1
+
+
+SHAPES: dict[str, Callable[[random.Random], Iterator[str]]] = {
+    "nested": _nested,
+    "long_lines": _long_lines,
+    "dicts": _dicts,
+    "strings": _strings,
+    "inline": _inline,
+    "dense": _dense,
+}
+
+
+def generate(shape: str, size: int, *, seed: int = 0) -> str:
+    """
+    Deterministic source of roughly `size` bytes (never cut mid-statement,
+    so the result always preprocesses and compiles).
+    """
+    rnd = random.Random(f"{shape}:{seed}")
+    parts = []
+    total = 0
+    for unit in SHAPES[shape](rnd):
+        parts.append(unit)
+        total += len(unit)
+        if total >= size:
+            break
+    return "".join(parts)
+
+
+if __name__ == "__main__":
+    shape, size = sys.argv[1], parse_size(sys.argv[2])
+    sys.stdout.write(generate(shape, size))
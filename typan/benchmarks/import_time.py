@@ -0,0 +1,79 @@
+# benchmarks/import_time.py
+# Start-up cost of the typan entry points, measured with `python -X importtime`.
+#
+#   python -m benchmarks.import_time            # table
+#   python -m benchmarks.import_time --budget-ms 30
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+ENTRY_POINTS = ("cli", "cli_convert", "cli_check", "cli_fmt")
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """
+    Parse `-X importtime` output into {module: (self_us, cumulative_us)}.
+    Lines look like: "import time:       903 |       4386 |   pathlib"
+    """
+    out: dict[str, tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+            cum_us = int(parts[1])
+        except ValueError:
+            continue  # header line
+        out[parts[2].strip()] = (self_us, cum_us)
+    return out
+
+
+def measure(module: str, *, runs: int = 5, python: str = sys.executable) -> tuple[int, set[str]]:
+    """
+    Best-of-`runs` cumulative import time of `module` in microseconds,
+    plus the set of modules it pulled in.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(SRC) + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    best = None
+    modules: set[str] = set()
+    for _ in range(runs):
+        proc = subprocess.run(
+            [python, "-X", "importtime", "-c", f"import {module}"],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        parsed = parse_importtime(proc.stderr)
+        cum = parsed[module][1]
+        best = cum if best is None else min(best, cum)
+        modules = set(parsed)
+    return best or 0, modules
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Import-time budget for typan entry points.")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--budget-ms", type=float, default=None, help="Exit 1 if any entry point exceeds this.")
+    args = p.parse_args(argv)
+
+    over = False
+    for module in ENTRY_POINTS:
+        us, modules = measure(module, runs=args.runs)
+        print(f"{module:12s} {us / 1000:8.2f} ms  ({len(modules)} modules)")
+        if args.budget_ms is not None and us / 1000 > args.budget_ms:
+            over = True
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+# benchmarks/memory.py
+# Peak / retained allocations per pipeline stage (tracemalloc) on the synthetic corpus.
+#
+#   python -m benchmarks.memory --sizes 64KB,256KB,1MB --json mem.json
+#   python -m benchmarks.memory --sizes 64KB,1MB --max-exponent 1.1   # exit 1 if peak grows super-linearly
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from lex import lex  # noqa: E402
+from lines import logical_lines  # noqa: E402
+from transform import transform  # noqa: E402
+from emit import emit  # noqa: E402
+from preprocess import preprocess_text  # noqa: E402
+
+from benchmarks.corpus import SHAPES, format_size, generate, parse_size  # noqa: E402
+
+STAGES = ("lex", "logical_lines", "transform", "emit", "compile", "preprocess_text")
+
+
+def _traced(fn: Callable[[], object]) -> tuple[int, int]:
+    """
+    (peak, retained) bytes allocated by fn(); retained = what is still alive
+    while its result is held (the token list, the events, the output string...).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak - base, current - base
+
+
+def measure_stages(src: str, *, stages: tuple[str, ...] = STAGES) -> dict:
+    """
+    Each isolated stage gets materialized input from the previous one (allocated
+    before tracing starts), so its numbers cover that stage alone.
+    """
+    tokens = list(lex(src))
+    lines = list(logical_lines(tokens))
+    events = list(transform(lines))
+    out = emit(events)
+
+    fns = {
+        "lex": lambda: list(lex(src)),
+        "logical_lines": lambda: list(logical_lines(tokens)),
+        "transform": lambda: list(transform(lines)),
+        "emit": lambda: emit(events),
+        "compile": lambda: compile(out, "<typan>", "exec", dont_inherit=True),
+        "preprocess_text": lambda: preprocess_text(src),
+    }
+    result = {}
+    for name in stages:
+        peak, retained = _traced(fns[name])
+        result[name] = {"peak": peak, "retained": retained}
+
+    return {"bytes": len(src.encode("utf-8")), "tokens": len(tokens), "stages": result}
+
+
+def run(shapes, sizes, *, stages: tuple[str, ...] = STAGES, log=None) -> dict:
+    results = {}
+    for shape in shapes:
+        for size in sizes:
+            key = f"{shape}/{format_size(size)}"
+            results[key] = measure_stages(generate(shape, size), stages=stages)
+            if log is not None:
+                log(key, results[key])
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "results": results,
+    }
+
+
+def scaling_exponent(points: list[tuple[int, int]]) -> float:
+    """
+    Least-squares slope of log(peak) over log(input bytes): ~1.0 is linear,
+    noticeably above 1.0 means memory grows faster than the input.
+    """
+    xs = [math.log(x) for x, _ in points]
+    ys = [math.log(max(y, 1)) for _, y in points]
+    mx = sum(xs) / len(xs)
+    my = sum(ys) / len(ys)
+    den = sum((x - mx) ** 2 for x in xs)
+    if not den:
+        return 0.0
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den
+
+
+def nonlinear(data: dict, *, max_exponent: float = 1.15) -> list[str]:
+    """
+    Shape/stage pairs whose peak memory scales worse than input_size ** max_exponent.
+    """
+    by_shape: dict[str, list[dict]] = {}
+    for key, res in data["results"].items():
+        by_shape.setdefault(key.split("/", 1)[0], []).append(res)
+
+    out = []
+    for shape, results in by_shape.items():
+        if len(results) < 2:
+            continue
+        for stage in results[0]["stages"]:
+            points = [(r["bytes"], r["stages"][stage]["peak"]) for r in results]
+            k = scaling_exponent(points)
+            if k > max_exponent:
+                out.append(f"{shape} {stage}: peak ~ size^{k:.2f}")
+    return out
+
+
+def _print_row(key: str, res: dict) -> None:
+    cols = []
+    for stage, s in res["stages"].items():
+        cols.append(f"{stage}={s['peak'] / 1e6:.2f}/{s['retained'] / 1e6:.2f}MB")
+    print(f"{key:20s} {res['bytes'] / 1e6:>8.2f}MB in  " + "  ".join(cols), flush=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="typan per-stage memory benchmarks (peak/retained).")
+    p.add_argument("--shapes", default="all", help=f"Comma list or 'all' ({', '.join(SHAPES)}).")
+    p.add_argument("--sizes", default="64KB,256KB,1MB", help="Comma list of sizes, 1KB .. 50MB.")
+    p.add_argument("--stages", default="all", help=f"Comma list or 'all' ({', '.join(STAGES)}).")
+    p.add_argument("--json", default=None, help="Write results to this JSON file.")
+    p.add_argument(
+        "--max-exponent",
+        type=float,
+        default=1.15,
+        help="Fail (exit 1) if peak memory grows faster than size**N (default: 1.15).",
+    )
+    args = p.parse_args(argv)
+
+    shapes = list(SHAPES) if args.shapes == "all" else args.shapes.split(",")
+    stages = STAGES if args.stages == "all" else tuple(args.stages.split(","))
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+
+    data = run(shapes, sizes, stages=stages, log=_print_row)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+    problems = nonlinear(data, max_exponent=args.max_exponent)
+    for line in problems:
+        print(f"NONLINEAR {line}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,221 @@
+# benchmarks/pathological.py
+# Complexity guard: adversarial inputs of growing size must cost linear time.
+#
+#   python -m benchmarks.pathological                        # run the known adversarial shapes
+#   python -m benchmarks.pathological --fuzz --seed 1 -n 500 # search for new slow shapes, print shrunk repros
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Callable, Iterable
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from preprocess import preprocess_text  # noqa: E402
+from formatter import format_text  # noqa: E402
+
+from benchmarks.memory import scaling_exponent  # noqa: E402
+
+# n -> source; n is a repetition count, sizes grow linearly with it
+SHAPES: dict[str, Callable[[int], str]] = {
+    "opens_one_line": lambda n: "x = " + "{" * n + "\n",
+    "closers_one_line": lambda n: "}" * n + "\n",
+    "closer_lines": lambda n: "if a {\n" + "}\n" * n,
+    "literal_nesting": lambda n: "x = " + "{" * n + "}" * n + "\n",
+    "block_opener_braces": lambda n: "if a " + "{" * n + "\n",
+    "deep_nesting": lambda n: "".join(f"if x{i} {{\n" for i in range(n)) + "pass\n" + "}\n" * n,
+    "giant_string": lambda n: "s = '" + "a{ }\\'" * n + "'\n",
+    "huge_comment": lambda n: "# " + "{ } ' \"" * n + "\n",
+    "inline_blocks": lambda n: "if a { b = {1: {2}} }\n" * n,
+}
+
+STAGES: dict[str, Callable[[str], str]] = {
+    "preprocess_text": preprocess_text,
+    "format_text": format_text,
+}
+
+
+def work_size(src: str) -> int:
+    """
+    Bytes in + bytes out. Output is part of the work: deep nesting legitimately
+    produces O(depth^2) indentation, which must not count as a blow-up.
+    """
+    try:
+        out = preprocess_text(src)
+    except SyntaxError:
+        out = ""
+    return len(src) + len(out)
+
+
+def time_call(fn: Callable[[str], object], src: str, *, repeat: int = 3) -> float:
+    """
+    Best-of-`repeat` seconds; SyntaxError counts as a normal result (only time matters).
+    GC is off while timing, as in timeit; compile() warnings on junk input are muted.
+    """
+    best = float("inf")
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                try:
+                    fn(src)
+                except SyntaxError:
+                    pass
+                best = min(best, time.perf_counter() - t0)
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+def exponent(fn: Callable[[str], object], make: Callable[[int], str], sizes: Iterable[int], *, repeat: int = 3) -> float:
+    """
+    k in time ~ work_size^k, fitted over `sizes`.
+    """
+    points = []
+    for n in sizes:
+        src = make(n)
+        points.append((work_size(src), max(time_call(fn, src, repeat=repeat), 1e-7)))
+    return scaling_exponent([(w, t * 1e9) for w, t in points])
+
+
+def guard(
+    shapes: Iterable[str] = SHAPES,
+    stages: Iterable[str] = STAGES,
+    *,
+    sizes: tuple[int, ...] = (1000, 4000, 16000),
+    max_exponent: float = 1.3,
+    repeat: int = 3,
+) -> list[str]:
+    """
+    Shape/stage pairs that grow faster than work_size ** max_exponent.
+    """
+    out = []
+    for shape in shapes:
+        for stage in stages:
+            k = exponent(STAGES[stage], SHAPES[shape], sizes, repeat=repeat)
+            if k > max_exponent:
+                out.append(f"{shape} {stage}: time ~ size^{k:.2f}")
+    return out
+
+
+# ------------------------------------------------------------
+# fuzzer: random repeated units, shrunk to minimal repros
+# ------------------------------------------------------------
+
+FRAGMENTS = (
+    "{", "}", "{", "}", "(", ")", "[", "]", "\n", " ", ";", ",", ":", "=",
+    "if a ", "else ", "def f() ", "async def g() ", "x", "1", "\\\n",
+    "'", '"', "'''", '"""', "f'", "#", "{1: 2}", "{}", "} else {", "lambda: ",
+)
+
+
+def random_unit(rnd: random.Random, *, max_fragments: int = 12) -> str:
+    return "".join(rnd.choice(FRAGMENTS) for _ in range(rnd.randint(1, max_fragments)))
+
+
+def unit_exponent(unit: str, fn: Callable[[str], object], *, small: int = 1000, large: int = 8000) -> float:
+    """
+    Scaling of fn on `unit` repeated to roughly `small` and `large` bytes.
+    The large input is the small one repeated a whole (even) number of times, so both
+    end the same way (e.g. an odd count of '"' units would flip valid <-> error).
+    """
+    k = max(1, small // len(unit))
+    return exponent(fn, lambda n: unit * n, (k, k * max(2, 2 * (large // small // 2))), repeat=2)
+
+
+def shrink(unit: str, is_slow: Callable[[str], bool]) -> str:
+    """
+    Delta-debugging style: drop chunks (halves, quarters, ... single chars)
+    as long as the remainder is still slow.
+    """
+    chunk = max(1, len(unit) // 2)
+    while True:
+        i = 0
+        while i < len(unit) and len(unit) > 1:
+            candidate = unit[:i] + unit[i + chunk:]
+            if candidate and is_slow(candidate):
+                unit = candidate
+            else:
+                i += chunk
+        if chunk == 1:
+            return unit
+        chunk = max(1, chunk // 2)
+
+
+def fuzz(
+    *,
+    seed: int = 0,
+    iterations: int = 100,
+    stages: Iterable[str] = STAGES,
+    max_exponent: float = 1.3,
+    log=None,
+) -> list[tuple[str, str, float]]:
+    """
+    (stage, shrunk unit, exponent) for every random unit whose repetition scales
+    super-linearly. A hit is re-measured on a larger input before it counts,
+    to filter out noise.
+    """
+    rnd = random.Random(seed)
+    found = []
+    for _ in range(iterations):
+        unit = random_unit(rnd)
+        for stage in stages:
+            fn = STAGES[stage]
+
+            def is_slow(u: str) -> bool:
+                return unit_exponent(u, fn) > max_exponent
+
+            if not is_slow(unit) or unit_exponent(unit, fn, large=16000) <= max_exponent:
+                continue
+            small = shrink(unit, is_slow)
+            k = unit_exponent(small, fn)
+            found.append((stage, small, k))
+            if log is not None:
+                log(stage, small, k)
+    return found
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="typan complexity guard and pathological-input fuzzer.")
+    p.add_argument("--shapes", default="all", help=f"Comma list or 'all' ({', '.join(SHAPES)}).")
+    p.add_argument("--stages", default="all", help=f"Comma list or 'all' ({', '.join(STAGES)}).")
+    p.add_argument("--sizes", default="1000,4000,16000", help="Repetition counts per shape.")
+    p.add_argument("--max-exponent", type=float, default=1.3, help="Allowed growth exponent (default: 1.3).")
+    p.add_argument("--fuzz", action="store_true", help="Search random inputs instead of the known shapes.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("-n", "--iterations", type=int, default=100)
+    args = p.parse_args(argv)
+
+    stages = list(STAGES) if args.stages == "all" else args.stages.split(",")
+
+    if args.fuzz:
+        found = fuzz(
+            seed=args.seed,
+            iterations=args.iterations,
+            stages=stages,
+            max_exponent=args.max_exponent,
+            log=lambda stage, unit, k: print(f"SLOW {stage}: ({unit!r}) * n ~ size^{k:.2f}", flush=True),
+        )
+        return 1 if found else 0
+
+    shapes = list(SHAPES) if args.shapes == "all" else args.shapes.split(",")
+    sizes = tuple(int(s) for s in args.sizes.split(","))
+    problems = guard(shapes, stages, sizes=sizes, max_exponent=args.max_exponent)
+    for line in problems:
+        print(f"SUPERLINEAR {line}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
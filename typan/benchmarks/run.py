@@ -0,0 +1,149 @@
+# benchmarks/run.py
+# Per-stage timings of the typan pipeline on the synthetic corpus.
+#
+#   python -m benchmarks.run --sizes 1KB,100KB,1MB --json base.json
+#   python -m benchmarks.run --sizes 1KB,100KB,1MB --compare base.json   # exit 1 on regression
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from lex import lex  # noqa: E402
+from lines import logical_lines  # noqa: E402
+from transform import transform  # noqa: E402
+from emit import emit  # noqa: E402
+from preprocess import preprocess_text  # noqa: E402
+from check_text import check_text  # noqa: E402
+from formatter import format_text  # noqa: E402
+
+from benchmarks.corpus import SHAPES, format_size, generate, parse_size  # noqa: E402
+
+STAGES = ("lex", "logical_lines", "transform", "emit", "preprocess_text", "check_text", "format_text")
+
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def time_stages(src: str, *, repeat: int = 3, stages: tuple[str, ...] = STAGES) -> dict:
+    """
+    Best-of-`repeat` seconds per stage. The isolated stages (lex .. emit) get
+    materialized input from the previous stage, so each number is that stage alone.
+    """
+    tokens = list(lex(src))
+    lines = list(logical_lines(tokens))
+    events = list(transform(lines))
+
+    fns = {
+        "lex": lambda: list(lex(src)),
+        "logical_lines": lambda: list(logical_lines(tokens)),
+        "transform": lambda: list(transform(lines)),
+        "emit": lambda: emit(events),
+        "preprocess_text": lambda: preprocess_text(src),
+        "check_text": lambda: check_text(src),
+        "format_text": lambda: format_text(src),
+    }
+    seconds = {name: _best(fns[name], repeat) for name in stages}
+
+    n_bytes = len(src.encode("utf-8"))
+    return {
+        "bytes": n_bytes,
+        "tokens": len(tokens),
+        "stages": {
+            name: {
+                "seconds": s,
+                "mb_per_s": (n_bytes / 1e6) / s if s else None,
+                "tokens_per_s": len(tokens) / s if s else None,
+            }
+            for name, s in seconds.items()
+        },
+    }
+
+
+def run(shapes, sizes, *, repeat: int = 3, stages: tuple[str, ...] = STAGES, log=None) -> dict:
+    results = {}
+    for shape in shapes:
+        for size in sizes:
+            key = f"{shape}/{format_size(size)}"
+            results[key] = time_stages(generate(shape, size), repeat=repeat, stages=stages)
+            if log is not None:
+                log(key, results[key])
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(base: dict, new: dict, *, threshold: float = 0.10) -> list[str]:
+    """
+    Regressions: cases/stages present in both runs where time grew by more than `threshold`.
+    """
+    out = []
+    for key, res in new["results"].items():
+        old = base.get("results", {}).get(key)
+        if old is None:
+            continue
+        for stage, s in res["stages"].items():
+            o = old["stages"].get(stage)
+            if o is None or not o["seconds"]:
+                continue
+            ratio = s["seconds"] / o["seconds"]
+            if ratio > 1 + threshold:
+                out.append(f"{key} {stage}: {o['seconds'] * 1000:.2f} ms -> {s['seconds'] * 1000:.2f} ms (x{ratio:.2f})")
+    return out
+
+
+def _print_row(key: str, res: dict) -> None:
+    cols = []
+    for stage, s in res["stages"].items():
+        cols.append(f"{stage}={s['seconds'] * 1000:.1f}ms/{s['mb_per_s'] or 0:.2f}MB/s")
+    print(f"{key:20s} {res['tokens']:>10d} tok  " + "  ".join(cols), flush=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="typan per-stage benchmarks.")
+    p.add_argument("--shapes", default="all", help=f"Comma list or 'all' ({', '.join(SHAPES)}).")
+    p.add_argument("--sizes", default="1KB,100KB,1MB", help="Comma list of sizes, 1KB .. 50MB.")
+    p.add_argument("--stages", default="all", help=f"Comma list or 'all' ({', '.join(STAGES)}).")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--json", default=None, help="Write results to this JSON file.")
+    p.add_argument("--compare", default=None, help="Baseline JSON; exit 1 if any stage regressed.")
+    p.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown vs baseline (default: 0.10).")
+    args = p.parse_args(argv)
+
+    shapes = list(SHAPES) if args.shapes == "all" else args.shapes.split(",")
+    stages = STAGES if args.stages == "all" else tuple(args.stages.split(","))
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+
+    data = run(shapes, sizes, repeat=args.repeat, stages=stages, log=_print_row)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(base, data, threshold=args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
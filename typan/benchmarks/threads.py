@@ -0,0 +1,129 @@
+# benchmarks/threads.py
+# Thread-pool scaling of batch preprocessing: wall time for the same set of files
+# with 1 .. N threads. On a free-threaded build (3.13t) the speedup should track
+# the thread count; with the GIL it stays around 1x.
+#
+#   python -m benchmarks.threads --threads 1,2,4,8 --files 200 --size 10KB
+#   python -m benchmarks.threads --stage format_text --json threads.json
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from batch import free_threaded  # noqa: E402
+from check_text import check_text  # noqa: E402
+from formatter import format_text  # noqa: E402
+from preprocess import preprocess_text  # noqa: E402
+
+from benchmarks.corpus import SHAPES, generate, parse_size  # noqa: E402
+
+STAGES: dict[str, Callable[[str], object]] = {
+    "preprocess_text": preprocess_text,
+    "check_text": check_text,
+    "format_text": format_text,
+}
+
+
+def make_files(n: int, size: int) -> list[str]:
+    # distinct sources, every shape represented
+    shapes = sorted(SHAPES)
+    return [generate(shapes[i % len(shapes)], size, seed=i) for i in range(n)]
+
+
+def time_threads(fn: Callable[[str], object], files: list[str], threads: int, *, repeat: int = 3) -> float:
+    """
+    Best-of-`repeat` wall seconds to run fn over every file on `threads` threads
+    (pool startup excluded: the pool is warm before the clock starts).
+    """
+    best = float("inf")
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(lambda _: None, range(threads)))
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _result in ex.map(fn, files):
+                pass
+            best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(threads: list[int], *, files: int = 200, size: int = 10 * 1024, stage: str = "preprocess_text",
+        repeat: int = 3, log=None) -> dict:
+    sources = make_files(files, size)
+    n_bytes = sum(len(s.encode("utf-8")) for s in sources)
+    fn = STAGES[stage]
+    fn(sources[0])  # warm up imports and caches outside the timings
+
+    results = {}
+    base = None
+    for n in threads:
+        seconds = time_threads(fn, sources, n, repeat=repeat)
+        if base is None:
+            base = seconds * threads[0]  # the first count's time, scaled to one thread
+        results[str(n)] = {
+            "seconds": seconds,
+            "mb_per_s": (n_bytes / 1e6) / seconds if seconds else None,
+            "speedup": base / seconds if seconds else None,
+            "efficiency": base / seconds / n if seconds else None,
+        }
+        if log is not None:
+            log(n, results[str(n)])
+    return {
+        "python": platform.python_version(),
+        "free_threaded": free_threaded(),
+        "cpus": os.cpu_count(),
+        "stage": stage,
+        "files": files,
+        "bytes": n_bytes,
+        "results": results,
+    }
+
+
+def _print_row(n: int, res: dict) -> None:
+    print(
+        f"{n:>4d} threads  {res['seconds'] * 1000:>9.1f} ms  {res['mb_per_s'] or 0:>7.2f} MB/s"
+        f"  x{res['speedup']:.2f}  ({res['efficiency'] * 100:.0f}%)",
+        flush=True,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="typan thread-pool scaling (1 .. N threads).")
+    p.add_argument("--threads", default=None, help="Comma list of thread counts (default: 1,2,4,.. up to CPU count).")
+    p.add_argument("--files", type=int, default=200)
+    p.add_argument("--size", default="10KB", help="Size of each file.")
+    p.add_argument("--stage", default="preprocess_text", choices=tuple(STAGES))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--json", default=None, help="Write results to this JSON file.")
+    args = p.parse_args(argv)
+
+    if args.threads:
+        threads = [int(t) for t in args.threads.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        threads = [1]
+        while threads[-1] * 2 <= cpus:
+            threads.append(threads[-1] * 2)
+
+    gil = "free-threaded" if free_threaded() else "GIL enabled"
+    print(f"Python {platform.python_version()} ({gil}), {os.cpu_count()} CPUs, {args.stage}", flush=True)
+    data = run(threads, files=args.files, size=parse_size(args.size), stage=args.stage,
+               repeat=args.repeat, log=_print_row)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
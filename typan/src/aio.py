@@ -0,0 +1,178 @@
+# aio.py
+# asyncio front end: the pipeline runs in a worker pool, the event loop stays free.
+#
+#   out = await preprocess_text_async(src)
+#   ok, diags, transformed = await check_text_async(src, limits=Limits(timeout=1.0))
+#
+#   async with AsyncRunner(processes=False, max_concurrency=4) as runner:
+#       out = await runner.format_text(src)
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+from batch import free_threaded
+from check_text import CheckResult, check_text
+from formatter import format_text
+from preprocess import preprocess_text
+
+
+class _Inflight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncRunner:
+    """
+    Runs preprocess/check/format in an executor (a process pool by default -
+    threads on a free-threaded build -, threads with processes=False, or the
+    given `executor`):
+
+      - at most `max_concurrency` jobs are handed to the executor at a time,
+        the rest wait on a semaphore;
+      - concurrent calls with the same source and options share one computation
+        (and get the same result object); `coalesced` counts the shared calls;
+      - a cancelled call stops waiting at once. The computation is cancelled when
+        its last caller is gone - before it starts; a job already running in a
+        worker finishes and its result is dropped.
+
+    With a process pool, CheckResult.code is None (code objects don't pickle).
+    """
+
+    def __init__(
+        self,
+        *,
+        executor: Optional[Executor] = None,
+        processes: Optional[bool] = None,
+        max_workers: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self._executor = executor
+        self._own_executor = executor is None
+        self.processes = not free_threaded() if processes is None else processes
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers or os.cpu_count() or 1
+        self.coalesced = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: dict = {}
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.processes:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="typan")
+        return self._executor
+
+    def close(self, *, wait: bool = True) -> None:
+        """
+        Shut down the executor if this runner created it.
+        """
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def __aenter__(self) -> "AsyncRunner":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    async def preprocess_text(self, text: str, **options) -> str:
+        return await self._run("preprocess", preprocess_text, text, options)
+
+    async def check_text(self, text: str, **options) -> CheckResult:
+        return await self._run("check", check_text, text, options)
+
+    async def format_text(self, src: str, **options) -> str:
+        return await self._run("format", format_text, src, options)
+
+    def _bind(self) -> None:
+        # the semaphore and the in-flight table belong to one event loop
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+
+    async def _run(self, op: str, fn: Callable, text: str, options: dict):
+        self._bind()
+        key = (op, text, tuple(sorted(options.items())))
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._execute(functools.partial(fn, text, **options)))
+            entry = self._inflight[key] = _Inflight(task)
+            task.add_done_callback(functools.partial(self._forget, key, entry))
+        else:
+            self.coalesced += 1
+
+        entry.waiters += 1
+        try:
+            # shield: one caller's cancellation must not cancel the others' result
+            return await asyncio.shield(entry.task)
+        finally:
+            entry.waiters -= 1
+            if not entry.waiters and not entry.task.done():
+                entry.task.cancel()
+                self._forget(key, entry, None)  # a new caller must not join a cancelled task
+
+    def _forget(self, key, entry: _Inflight, _task) -> None:
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    async def _execute(self, call: Callable):
+        async with self._semaphore:
+            return await self._loop.run_in_executor(self.executor, call)
+
+
+_default: Optional[AsyncRunner] = None
+
+
+def default_runner() -> AsyncRunner:
+    """
+    The process-pool runner behind the *_async functions (created on first use).
+    """
+    global _default
+    if _default is None:
+        _default = AsyncRunner()
+    return _default
+
+
+def shutdown() -> None:
+    global _default
+    if _default is not None:
+        _default.close()
+        _default = None
+
+
+async def preprocess_text_async(text: str, **options) -> str:
+    """
+    preprocess_text (same keyword options) without blocking the event loop.
+    """
+    return await default_runner().preprocess_text(text, **options)
+
+
+async def check_text_async(text: str, **options) -> CheckResult:
+    """
+    check_text (same keyword options, except `pipeline`) without blocking the event loop.
+    """
+    return await default_runner().check_text(text, **options)
+
+
+async def format_text_async(src: str, **options) -> str:
+    """
+    format_text (same keyword options) without blocking the event loop.
+    """
+    return await default_runner().format_text(src, **options)
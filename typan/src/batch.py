@@ -0,0 +1,223 @@
+# batch.py
+# Multi-file mode shared by typan / typan-check / typan-fmt:
+# file selection (--changed-since, --staged, --files-from) and a worker pool.
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+
+SOURCE_SUFFIXES = (".tp.py", ".tp")
+
+
+class BatchError(Exception):
+    """Bad batch selection (git failure, unreadable --files-from). CLI exit code 2."""
+
+
+def is_source(name: str) -> bool:
+    return name.endswith(SOURCE_SUFFIXES)
+
+
+def output_name(name: str) -> str:
+    """
+    a.tp.py -> a.py, a.tp -> a.py
+    """
+    for suffix in SOURCE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)] + ".py"
+    return name
+
+
+def add_batch_arguments(p) -> None:
+    g = p.add_argument_group("multi-file mode")
+    g.add_argument(
+        "--changed-since",
+        metavar="REF",
+        default=None,
+        help="Process only .tp files changed since git REF (committed, staged or unstaged).",
+    )
+    g.add_argument(
+        "--staged",
+        action="store_true",
+        help="Process only .tp files staged in git (their working-tree copy, not the staged blob).",
+    )
+    g.add_argument(
+        "--files-from",
+        metavar="FILE",
+        default=None,
+        help="Read NUL-separated (or newline-separated) paths from FILE ('-' for stdin).",
+    )
+    g.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes for multi-file mode (default: CPU count).",
+    )
+    g.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print a throughput report (files, bytes, tokens, wall/CPU time, slowest files) at the end.",
+    )
+    g.add_argument("--stats-json", metavar="FILE", default=None, help="Also write the --stats report as JSON.")
+    g.add_argument("--stats-top", metavar="N", type=int, default=10, help="Slowest files to list (default: 10).")
+
+
+def is_batch(args) -> bool:
+    return bool(args.changed_since or args.staged or args.files_from)
+
+
+def _git(args: list[str], cwd: str | None = None) -> bytes:
+    try:
+        proc = subprocess.run(["git", *args], cwd=cwd, capture_output=True, check=False)
+    except OSError as e:
+        raise BatchError(f"failed to run git: {e}") from None
+    if proc.returncode != 0:
+        msg = proc.stderr.decode("utf-8", "replace").strip()
+        raise BatchError(f"git {' '.join(args)} failed: {msg}")
+    return proc.stdout
+
+
+def git_changed_files(*, since: str | None = None, staged: bool = False, cwd: str | None = None) -> list[Path]:
+    """
+    .tp sources reported by `git diff --name-only -z` (added/copied/modified/renamed only;
+    deleted files have nothing to process). Paths are absolute.
+    staged=True only selects the files: they are read from the working tree like any
+    other path, since fmt --in-place / convert write there. A pre-commit hook that
+    must see exactly the staged content stashes unstaged changes first.
+    """
+    top = Path(_git(["rev-parse", "--show-toplevel"], cwd=cwd).decode("utf-8").strip())
+    cmd = ["diff", "--name-only", "-z", "--diff-filter=ACMR"]
+    if staged:
+        cmd.append("--cached")
+    if since:
+        cmd.append(since)
+    cmd.append("--")
+
+    out = _git(cmd, cwd=cwd)
+    names = [n for n in out.decode("utf-8", "surrogateescape").split("\0") if n]
+    return [top / n for n in names if is_source(n)]
+
+
+def read_paths(data: str) -> list[Path]:
+    """
+    NUL-separated list (as from `git ls-files -z` / `find -print0`); plain newline lists work too.
+    """
+    sep = "\0" if "\0" in data else "\n"
+    return [Path(p) for p in data.split(sep) if p.strip()]
+
+
+def collect_paths(args) -> list[Path]:
+    paths: list[Path] = []
+    if args.changed_since or args.staged:
+        paths.extend(git_changed_files(since=args.changed_since, staged=args.staged))
+    if args.files_from:
+        try:
+            if args.files_from == "-":
+                data = sys.stdin.read()
+            else:
+                data = Path(args.files_from).read_text(encoding="utf-8", errors="surrogateescape")
+        except OSError as e:
+            raise BatchError(f"failed to read --files-from: {e}") from None
+        paths.extend(read_paths(data))
+
+    # stable order, no duplicates
+    seen = set()
+    out = []
+    for p in paths:
+        key = os.path.abspath(p)
+        if key not in seen:
+            seen.add(key)
+            out.append(p)
+    return out
+
+
+def run_pool(
+    fn: Callable,
+    paths: Iterable[Path],
+    *,
+    jobs: int | None = None,
+    on_file: Callable[[str, dict], None] | None = None,
+    **kwargs,
+) -> Iterator[tuple]:
+    """
+    Yield fn(str(path), **kwargs) for every path, in input order.
+    Runs in a pool when there is more than one file and more than one job: processes,
+    with work shipped in chunks to keep IPC overhead low, or threads on a
+    free-threaded build (see make_executor).
+    Each file is profiled (instrument.py) when a profile is active (--profile,
+    worker profiles are merged into it) or when on_file(path, profile_dict) is given (--stats).
+    """
+    items = [str(p) for p in paths]
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(items)))
+
+    prof = _current_profile()
+    if prof is None and on_file is None:
+        if jobs == 1:
+            for item in items:
+                yield fn(item, **kwargs)
+            return
+        with make_executor(jobs) as ex:
+            yield from ex.map(partial(fn, **kwargs), items, chunksize=_chunksize(items, jobs))
+        return
+
+    from instrument import run_profiled
+
+    if jobs == 1:
+        results = (run_profiled(fn, item, **kwargs) for item in items)
+        yield from _collect(items, results, prof, on_file)
+        return
+    with make_executor(jobs) as ex:
+        results = ex.map(partial(run_profiled, fn, **kwargs), items, chunksize=_chunksize(items, jobs))
+        yield from _collect(items, results, prof, on_file)
+
+
+def _collect(items, results, prof, on_file) -> Iterator[tuple]:
+    for item, (result, file_prof) in zip(items, results):
+        if prof is not None:
+            prof.merge(file_prof)
+        if on_file is not None:
+            on_file(item, file_prof)
+        yield result
+
+
+def free_threaded() -> bool:
+    """
+    True on a free-threaded build (3.13t+) running with the GIL disabled.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def make_executor(jobs: int, *, threads: bool | None = None):
+    """
+    Worker pool for `jobs` workers. threads=None picks threads on a free-threaded
+    build - the pipeline keeps no mutable module state (lex/transform/emit/formatter
+    only read frozen tables, per-call state lives in locals and PipelineResult),
+    so threads run it in parallel without pickling every source and result.
+    With the GIL, processes.
+    """
+    if threads is None:
+        threads = free_threaded()
+    if threads:
+        from concurrent.futures import ThreadPoolExecutor
+
+        return ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="typan")
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=jobs)
+
+
+def _chunksize(items: list, jobs: int) -> int:
+    return max(1, len(items) // (jobs * 4))
+
+
+def _current_profile():
+    # instrument is loaded by the pipeline anyway; don't pull it in just to ask
+    mod = sys.modules.get("instrument")
+    return mod.current() if mod is not None else None
@@ -0,0 +1,38 @@
+# cache.py
+# Result cache shared by the daemon and preprocessor.Preprocessor.
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Small thread-safe LRU: key -> result (daemon: response dict, Preprocessor: output).
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            resp = self._data.get(key)
+            if resp is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return resp
+
+    def put(self, key, resp) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = resp
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
@@ -2,18 +2,65 @@
 from __future__ import annotations
 
 import ast
-from dataclasses import dataclass
 from typing import Optional
 
-from preprocess import preprocess_text
+from errors import PreprocessError, format_error
+from instrument import stage
+from pipeline import PipelineResult
+from preprocess import collect_errors
+from sourcemap import SourceMap
+from limits import Budget, Limits
 
 
-@dataclass
 class Diagnostic:
-    stage: str            # "preprocess" | "python"
-    message: str
-    lineno: Optional[int] = None
-    col: Optional[int] = None
+    """
+    stage: "preprocess" | "python"; lineno/col are 1-based.
+    A preprocess diagnostic keeps the raw message and the source; `message`
+    (source line + caret, see errors.format_error) is rendered on first access.
+    """
+
+    __slots__ = ("stage", "lineno", "col", "raw_message", "_source", "_message")
+
+    def __init__(
+        self,
+        stage: str,
+        message: Optional[str] = None,
+        lineno: Optional[int] = None,
+        col: Optional[int] = None,
+        *,
+        raw_message: Optional[str] = None,
+        source: Optional[str] = None,
+    ):
+        self.stage = stage
+        self.lineno = lineno
+        self.col = col
+        self.raw_message = raw_message if raw_message is not None else message
+        self._source = source
+        self._message = message
+
+    @classmethod
+    def from_error(cls, e: PreprocessError) -> "Diagnostic":
+        return cls("preprocess", lineno=e.lineno, col=e.offset, raw_message=e.msg, source=e.source)
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            if self._source is not None and self.lineno is not None:
+                self._message = format_error(self._source, self.lineno, self.col or 1, self.raw_message)
+            else:
+                self._message = self.raw_message or ""
+        return self._message
+
+    def to_dict(self) -> dict:
+        return {"stage": self.stage, "message": self.message, "lineno": self.lineno, "col": self.col}
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Diagnostic):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Diagnostic(stage={self.stage!r}, message={self.message!r}, lineno={self.lineno!r}, col={self.col!r})"
 
 
 def _diag_from_syntax_error(stage: str, e: SyntaxError) -> Diagnostic:
@@ -24,25 +71,123 @@ def _diag_from_syntax_error(stage: str, e: SyntaxError) -> Diagnostic:
     return Diagnostic(stage=stage, message=str(msg), lineno=lineno, col=offset)
 
 
-def check_text(text: str, *, indent: str = "    ") -> tuple[bool, list[Diagnostic], str | None]:
+LEVELS = ("structure", "parse", "compile")
+
+
+class CheckResult(tuple):
+    """
+    (ok, diagnostics, transformed) - unpacks like the old 3-tuple.
+    `.code` holds the code object when level="compile" succeeded, so callers
+    can exec() it instead of compiling the same source again. Its positions
+    are output positions (PipelineResult.compile(remap=False)); use
+    compiler.compile / PipelineResult.compile for .tp positions.
+    """
+
+    def __new__(cls, ok: bool, diagnostics: list[Diagnostic], transformed: str | None, code=None):
+        self = super().__new__(cls, (ok, diagnostics, transformed))
+        self.code = code
+        return self
+
+    def __reduce__(self):
+        # for process pools (aio, batch); code objects don't pickle, .code is None on arrival
+        return (CheckResult, (self[0], self[1], self[2]))
+
+    @property
+    def ok(self) -> bool:
+        return self[0]
+
+    @property
+    def diagnostics(self) -> list[Diagnostic]:
+        return self[1]
+
+    @property
+    def transformed(self) -> str | None:
+        return self[2]
+
+
+def check_text(
+    text: str,
+    *,
+    indent: str = "    ",
+    level: str = "compile",
+    pipeline: PipelineResult | None = None,
+    limits: Limits | None = None,
+) -> CheckResult:
     """
     Zwraca:
       - ok: bool
-      - diagnostics: lista Diagnostic
+      - diagnostics: lista Diagnostic - wszystkie błędy preprocesora z jednego
+        przebiegu (z odzyskiwaniem po błędzie) + pierwszy błąd Pythona
       - transformed: wynik preprocessora jeśli etap 1 przeszedł, inaczej None
+
+    level:
+      - "structure": tylko klamry / bloki (transform, bez emit); transformed = None
+      - "parse":     + ast.parse wyniku (bez generowania bytecode)
+      - "compile":   + pełny compile(); kod jest w result.code
+    Uwaga: część błędów (np. 'return' poza funkcją) wykrywa dopiero "compile".
+    Błędy Pythona mają pozycje w źródle .tp (przez PipelineResult.source_map),
+    nie w wygenerowanym kodzie.
+
+    pipeline: gotowy PipelineResult dla tego źródła (np. z format_text),
+    żeby nie lexować tego samego tekstu drugi raz.
+
+    limits: limity zasobów (limits.Limits) - przekroczenie rzuca
+    errors.LimitExceeded zamiast zwracać diagnostykę.
     """
+    if level not in LEVELS:
+        raise ValueError(f"unknown check level: {level!r} (expected one of {', '.join(LEVELS)})")
+
+    if pipeline is None:
+        pipeline = PipelineResult(text, indent=indent, limits=limits)
+
     # 1) Preprocessor
     try:
-        transformed = preprocess_text(text, indent=indent)
-    except SyntaxError as e:
-        # preprocess_text już formatuje błąd (format_error) jeśli ma line/col,
-        # więc message będzie “ładne”.
-        return False, [Diagnostic(stage="preprocess", message=str(e))], None
+        if level == "structure":
+            pipeline.events
+            return CheckResult(True, [], None)
+        transformed = pipeline.output
+    except SyntaxError:
+        return CheckResult(False, _recovered_diagnostics(text, indent, level, pipeline.budget), None)
 
-    # 2) Python (AST parse)
+    # 2) Python
     try:
-        compile(transformed, filename="<typan>", mode="exec")
+        if level == "parse":
+            if pipeline.budget is not None:
+                pipeline.budget.check_time()
+            with stage("parse"):
+                try:
+                    compile(transformed, filename="<typan>", mode="exec", flags=ast.PyCF_ONLY_AST, dont_inherit=True)
+                except SyntaxError as e:
+                    raise pipeline.source_map.remap_error(e)
+            return CheckResult(True, [], transformed)
+        code = pipeline.compile("<typan>", remap=False)
     except SyntaxError as e:
-        return False, [_diag_from_syntax_error("python", e)], transformed
+        return CheckResult(False, [_diag_from_syntax_error("python", e)], transformed)
+
+    return CheckResult(True, [], transformed, code)
+
+
+def _recovered_diagnostics(text: str, indent: str, level: str, budget: Budget | None = None) -> list[Diagnostic]:
+    """
+    Second, error-recovering pass over a source that failed to preprocess:
+    every preprocess error, plus the first Python error of the recovered output
+    (skipped after a lexer error - past an unterminated string the tokens are guesswork).
+    """
+    positions: list = []
+    errors, recovered = collect_errors(text, indent=indent, positions=positions, budget=budget)
+    diags = [Diagnostic.from_error(e) for e in errors]
+    if level == "structure" or any("Unterminated" in e.msg for e in errors):
+        return diags
 
-    return True, [], transformed
+    if budget is not None:
+        budget.check_time()
+    flags = ast.PyCF_ONLY_AST if level == "parse" else 0
+    try:
+        compile(recovered, filename="<typan>", mode="exec", flags=flags, dont_inherit=True)
+    except SyntaxError as e:
+        SourceMap(positions, text, recovered).remap_error(e)
+        diags.append(_diag_from_syntax_error("python", e))
+    except (MemoryError, RecursionError):
+        # the recovered output can be absurd (thousands of unclosed '{'); it's best-effort
+        pass
+    return diags
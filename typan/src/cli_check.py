@@ -4,7 +4,10 @@ import argparse
 import sys
 from pathlib import Path
 
-from check_text import check_text
+from instrument import add_profile_argument
+from batch import BatchError, add_batch_arguments, collect_paths, is_batch, run_pool
+# forwards to a running typan daemon, falls back to in-process
+from client import check_text
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -15,7 +18,9 @@ def build_parser() -> argparse.ArgumentParser:
 
     p.add_argument(
         "input",
-        help="Input file path (brace syntax). Use '-' to read from stdin.",
+        nargs="?",
+        default=None,
+        help="Input file path (brace syntax). Use '-' to read from stdin. Omit in multi-file mode.",
     )
 
     p.add_argument(
@@ -30,17 +35,77 @@ def build_parser() -> argparse.ArgumentParser:
         help="When the error is from Python stage, print the transformed code to stderr.",
     )
 
+    p.add_argument(
+        "--level",
+        choices=("structure", "parse", "compile"),
+        default="compile",
+        help=(
+            "How far to validate: 'structure' (braces/blocks only), 'parse' (+ Python parse), "
+            "'compile' (+ full compile, default)."
+        ),
+    )
+
+    add_batch_arguments(p)
+    add_profile_argument(p)
+
     return p
 
 
 def _parse_indent_width(s: str) -> int:
     try:
         w = int(s)
-        if w < 0:
+        if w < 1:
             raise ValueError
         return w
     except ValueError:
-        raise argparse.ArgumentTypeError("--indent must be a non-negative integer")
+        raise argparse.ArgumentTypeError("--indent must be a positive integer")
+
+
+def _check_one(path: str, *, indent: str, level: str = "compile"):
+    """
+    Worker for multi-file mode (runs in a pool process). Returns (exit_code, stderr_message).
+    """
+    p = Path(path)
+    try:
+        src = p.read_text(encoding="utf-8")
+    except OSError as e:
+        return 2, f"typan-check: failed to read file: {p}: {e}"
+
+    ok, diags, _transformed = check_text(src, indent=indent, level=level)
+    if ok:
+        return 0, ""
+    return 1, "\n".join(f"{p}: {_diagnostic_text(d)}" for d in diags)
+
+
+def _diagnostic_text(d) -> str:
+    if d.stage == "preprocess":
+        # preprocess message is already rendered with the source line (format_error)
+        return d.message
+    loc = ""
+    if d.lineno is not None and d.col is not None:
+        loc = f"(line {d.lineno}, col {d.col}) "
+    return f"Python syntax error {loc}{d.message}"
+
+
+def _main_batch(args, indent: str) -> int:
+    try:
+        paths = collect_paths(args)
+    except BatchError as e:
+        print(f"typan-check: {e}", file=sys.stderr)
+        return 2
+
+    from stats import new_stats, report
+
+    stats = new_stats(args)
+    on_file = stats.add if stats is not None else None
+
+    rc = 0
+    for code, msg in run_pool(_check_one, paths, jobs=args.jobs, on_file=on_file, indent=indent, level=args.level):
+        if msg:
+            print(msg, file=sys.stderr)
+        rc = max(rc, code)
+
+    return max(rc, report(stats, args, sys.stderr))
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -50,6 +115,18 @@ def main(argv: list[str] | None = None) -> int:
     except SystemExit as e:
         # argparse używa kodu 2 dla złych flag; trzymajmy to jako "usage error"
         return 2 if e.code != 0 else 0
+    if args.profile is None:
+        return _main(args)
+
+    from instrument import print_profile, profile
+
+    with profile() as prof:
+        rc = _main(args)
+    print_profile(prof, args.profile, sys.stderr)
+    return rc
+
+
+def _main(args) -> int:
 
     # indent parsing -> usage error => 2
     try:
@@ -60,6 +137,12 @@ def main(argv: list[str] | None = None) -> int:
 
     indent = " " * indent_width
 
+    if is_batch(args):
+        return _main_batch(args, indent)
+    if args.input is None:
+        print("typan-check: missing input (or use --changed-since / --staged / --files-from)", file=sys.stderr)
+        return 2
+
     # read input -> IO error => 2
     if args.input == "-":
         try:
@@ -83,25 +166,14 @@ def main(argv: list[str] | None = None) -> int:
             return 2
         display_name = str(path)
 
-    ok, diags, transformed = check_text(src, indent=indent)
+    ok, diags, transformed = check_text(src, indent=indent, level=args.level)
 
     if ok:
         return 0
 
-    # syntax error => 1
-    d = diags[0]
-
-    if d.stage == "preprocess":
-        # preprocess_text zwykle już ma ładnie sformatowany komunikat (format_error)
-        print(d.message, file=sys.stderr)
-        return 1
-
-    # python stage
-    loc = ""
-    if d.lineno is not None and d.col is not None:
-        loc = f"(line {d.lineno}, col {d.col}) "
-
-    print(f"Python syntax error {loc}{d.message}", file=sys.stderr)
+    # syntax error => 1; all preprocess errors (one recovering pass) + first Python error
+    for d in diags:
+        print(_diagnostic_text(d), file=sys.stderr)
 
     if args.show_transformed and transformed is not None:
         print("\n--- transformed ---", file=sys.stderr)
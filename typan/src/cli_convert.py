@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from instrument import add_profile_argument
+from batch import BatchError, add_batch_arguments, collect_paths, is_batch, output_name, run_pool
+# forwards to a running typan daemon, falls back to in-process
+from client import check_text, preprocess_text
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="typan",
+        description="typan: preprocess brace-block Python into real Python (adds ':' + indentation).",
+    )
+
+    p.add_argument(
+        "input",
+        nargs="?",
+        default=None,
+        help="Input file path (brace syntax). Use '-' to read from stdin. Omit in multi-file mode.",
+    )
+
+    p.add_argument(
+        "-o",
+        "--output",
+        help=(
+            "Output file path. If omitted and --in-place not set, prints to stdout. "
+            "In multi-file mode: output directory (default: next to each source, a.tp -> a.py)."
+        ),
+        default=None,
+    )
+
+    p.add_argument(
+        "--in-place",
+        action="store_true",
+        help="Overwrite input file with processed output.",
+    )
+
+    p.add_argument(
+        "--check",
+        action="store_true",
+        help="Do not write. Exit code 0 if no changes needed, 1 if file would change.",
+    )
+
+    p.add_argument(
+        "--indent",
+        default="4",
+        help="Indent width in spaces (default: 4).",
+    )
+
+    p.add_argument(
+        "--validate",
+        action="store_true",
+        help="Run typan-check validation (preprocess + Python compile) before writing output.",
+    )
+
+    p.add_argument(
+        "--show-transformed",
+        action="store_true",
+        help="When validation fails at Python stage, print transformed code to stderr.",
+    )
+
+    layout = p.add_mutually_exclusive_group()
+    layout.add_argument(
+        "--preserve-lines",
+        action="store_true",
+        help="Keep every output line on its source line number (closing braces become blank lines).",
+    )
+    layout.add_argument(
+        "--minify",
+        action="store_true",
+        help="Smallest valid output: no comments or blank lines, 1-space indent, joined statements.",
+    )
+
+    add_batch_arguments(p)
+    add_profile_argument(p)
+
+    return p
+
+
+def _diagnostic_text(d) -> str:
+    if d.stage == "preprocess":
+        return d.message
+
+    loc = ""
+    if d.lineno is not None and d.col is not None:
+        loc = f"(line {d.lineno}, col {d.col}) "
+    return f"Python syntax error {loc}{d.message}"
+
+
+def _print_validation_failure(diags, show_transformed: bool, transformed: str | None) -> int:
+    for d in diags:
+        print(_diagnostic_text(d), file=sys.stderr)
+
+    if show_transformed and transformed is not None:
+        print("\n--- transformed ---", file=sys.stderr)
+        print(transformed, file=sys.stderr)
+
+    return 1
+
+
+def _convert_one(
+    path: str,
+    *,
+    indent: str,
+    check: bool,
+    in_place: bool,
+    out_dir: str | None,
+    validate: bool,
+    preserve_lines: bool = False,
+    minify: bool = False,
+):
+    """
+    Worker for multi-file mode (runs in a pool process). Returns (exit_code, stderr_message).
+    """
+    p = Path(path)
+    try:
+        src = p.read_text(encoding="utf-8")
+    except OSError as e:
+        return 2, f"typan: failed to read file: {p}: {e}"
+
+    try:
+        if validate:
+            ok, diags, out = check_text(src, indent=indent)
+            if not ok:
+                return 1, "\n".join(f"{p}: {_diagnostic_text(d)}" for d in diags)
+        if preserve_lines or minify or not validate:
+            out = preprocess_text(src, indent=indent, preserve_lines=preserve_lines, minify=minify)
+    except SyntaxError as e:
+        return 1, f"{p}: {e}"
+
+    if check:
+        return (1, f"typan: {p}: would change") if out != src else (0, "")
+
+    if in_place:
+        target = p
+    elif out_dir:
+        # keep the layout relative to cwd; files outside cwd go flat into out_dir
+        rel = Path(os.path.relpath(p))
+        if rel.parts[:1] == ("..",):
+            rel = Path(p.name)
+        target = Path(out_dir) / rel.parent / output_name(rel.name)
+    else:
+        target = p.with_name(output_name(p.name))
+
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(out, encoding="utf-8", newline="\n")
+    except OSError as e:
+        return 2, f"typan: failed to write output file: {target}: {e}"
+    return 0, ""
+
+
+def _main_batch(args, indent: str) -> int:
+    try:
+        paths = collect_paths(args)
+    except BatchError as e:
+        print(f"typan: {e}", file=sys.stderr)
+        return 2
+
+    from stats import new_stats, report
+
+    stats = new_stats(args)
+    on_file = stats.add if stats is not None else None
+
+    rc = 0
+    results = run_pool(
+        _convert_one, paths, jobs=args.jobs, on_file=on_file,
+        indent=indent, check=args.check, in_place=args.in_place,
+        out_dir=args.output, validate=args.validate,
+        preserve_lines=args.preserve_lines, minify=args.minify,
+    )
+    for code, msg in results:
+        if msg:
+            print(msg, file=sys.stderr)
+        rc = max(rc, code)
+
+    return max(rc, report(stats, args, sys.stderr))
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile is None:
+        return _main(args)
+
+    from instrument import print_profile, profile
+
+    with profile() as prof:
+        rc = _main(args)
+    print_profile(prof, args.profile, sys.stderr)
+    return rc
+
+
+def _main(args) -> int:
+
+    # parse indent
+    try:
+        indent_width = int(args.indent)
+        if indent_width < 1:
+            raise ValueError
+    except ValueError:
+        # 0 would put block bodies at their header's indentation: not Python
+        print("typan: --indent must be a positive integer (see --minify for the smallest output)", file=sys.stderr)
+        return 2
+
+    indent = " " * indent_width
+
+    if is_batch(args):
+        return _main_batch(args, indent)
+    if args.input is None:
+        print("typan: missing input (or use --changed-since / --staged / --files-from)", file=sys.stderr)
+        return 2
+
+    # stdin mode
+    if args.input == "-":
+        if args.in_place:
+            print("typan: cannot use --in-place with stdin", file=sys.stderr)
+            return 2
+
+        try:
+            src = sys.stdin.read()
+        except Exception as e:
+            print(f"typan: failed to read stdin: {e}", file=sys.stderr)
+            return 2
+
+        # optional validate (runs full typan-check pipeline); its output is reused
+        if args.validate:
+            ok, diags, out = check_text(src, indent=indent)
+            if not ok:
+                return _print_validation_failure(diags, args.show_transformed, out)
+        if args.preserve_lines or args.minify or not args.validate:
+            out = preprocess_text(src, indent=indent, preserve_lines=args.preserve_lines, minify=args.minify)
+
+        if args.check:
+            # stdin: nie ma sensu "czy by się zmieniło", bo nie mamy z czym porównać
+            print("typan: cannot use --check with stdin", file=sys.stderr)
+            return 2
+
+        if args.output:
+            try:
+                Path(args.output).write_text(out, encoding="utf-8", newline="\n")
+            except Exception as e:
+                print(f"typan: failed to write output file: {args.output}: {e}", file=sys.stderr)
+                return 2
+        else:
+            sys.stdout.write(out)
+
+        return 0
+
+    # file mode
+    in_path = Path(args.input)
+    if not in_path.exists():
+        print(f"typan: input file not found: {in_path}", file=sys.stderr)
+        return 2
+    if not in_path.is_file():
+        print(f"typan: input is not a file: {in_path}", file=sys.stderr)
+        return 2
+
+    try:
+        src = in_path.read_text(encoding="utf-8")
+    except Exception as e:
+        print(f"typan: failed to read file: {in_path}: {e}", file=sys.stderr)
+        return 2
+
+    # optional validate (runs full typan-check pipeline); its output is reused,
+    # so the source is not preprocessed a second time
+    if args.validate:
+        ok, diags, out = check_text(src, indent=indent)
+        if not ok:
+            return _print_validation_failure(diags, args.show_transformed, out)
+    if args.preserve_lines or args.minify or not args.validate:
+        out = preprocess_text(src, indent=indent, preserve_lines=args.preserve_lines, minify=args.minify)
+
+    # --check (diff)
+    if args.check:
+        return 1 if out != src else 0
+
+    # --in-place
+    if args.in_place:
+        try:
+            in_path.write_text(out, encoding="utf-8", newline="\n")
+        except Exception as e:
+            print(f"typan: failed to write file in-place: {in_path}: {e}", file=sys.stderr)
+            return 2
+        return 0
+
+    # --output
+    if args.output:
+        out_path = Path(args.output)
+        try:
+            out_path.write_text(out, encoding="utf-8", newline="\n")
+        except Exception as e:
+            print(f"typan: failed to write output file: {out_path}: {e}", file=sys.stderr)
+            return 2
+        return 0
+
+    # default: stdout
+    sys.stdout.write(out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,7 +4,10 @@ import argparse
 import sys
 from pathlib import Path
 
-from formatter import format_in_place, format_text
+from instrument import add_profile_argument
+from batch import BatchError, add_batch_arguments, collect_paths, is_batch, run_pool
+# forwards to a running typan daemon, falls back to in-process
+from client import first_unformatted_line, format_range, format_text
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -13,7 +16,12 @@ def build_parser() -> argparse.ArgumentParser:
         description="typan-fmt: format brace-python (typan) after validating syntax (typan-check).",
     )
 
-    p.add_argument("input", help="Input file path (brace syntax). Use '-' to read from stdin.")
+    p.add_argument(
+        "input",
+        nargs="?",
+        default=None,
+        help="Input file path (brace syntax). Use '-' to read from stdin. Omit in multi-file mode.",
+    )
 
     p.add_argument(
         "-o", "--output",
@@ -24,23 +32,125 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--in-place", action="store_true", help="Overwrite input file with formatted output.")
     p.add_argument("--check", action="store_true", help="Do not write. Exit 0 if already formatted, 1 if would change.")
     p.add_argument("--indent", default="4", help="Indent width in spaces (default: 4).")
+    p.add_argument(
+        "--lines",
+        default=None,
+        metavar="A:B",
+        help="Format only lines A..B (1-based, inclusive); everything else is left untouched.",
+    )
+
+    add_batch_arguments(p)
+    add_profile_argument(p)
 
     return p
 
 
+def _parse_lines(s: str) -> tuple[int, int]:
+    a, sep, b = s.partition(":")
+    if not sep:
+        raise ValueError
+    start, end = int(a), int(b)
+    if start < 1 or end < start:
+        raise ValueError
+    return start, end
+
+
+def _format(src: str, indent: str, line_range: tuple[int, int] | None) -> str:
+    if line_range is None:
+        return format_text(src, indent=indent)
+    return format_range(src, line_range[0], line_range[1], indent=indent)
+
+
+def _fmt_one(path: str, *, indent: str, check: bool):
+    """
+    Worker for multi-file mode (runs in a pool process). Returns (exit_code, stderr_message).
+    check=False means format in place.
+    """
+    p = Path(path)
+    try:
+        src = p.read_text(encoding="utf-8")
+        if check:
+            lineno = first_unformatted_line(src, indent=indent)
+            if lineno is None:
+                return 0, ""
+            return 1, f"typan-fmt: {p}: would reformat (first difference at line {lineno})"
+        out = format_text(src, indent=indent)
+    except SyntaxError as e:
+        return 1, f"{p}: {e}"
+    except OSError as e:
+        return 2, f"typan-fmt: failed to read file: {p}: {e}"
+
+    if out != src:
+        try:
+            p.write_text(out, encoding="utf-8", newline="\n")
+        except OSError as e:
+            return 2, f"typan-fmt: failed to write file in-place: {p}: {e}"
+    return 0, ""
+
+
+def _main_batch(args, indent: str) -> int:
+    if not (args.check or args.in_place) or args.output or args.lines:
+        print("typan-fmt: multi-file mode needs --check or --in-place (and no -o/--lines)", file=sys.stderr)
+        return 2
+    try:
+        paths = collect_paths(args)
+    except BatchError as e:
+        print(f"typan-fmt: {e}", file=sys.stderr)
+        return 2
+
+    from stats import new_stats, report
+
+    stats = new_stats(args)
+    on_file = stats.add if stats is not None else None
+
+    rc = 0
+    for code, msg in run_pool(_fmt_one, paths, jobs=args.jobs, on_file=on_file, indent=indent, check=args.check):
+        if msg:
+            print(msg, file=sys.stderr)
+        rc = max(rc, code)
+
+    return max(rc, report(stats, args, sys.stderr))
+
+
 def main(argv: list[str] | None = None) -> int:
     args = build_parser().parse_args(argv)
+    if args.profile is None:
+        return _main(args)
+
+    from instrument import print_profile, profile
+
+    with profile() as prof:
+        rc = _main(args)
+    print_profile(prof, args.profile, sys.stderr)
+    return rc
+
+
+def _main(args) -> int:
 
     # indent parsing -> usage error => 2
     try:
         w = int(args.indent)
-        if w < 0:
+        if w < 1:
             raise ValueError
     except ValueError:
-        print("typan-fmt: --indent must be a non-negative integer", file=sys.stderr)
+        print("typan-fmt: --indent must be a positive integer", file=sys.stderr)
         return 2
     indent = " " * w
 
+    line_range = None
+    if args.lines is not None:
+        try:
+            line_range = _parse_lines(args.lines)
+        except ValueError:
+            print("typan-fmt: --lines must be A:B with 1 <= A <= B", file=sys.stderr)
+            return 2
+
+    if is_batch(args):
+        return _main_batch(args, indent)
+    if args.input is None:
+        print("typan-fmt: missing input (or use --changed-since / --staged / --files-from)", file=sys.stderr)
+        return 2
+
     # stdin mode
     if args.input == "-":
         if args.in_place:
@@ -52,7 +162,7 @@ def main(argv: list[str] | None = None) -> int:
 
         src = sys.stdin.read()
         try:
-            out = format_text(src, indent=indent)
+            out = _format(src, indent, line_range)
         except SyntaxError as e:
             print(str(e), file=sys.stderr)
             return 1
@@ -72,21 +182,67 @@ def main(argv: list[str] | None = None) -> int:
         print(f"typan-fmt: input is not a file: {in_path}", file=sys.stderr)
         return 2
 
-    if args.in_place:
+    if line_range is not None and (args.check or args.in_place):
         try:
-            changed = format_in_place(str(in_path), indent=indent, check_only=args.check)
+            src = in_path.read_text(encoding="utf-8")
+            out = _format(src, indent, line_range)
         except SyntaxError as e:
             print(str(e), file=sys.stderr)
             return 1
+        except OSError as e:
+            print(f"typan-fmt: failed to read file: {in_path}: {e}", file=sys.stderr)
+            return 2
 
         if args.check:
-            return 1 if changed else 0
+            return 1 if out != src else 0
+        if out != src:
+            try:
+                in_path.write_text(out, encoding="utf-8", newline="\n")
+            except OSError as e:
+                print(f"typan-fmt: failed to write file in-place: {in_path}: {e}", file=sys.stderr)
+                return 2
+        return 0
+
+    # --check: streaming comparison, stops at the first differing line
+    if args.check:
+        try:
+            src = in_path.read_text(encoding="utf-8")
+            lineno = first_unformatted_line(src, indent=indent)
+        except SyntaxError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        except OSError as e:
+            print(f"typan-fmt: failed to read file: {in_path}: {e}", file=sys.stderr)
+            return 2
+
+        if lineno is None:
+            return 0
+        print(f"typan-fmt: {in_path}: would reformat (first difference at line {lineno})", file=sys.stderr)
+        return 1
+
+    if args.in_place:
+        try:
+            src = in_path.read_text(encoding="utf-8")
+            out = format_text(src, indent=indent)
+        except SyntaxError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        except OSError as e:
+            print(f"typan-fmt: failed to read file: {in_path}: {e}", file=sys.stderr)
+            return 2
+
+        if out != src:
+            try:
+                in_path.write_text(out, encoding="utf-8", newline="\n")
+            except OSError as e:
+                print(f"typan-fmt: failed to write file in-place: {in_path}: {e}", file=sys.stderr)
+                return 2
         return 0
 
     # not in-place: output to file or stdout
     try:
         src = in_path.read_text(encoding="utf-8")
-        out = format_text(src, indent=indent)
+        out = _format(src, indent, line_range)
     except SyntaxError as e:
         print(str(e), file=sys.stderr)
         return 1
@@ -0,0 +1,198 @@
+"""
+Thin client for the typan daemon (see daemon.py).
+
+The functions here have the same signatures as their local counterparts.
+When a daemon is reachable the work is forwarded to it; otherwise the local
+module is imported on demand and called directly.
+
+Address: $TYPAN_DAEMON (unix socket path or host:port), default unix socket
+from default_address(). Set TYPAN_NO_DAEMON=1 to never forward. A unix socket
+is only used if it and its directory belong to the current user (_trusted).
+"""
+from __future__ import annotations
+
+import os
+import sys
+
+
+def default_address() -> str:
+    # no tempfile import here: it is slow and this runs on every CLI call.
+    # The socket lives in a private (0700) per-user directory the daemon
+    # creates, never directly in a shared /tmp (see _trusted).
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR")
+    if not base:
+        base = "/tmp" if os.name == "posix" else os.environ.get("TEMP", ".")
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(base, f"typan-{uid}", "daemon.sock")
+
+
+def _trusted(path: str, st) -> bool:
+    """
+    Only talk to a socket we own, in a directory no other user can swap it in:
+    another local user could otherwise plant one at the predictable default
+    path and answer with forged output (which `typan --in-place` would write).
+    """
+    if not hasattr(os, "getuid"):
+        return True
+    uid = os.getuid()
+    if st.st_uid != uid:
+        return False
+    try:
+        parent = os.stat(os.path.dirname(os.path.abspath(path)))
+    except OSError:
+        return False
+    if parent.st_uid not in (uid, 0):
+        return False
+    # writable by others only with the sticky bit (as /tmp): then nobody else can swap our socket
+    return not parent.st_mode & 0o022 or bool(parent.st_mode & 0o1000)
+
+
+def _address() -> str | None:
+    if os.environ.get("TYPAN_NO_DAEMON"):
+        return None
+    return os.environ.get("TYPAN_DAEMON") or default_address()
+
+
+def _connect(address: str, timeout: float):
+    # socket/json are imported only when a daemon may actually be there:
+    # the common "no daemon" case costs one os.stat()
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.path.sep not in address:
+        import socket
+
+        try:
+            return socket.create_connection((host or "127.0.0.1", int(port)), timeout=timeout)
+        except OSError:
+            return None
+
+    try:
+        st = os.stat(address)
+    except OSError:
+        return None
+    if not _trusted(address, st):
+        return None
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(timeout)
+    try:
+        s.connect(address)
+    except OSError:
+        s.close()
+        return None
+    return s
+
+
+def request(req: dict, *, address: str | None = None, timeout: float = 30.0) -> dict | None:
+    """
+    Send one request, return the decoded response, or None if no daemon answers.
+    """
+    address = address or _address()
+    if address is None:
+        return None
+    s = _connect(address, timeout)
+    if s is None:
+        return None
+    import json
+
+    try:
+        with s, s.makefile("rwb") as f:
+            f.write(json.dumps(req).encode("utf-8") + b"\n")
+            f.flush()
+            line = f.readline()
+    except OSError:
+        return None
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def _call(req: dict) -> dict | None:
+    """
+    request() for the wrappers below. Under an active profile (--profile/--stats)
+    the daemon's per-stage profile and cache hit/miss are folded into it.
+    """
+    mod = sys.modules.get("instrument")  # loaded only if someone is profiling
+    prof = mod.current() if mod is not None else None
+    if prof is None:
+        return request(req)
+
+    resp = request({**req, "profile": True})
+    if resp is not None:
+        if resp.pop("cached", False):
+            prof.cache_hits += 1
+        else:
+            prof.cache_misses += 1
+        worker = resp.pop("profile", None)
+        if worker:
+            prof.merge(worker)
+    return resp
+
+
+def _unwrap(resp: dict) -> dict:
+    if resp.get("ok"):
+        return resp
+    if resp.get("error_type") == "ValueError":
+        raise ValueError(resp.get("error", ""))
+    raise SyntaxError(resp.get("error", "SyntaxError"))
+
+
+def preprocess_text(
+    text: str,
+    *,
+    indent: str = "    ",
+    preserve_lines: bool = False,
+    minify: bool = False,
+) -> str:
+    req = {"op": "preprocess", "src": text, "indent": indent}
+    if preserve_lines:
+        req["preserve_lines"] = True
+    if minify:
+        req["minify"] = True
+    resp = _call(req)
+    if resp is None:
+        from preprocess import preprocess_text as local
+        return local(text, indent=indent, preserve_lines=preserve_lines, minify=minify)
+    return _unwrap(resp)["out"]
+
+
+def check_text(text: str, *, indent: str = "    ", level: str = "compile"):
+    from check_text import CheckResult, Diagnostic, check_text as local
+
+    resp = _call({"op": "check", "src": text, "indent": indent, "level": level})
+    if resp is None:
+        return local(text, indent=indent, level=level)
+    if resp.get("error_type") == "ValueError":
+        raise ValueError(resp.get("error", ""))
+    # code objects don't travel over the socket: .code is None here
+    diags = [Diagnostic(**d) for d in resp["diagnostics"]]
+    return CheckResult(resp["ok"], diags, resp["transformed"])
+
+
+def format_text(src: str, *, indent: str = "    ") -> str:
+    resp = _call({"op": "format", "src": src, "indent": indent})
+    if resp is None:
+        from formatter import format_text as local
+        return local(src, indent=indent)
+    return _unwrap(resp)["out"]
+
+
+def format_range(src: str, start_line: int, end_line: int, *, indent: str = "    ") -> str:
+    resp = _call({"op": "format", "src": src, "indent": indent, "lines": [start_line, end_line]})
+    if resp is None:
+        from formatter import format_range as local
+        return local(src, start_line, end_line, indent=indent)
+    return _unwrap(resp)["out"]
+
+
+def first_unformatted_line(src: str, *, indent: str = "    "):
+    resp = _call({"op": "format_check", "src": src, "indent": indent})
+    if resp is None:
+        from formatter import first_unformatted_line as local
+        return local(src, indent=indent)
+    return _unwrap(resp)["line"]
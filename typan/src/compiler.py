@@ -0,0 +1,17 @@
+# compiler.py
+# typan.compile(): like the builtin, for typan sources.
+from __future__ import annotations
+
+from pipeline import PipelineResult
+
+
+def compile(source: str, filename: str = "<typan>", *, indent: str = "    "):
+    """
+    Preprocess `source` and compile it to a code object whose positions are the
+    .tp positions (see PipelineResult.compile). Errors are SyntaxErrors in .tp
+    coordinates: PreprocessError for brace problems, SyntaxError for Python ones.
+
+        code = compile(Path("app.tp").read_text(), "app.tp")
+        exec(code, {"__name__": "__main__"})
+    """
+    return PipelineResult(source, indent=indent).compile(filename)
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import socketserver
+import sys
+import threading
+
+from cache import ResultCache
+from check_text import check_text
+from client import default_address, request
+from formatter import first_unformatted_line, format_range, format_text
+from instrument import profile
+from preprocess import preprocess_text
+
+
+def _error(e: Exception) -> dict:
+    return {"ok": False, "error": str(e), "error_type": type(e).__name__}
+
+
+def _run(op: str, req: dict) -> dict:
+    src = req["src"]
+    indent = req.get("indent", "    ")
+
+    try:
+        if op == "preprocess":
+            out = preprocess_text(
+                src,
+                indent=indent,
+                preserve_lines=bool(req.get("preserve_lines")),
+                minify=bool(req.get("minify")),
+            )
+            return {"ok": True, "out": out}
+
+        if op == "check":
+            ok, diags, transformed = check_text(src, indent=indent, level=req.get("level", "compile"))
+            return {"ok": ok, "diagnostics": [d.to_dict() for d in diags], "transformed": transformed}
+
+        if op == "format":
+            lines = req.get("lines")
+            if lines:
+                return {"ok": True, "out": format_range(src, lines[0], lines[1], indent=indent)}
+            return {"ok": True, "out": format_text(src, indent=indent)}
+
+        if op == "format_check":
+            return {"ok": True, "line": first_unformatted_line(src, indent=indent)}
+    except (SyntaxError, ValueError) as e:
+        return _error(e)
+
+    return {"ok": False, "error": f"unknown op: {op}", "error_type": "ValueError"}
+
+
+def _run_profiled(op: str, req: dict) -> tuple[dict, dict]:
+    with profile() as prof:
+        resp = _run(op, req)
+    d = prof.to_dict()
+    # wall/cpu belong to the client's own profile(), which already spans this request
+    del d["wall"], d["cpu"]
+    return resp, d
+
+
+class DaemonService:
+    """
+    Request dispatcher shared by all server sockets. Results are cached on
+    (op, options, sha1(src)), so repeated requests for the same file are free.
+    Requests with "profile": true also get "cached" and the per-stage profile
+    of the run (see instrument.py).
+    """
+
+    def __init__(self, cache_size: int = 256):
+        self.cache = ResultCache(cache_size)
+        self.shutdown_requested = threading.Event()
+
+    def handle(self, req: dict) -> dict:
+        op = req.get("op")
+
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "stats":
+            return {"ok": True, "hits": self.cache.hits, "misses": self.cache.misses}
+        if op == "shutdown":
+            self.shutdown_requested.set()
+            return {"ok": True}
+
+        if not isinstance(req.get("src"), str):
+            return {"ok": False, "error": "missing 'src'", "error_type": "ValueError"}
+
+        lines = req.get("lines")
+        key = (
+            op,
+            req.get("indent", "    "),
+            tuple(lines) if lines else None,
+            req.get("level"),
+            bool(req.get("preserve_lines")),
+            bool(req.get("minify")),
+            hashlib.sha1(req["src"].encode("utf-8")).digest(),
+        )
+        entry = self.cache.get(key)
+        cached = entry is not None
+        if entry is None:
+            # counters are always recorded: a later profiled request may hit this entry
+            entry = _run_profiled(op, req)
+            self.cache.put(key, entry)
+
+        resp, prof = entry
+        if not req.get("profile"):
+            return resp
+        if cached:
+            # counters of the original run; a cache hit runs no stage
+            prof = {**prof, "stages": {}}
+        return {**resp, "cached": cached, "profile": prof}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service: DaemonService = self.server.service  # type: ignore[attr-defined]
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+                resp = service.handle(req)
+            except (ValueError, KeyError, TypeError) as e:
+                resp = {"ok": False, "error": f"bad request: {e}", "error_type": "ValueError"}
+            self.wfile.write(json.dumps(resp).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:  # pragma: no cover - windows
+    _UnixServer = None
+
+
+def _claim_socket_path(path: str) -> None:
+    """
+    Remove a stale socket left by a crashed daemon; refuse if one is alive.
+    The default path's directory is created private (0700).
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    if path == default_address():
+        # private per-user directory: clients refuse a socket anyone else can replace
+        os.makedirs(parent, mode=0o700, exist_ok=True)
+        if hasattr(os, "getuid"):
+            st = os.stat(parent)
+            if st.st_uid != os.getuid() or st.st_mode & 0o077:
+                raise OSError(f"{parent} must be a directory private to the current user (mode 0700)")
+    if not os.path.exists(path):
+        return
+    if request({"op": "ping"}, address=path, timeout=1.0) is not None:
+        raise OSError(f"a typan daemon is already running on {path}")
+    os.unlink(path)
+
+
+def serve(
+    socket_path: str | None = None,
+    *,
+    port: int | None = None,
+    cache_size: int = 256,
+    ready: threading.Event | None = None,
+) -> None:
+    """
+    Serve until a "shutdown" request arrives. Listens on a unix socket
+    (if supported) and optionally on 127.0.0.1:port.
+    """
+    service = DaemonService(cache_size)
+    servers = []
+
+    if _UnixServer is not None:
+        socket_path = socket_path or default_address()
+        _claim_socket_path(socket_path)
+        servers.append(_UnixServer(socket_path, _Handler))
+    if port is not None:
+        servers.append(_TCPServer(("127.0.0.1", port), _Handler))
+    if not servers:
+        raise OSError("no unix socket support on this platform; use --port")
+
+    for srv in servers:
+        srv.service = service  # type: ignore[attr-defined]
+        threading.Thread(target=srv.serve_forever, name="typan-daemon", daemon=True).start()
+
+    if ready is not None:
+        ready.set()
+
+    try:
+        service.shutdown_requested.wait()
+    finally:
+        for srv in servers:
+            srv.shutdown()
+            srv.server_close()
+        if _UnixServer is not None and socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="typan daemon",
+        description="typan daemon: keep typan warm and answer preprocess/check/format requests from a cache.",
+    )
+    p.add_argument("--socket", default=None, help="Unix socket path (default: $TYPAN_DAEMON or a per-user temp path).")
+    p.add_argument("--port", type=int, default=None, help="Also listen on 127.0.0.1:PORT.")
+    p.add_argument("--cache-size", type=int, default=256, help="Number of cached results (default: 256).")
+    p.add_argument("--stop", action="store_true", help="Ask a running daemon to shut down.")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    address = args.socket or os.environ.get("TYPAN_DAEMON") or default_address()
+
+    if args.stop:
+        if request({"op": "shutdown"}, address=address) is None:
+            print(f"typan daemon: no daemon running on {address}", file=sys.stderr)
+            return 1
+        return 0
+
+    try:
+        serve(address, port=args.port, cache_size=args.cache_size)
+    except OSError as e:
+        print(f"typan daemon: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
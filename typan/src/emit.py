@@ -1,26 +1,30 @@
 # emit.py
-from transform import E_LINE, E_OPEN, E_CLOSE, E_BLANK
-from create_token import T_STRING, T_COMMENT, T_WS
+from transform import E_LINE, E_OPEN, E_CLOSE, E_BLANK, BLOCK_HEADS
+from create_token import T_STRING, T_COMMENT, T_WS, T_OTHER, T_LBRACE, T_RBRACE
 
-def _open_line_to_str(tokens):
-    n = len(tokens)
-    comment_i = None
-    for i, (kind, value, *_rest) in enumerate(tokens):
-        if kind == T_COMMENT:
-            comment_i = i
-            break
-
-    if comment_i is None:
+def _split_header(tokens):
+    """
+    E_OPEN payload -> (code without trailing WS, comment tail); ':' goes between them.
+    """
+    # only a comment at the very end is the tail; one inside a multi-line
+    # header (`if (a  # why\n and b) {`) stays in the code
+    j = len(tokens)
+    while j > 0 and tokens[j - 1][0] == T_WS:
+        j -= 1
+    if j > 0 and tokens[j - 1][0] == T_COMMENT:
+        code = tokens[:j - 1]
+        tail = tokens[j - 1:]
+    else:
         code = tokens
         tail = []
-    else:
-        code = tokens[:comment_i]
-        tail = tokens[comment_i:]
 
     j = len(code)
     while j > 0 and code[j - 1][0] == T_WS:
         j -= 1
-    code = code[:j]
+    return code[:j], tail
+
+def _open_line_to_str(tokens):
+    code, tail = _split_header(tokens)
 
     out = []
     for kind, value, *_ in code:
@@ -43,13 +47,27 @@ def _line_to_str(tokens):
         out.append(value)
     return "".join(out)
 
-def emit(events, indent_str="    "):
+def emit(events, indent_str="    ", *, preserve_lines=False, minify=False, positions=None):
+    """
+    preserve_lines: output line N == source line N (see _emit_aligned).
+    minify: smallest valid output, indent_str is ignored (see _emit_minified).
+    positions: pass a list to also get the source map of the output -
+    positions[n - 1] is the list of (output col, source line, source col)
+    segments of output line n (cols 0-based, see _map_tokens).
+    """
+    if preserve_lines:
+        return _emit_aligned(events, indent_str, positions)
+    if minify:
+        return _emit_minified(events, positions)
+
     indent = 0
     parts = []
+    out_line = 1
 
     for kind, payload in events:
         if kind == E_BLANK:
             parts.append("\n")
+            out_line += 1
             continue
 
         if kind == E_CLOSE:
@@ -59,12 +77,358 @@ def emit(events, indent_str="    "):
         if kind == E_OPEN:
             line = _open_line_to_str(payload)
             parts.append((indent_str * indent) + line + "\n")
+            if positions is not None:
+                code, tail = _split_header(payload)
+                out_line, col = _map_tokens(code, positions, out_line, len(indent_str) * indent)
+                if tail:
+                    out_line, col = _map_tokens(tail, positions, out_line, col + 1)
+                out_line += 1
             indent += 1
             continue
 
         if kind == E_LINE:
             line = _line_to_str(payload).rstrip()
             parts.append((indent_str * indent) + line + "\n")
+            if positions is not None:
+                out_line = _map_tokens(payload, positions, out_line, len(indent_str) * indent)[0] + 1
+            continue
+
+    return "".join(parts)
+
+def _map_tokens(tokens, positions, out_line, out_col, breaks=False):
+    """
+    Record where `tokens` land when written at (out_line, out_col): one
+    (out_col, src_line, src_col) segment per run of tokens that is contiguous
+    in the source, in positions[out_line - 1]. breaks=True: the line breaks
+    between tokens are kept (see _render).
+    -> (out_line, out_col) just past the last token.
+    """
+    while len(positions) < out_line:
+        positions.append([])
+    segs = positions[out_line - 1]
+    src_line = tokens[0][2] if tokens else 0
+    expect = None  # where the next token starts if the run continues
+
+    for kind, value, ln, col in tokens:
+        if value is None:
+            continue
+        if breaks and ln > src_line:
+            out_line += ln - src_line
+            out_col = 0
+            src_line = ln
+            while len(positions) < out_line:
+                positions.append([])
+            segs = positions[out_line - 1]
+        if expect != (ln, col):
+            segs.append((out_col, ln, col - 1))
+
+        if kind in (T_STRING, T_WS) and "\n" in value:
+            # triple-quoted string (or a line break kept by logical_lines): copied verbatim
+            pieces = value.split("\n")
+            for k in range(1, len(pieces)):
+                out_line += 1
+                while len(positions) < out_line:
+                    positions.append([])
+                positions[out_line - 1].append((0, ln + k, 0))
+            segs = positions[out_line - 1]
+            src_line = ln + len(pieces) - 1
+            out_col = len(pieces[-1])
+            expect = (src_line, out_col + 1)
+        else:
+            out_col += len(value)
+            expect = (ln, col + len(value))
+
+    return out_line, out_col
+
+
+# ------------------------------------------------------------
+# preserve_lines: output line N == source line N
+# ------------------------------------------------------------
+
+# cannot follow a header on the same line (`if a: for ...` is not Python)
+_COMPOUND_HEADS = BLOCK_HEADS | {"async"}
+
+
+def _render(tokens):
+    """
+    Token text with the source's line breaks put back (logical_lines drops the
+    NEWLINEs inside () / []). -> (text, number of line breaks in it)
+    """
+    out = []
+    line = tokens[0][2]
+    for kind, value, ln, _col in tokens:
+        if value is None:
+            continue
+        if ln > line:
+            out.append("\n" * (ln - line))
+            line = ln
+        out.append(value)
+        if kind in (T_STRING, T_WS):
+            line += value.count("\n")
+    return "".join(out), line - tokens[0][2]
+
+
+def _aligned_open_line(code, tail):
+    text, nl = _render(code)
+    text += ":"
+    if tail:
+        text += "".join(v for _, v, *_ in tail if v is not None)
+    return text.rstrip(), nl
+
+
+def _is_simple(tokens):
+    # a statement that may share the header's line (`if a: stmt`)
+    kind, value, *_ = tokens[0]
+    if kind == T_COMMENT:
+        return False
+    if kind == T_OTHER and value == "@":
+        return False
+    return value not in _COMPOUND_HEADS
+
+
+def _emit_aligned(events, indent_str, positions=None):
+    """
+    Every statement lands on the line it came from: closing braces and blank
+    lines become blank lines, an inline block becomes a single-line suite
+    (`if a { b }` -> `if a: b`, `def f() { }` -> `def f(): pass`) and the line
+    breaks inside () / [] are kept.
+
+    Where Python has no one-line form (a statement after an inline block on the
+    same line, a compound statement as an inline body), the rest of the output
+    moves down and re-aligns at the next line that has room (a blank line or a
+    closing brace).
+    """
+    parts = []
+    indent = 0
+    cur = 0  # line number of the last (still open) output line; line 0 is virtual
+    suite = False  # cur ends with a header's ':' and nothing after it yet
+    col = 0  # end of line cur, tracked only for positions
+
+    for kind, payload in events:
+        if kind == E_CLOSE:
+            indent = max(0, indent - 1)
+            suite = False
+            continue
+
+        if kind == E_BLANK or not payload:
             continue
 
+        line = payload[0][2]
+
+        if kind == E_OPEN:
+            code, tail = _split_header(payload)
+            text, nl = _aligned_open_line(code, tail)
+            start = max(line, cur + 1)
+            parts.append("\n" * (start - cur))
+            parts.append(indent_str * indent + text)
+            if positions is not None:
+                _, col = _map_tokens(code, positions, start, len(indent_str) * indent, True)
+                col += 1
+                if tail:
+                    _, col = _map_tokens(tail, positions, start + nl, col, True)
+            cur = start + nl
+            indent += 1
+            suite = not tail
+            continue
+
+        text, nl = _render(payload)
+        text = text.rstrip()
+        if line <= cur:
+            sep = None
+            if payload[0][0] == T_COMMENT:
+                sep = "  "
+            elif suite and _is_simple(payload):
+                sep = " "
+            if sep is not None:
+                parts.append(sep + text)
+                if positions is not None:
+                    _, col = _map_tokens(payload, positions, cur, col + len(sep), True)
+                cur += nl
+                suite = False
+                continue
+
+        start = max(line, cur + 1)
+        parts.append("\n" * (start - cur))
+        parts.append(indent_str * indent + text)
+        if positions is not None:
+            _, col = _map_tokens(payload, positions, start, len(indent_str) * indent, True)
+        cur = start + nl
+        suite = False
+
+    if not parts:
+        return ""
+    parts[0] = parts[0][1:]  # the break that ended virtual line 0
+    parts.append("\n")
+    return "".join(parts)
+
+
+# ------------------------------------------------------------
+# minify: no comments / blank lines, 1-space indent, merged statements
+# ------------------------------------------------------------
+
+def _minified(tokens):
+    # comments dropped, whitespace runs collapsed to one space, no trailing WS / ';'
+    out = []
+    for tok in tokens:
+        kind = tok[0]
+        if kind == T_COMMENT:
+            continue
+        if kind == T_WS:
+            if "\n" in tok[1] and out and out[-1][:2] == (T_OTHER, "\\"):
+                out.pop()  # a '\\' continuation is redundant on one line
+            if not out or out[-1][0] == T_WS:
+                # nothing before it (a line that was only '\\') would shift the indentation
+                continue
+            tok = (T_WS, " ", tok[2], tok[3])
+        out.append(tok)
+    # a trailing ';' would double up with the one that joins the next statement
+    while out and (out[-1][0] == T_WS or out[-1][:2] == (T_OTHER, ";")):
+        out.pop()
+    return out
+
+
+def _mergeable(tokens):
+    # may be joined with ';' to the next statement (not after a '\\' continuation)
+    return _is_simple(tokens) and tokens[-1][1] != "\\"
+
+
+def _join_literal_lines(events):
+    """
+    A dict/set literal spread over several lines arrives as one E_LINE per line
+    (logical_lines only joins inside () / []): glue those into one statement,
+    so that ';'-merging never splits a literal.
+    """
+    out = []
+    pending = None
+    depth = 0
+    for event in events:
+        kind, payload = event
+        if pending is not None:
+            if kind == E_BLANK:
+                continue
+            if kind == E_LINE:
+                ln, col = payload[0][2], payload[0][3]
+                pending.append((T_WS, " ", ln, col))
+                pending.extend(payload)
+                depth += _brace_balance(payload)
+                if depth <= 0:
+                    out.append((E_LINE, pending))
+                    pending = None
+                continue
+            # a block event inside an open literal: not Python anyway, stop joining
+            out.append((E_LINE, pending))
+            pending = None
+        if kind == E_LINE and payload:
+            depth = _brace_balance(payload)
+            if depth > 0:
+                pending = list(payload)
+                continue
+        out.append(event)
+    if pending is not None:
+        out.append((E_LINE, pending))
+    return out
+
+
+def _brace_balance(tokens):
+    n = 0
+    for kind, *_rest in tokens:
+        if kind == T_LBRACE:
+            n += 1
+        elif kind == T_RBRACE:
+            n -= 1
+    return n
+
+
+def _inline_body(events, i):
+    """
+    Body of the block whose E_OPEN precedes events[i] if it fits on the header's
+    line (`if a:x=1;y=2`): (statements, index of its E_CLOSE), else (None, None).
+    A scan stops at the first nested E_OPEN, so every event is scanned at most once.
+    """
+    stmts = []
+    for j in range(i, len(events)):
+        kind, payload = events[j]
+        if kind == E_CLOSE:
+            return stmts, j
+        if kind == E_OPEN:
+            return None, None
+        if kind == E_LINE:
+            tokens = _minified(payload)
+            if not tokens:
+                continue
+            if not _mergeable(tokens):
+                return None, None
+            stmts.append(tokens)
+    return None, None
+
+
+def _emit_minified(events, positions=None):
+    """
+    Deployment output: comments and blank lines are dropped (a leading '#!' line
+    is kept), blocks are indented by one space, whitespace runs become one space,
+    consecutive simple statements are joined with ';' and a block made only of
+    simple statements goes on its header's line (`if a:x=1;y=2`).
+    Empty blocks still get their 'pass'.
+    """
+    events = _join_literal_lines(events)
+
+    parts = []
+    depth = 0
+    out_line = 0
+    col = 0  # end of the current output line, tracked only for positions
+    merge = False  # the current line is simple statements at `depth`
+    i = 0
+    n = len(events)
+
+    while i < n:
+        kind, payload = events[i]
+        i += 1
+
+        if kind == E_CLOSE:
+            depth = max(0, depth - 1)
+            merge = False
+            continue
+        if kind == E_BLANK or not payload:
+            continue
+
+        if kind == E_OPEN:
+            code = _minified(_split_header(payload)[0])
+            parts.append("\n" * (out_line > 0) + " " * depth + _line_to_str(code) + ":")
+            out_line += 1
+            if positions is not None:
+                out_line, col = _map_tokens(code, positions, out_line, depth)
+                col += 1
+            body, close = _inline_body(events, i)
+            if body is None:
+                depth += 1
+            else:
+                for k, stmt in enumerate(body):
+                    parts.append(";" * (k > 0) + _line_to_str(stmt))
+                    if positions is not None:
+                        out_line, col = _map_tokens(stmt, positions, out_line, col + (k > 0))
+                i = close + 1
+            merge = False
+            continue
+
+        if out_line == 0 and payload[0][0] == T_COMMENT and payload[0][1].startswith("#!"):
+            tokens = payload[:1]
+        else:
+            tokens = _minified(payload)
+            if not tokens:
+                continue
+
+        text = _line_to_str(tokens)
+        if merge and _is_simple(tokens):
+            parts.append(";" + text)
+            if positions is not None:
+                out_line, col = _map_tokens(tokens, positions, out_line, col + 1)
+        else:
+            parts.append("\n" * (out_line > 0) + " " * depth + text)
+            out_line += 1
+            if positions is not None:
+                out_line, col = _map_tokens(tokens, positions, out_line, depth)
+        merge = tokens[0][0] != T_COMMENT and _mergeable(tokens)
+
+    if parts:
+        parts.append("\n")
     return "".join(parts)
@@ -1,15 +1,18 @@
 # errors.py
 from __future__ import annotations
 
+import re
+
+_LOC_RE = re.compile(r"line\s+(\d+),\s*col\s+(\d+)")
+
 def format_error(source: str, line: int, col: int, message: str) -> str:
     """
     line, col are 1-based.
     """
-    lines = source.splitlines()
-    if line < 1 or line > len(lines):
+    src_line = _source_line(source, line)
+    if src_line is None:
         return f"{message} (line {line}, col {col})"
 
-    src_line = lines[line - 1]
     caret_pos = max(0, col - 1)
     caret_pos = min(caret_pos, len(src_line))
 
@@ -21,3 +24,92 @@ def format_error(source: str, line: int, col: int, message: str) -> str:
         f"{src_line}\n"
         f"{caret_line}"
     )
+
+
+def _source_line(source: str, line: int) -> str | None:
+    # find() instead of splitlines(): rendering one error shouldn't copy the whole file
+    if line < 1:
+        return None
+    start = 0
+    for _ in range(line - 1):
+        start = source.find("\n", start) + 1
+        if start == 0:
+            return None
+    if start >= len(source):
+        return None
+    end = source.find("\n", start)
+    text = source[start:] if end < 0 else source[start:end]
+    return text[:-1] if text.endswith("\r") else text
+
+
+class PreprocessError(SyntaxError):
+    """
+    Preprocessor (lex/transform) error with its position.
+    Rendering (source line + caret, see format_error) happens on str(), and only
+    once `source` is attached - lex/transform never see the text as a whole.
+    """
+
+    def __init__(self, msg: str, lineno: int | None = None, col: int | None = None, source: str | None = None):
+        super().__init__(msg)
+        self.msg = msg
+        self.lineno = lineno
+        self.offset = col
+        self.source = source
+        self._rendered: str | None = None
+
+    def __reduce__(self):
+        # SyntaxError pickles via args only; keep the position across process pools
+        return (PreprocessError, (self.msg, self.lineno, self.offset, self.source))
+
+    def render(self) -> str:
+        if self._rendered is None:
+            if self.lineno is None:
+                self._rendered = self.msg
+            elif self.source is None:
+                self._rendered = f"{self.msg} at line {self.lineno}, col {self.offset}"
+            else:
+                self._rendered = format_error(self.source, self.lineno, self.offset or 1, self.msg)
+        return self._rendered
+
+    def with_source(self, source: str) -> "PreprocessError":
+        if self.source is None:
+            self.source = source
+            self._rendered = None
+        return self
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+class LimitExceeded(ValueError):
+    """
+    A resource limit (see limits.Limits) was hit: `limit` is the Limits field
+    ("max_tokens", "timeout", ...), `value` what the input reached, `maximum` the limit.
+    A ValueError: the input is rejected, it is not a syntax problem.
+    """
+
+    def __init__(self, limit: str, value, maximum):
+        super().__init__(f"{limit} exceeded: {value} > {maximum}")
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
+
+    def __reduce__(self):
+        return (LimitExceeded, (self.limit, self.value, self.maximum))
+
+
+def syntax_error_location(e: SyntaxError) -> tuple[int, int] | None:
+    """
+    (line, col) of a preprocessor SyntaxError, 1-based.
+    Prefers lineno/offset, falls back to the "line X, col Y" text transform uses.
+    """
+    ln = getattr(e, "lineno", None)
+    col = getattr(e, "offset", None)
+    if ln is not None and col is not None:
+        return ln, col
+
+    msg = e.args[0] if e.args else ""
+    m = _LOC_RE.search(str(msg))
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    return None
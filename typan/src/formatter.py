@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import itertools
 from dataclasses import dataclass
 from typing import Iterable, Iterator, Optional
 
 from lex import lex
-from lines import logical_lines
-from create_token import T_IDENT, T_LBRACE, T_RBRACE, T_WS, T_COMMENT, T_STRING
+from lines import logical_lines, logical_lines_with_spans
+from create_token import (
+    T_IDENT, T_LBRACE, T_RBRACE, T_LPAREN, T_RPAREN, T_LBRACK, T_RBRACK, T_WS, T_COMMENT, T_STRING,
+)
+from transform import _block_head_end, _literal_brace
 from check_text import check_text
+from pipeline import PipelineResult
+from limits import Limits
+from instrument import stage
+from errors import PreprocessError
 
 
 # event kinds
@@ -16,14 +24,14 @@ E_CLOSE = "CLOSE"
 E_BLANK = "BLANK"
 
 
-BLOCK_HEADS = {
+BLOCK_HEADS = frozenset({
     "if", "elif", "else",
     "for", "while",
     "def", "class",
     "try", "except", "finally",
     "with",
     "match", "case",
-}
+})
 
 def _normalize_ws_between_tokens(tokens):
     """
@@ -32,8 +40,21 @@ def _normalize_ws_between_tokens(tokens):
     """
     out = []
     prev_was_space = False
+    after_break = False
 
     for kind, value, *rest in tokens:
+        if kind == T_WS and "\n" in value:
+            # złamanie linii po komentarzu / '\' w nawiasach (logical_lines) - zostaje,
+            # razem z wcięciem następnej linii
+            out.append((kind, value, *rest))
+            prev_was_space = True
+            after_break = True
+            continue
+        if kind == T_WS and after_break:
+            out.append((kind, value, *rest))
+            after_break = False
+            continue
+        after_break = False
         if kind == T_WS:
             if not prev_was_space:
                 out.append((kind, " ", *rest))
@@ -213,6 +234,12 @@ def _format_close_trailing(tokens) -> str:
 
 
 
+@dataclass
+class _EventState:
+    depth: int = 0            # ile bloków jest otwartych
+    literal_depth: int = 0    # '{' dict/set otwarte w poprzednich liniach
+
+
 def format_events_from_text(src: str) -> Iterator[tuple[str, object]]:
     """
     Produkuje eventy (OPEN/CLOSE/LINE/BLANK) dla formattera.
@@ -220,12 +247,15 @@ def format_events_from_text(src: str) -> Iterator[tuple[str, object]]:
     Rozbija konstrukcje w stylu: '} else {' na osobne eventy.
     Rozwija inline: 'if x { stmt }' do multiline z { }.
     """
-    tokens = lex(src)
-    lines = logical_lines(tokens)
+    return _format_events_from_lines(logical_lines(lex(src)), _EventState())
 
-    stack: list[object] = []
-    literal_depth = 0
 
+def _format_events_from_lines(lines, state: _EventState) -> Iterator[tuple[str, object]]:
+    """
+    Jak format_events_from_text, ale na gotowych logical lines.
+    Stan (depth, literal_depth) jest w `state`, więc można wznowić
+    generowanie od środka pliku (format_range).
+    """
     for line_tokens in lines:
         if line_tokens == []:
             yield (E_BLANK, None)
@@ -236,13 +266,13 @@ def format_events_from_text(src: str) -> Iterator[tuple[str, object]]:
         # 1) leading '}' zamyka blok (jeśli nie jesteśmy w literałach)
         while True:
             t = _strip_leading_ws(tokens_line)
-            if t and t[0][0] == T_RBRACE and literal_depth == 0:
-                if not stack:
+            if t and t[0][0] == T_RBRACE and state.literal_depth == 0:
+                if not state.depth:
                     # syntax should be caught earlier by checker, but keep safe
                     yield (E_CLOSE, t)  # fallback
                     tokens_line = t[1:]
                 else:
-                    stack.pop()
+                    state.depth -= 1
                     # close with possible trailing comment (but not '} else {')
                     yield (E_CLOSE, t)
                     tokens_line = t[1:]
@@ -259,21 +289,31 @@ def format_events_from_text(src: str) -> Iterator[tuple[str, object]]:
         idx_lbrace = None
         idx_rbrace = None
 
-        for i, tok in enumerate(tokens_line):
-            if tok[0] != T_LBRACE:
+        # jak w transform: '{' w () / [] albo w miejscu wyrażenia to literał
+        head_end = _block_head_end(tokens_line)
+        nesting = 0
+        for i in range(head_end if head_end is not None else len(tokens_line), len(tokens_line)):
+            kind = tokens_line[i][0]
+            if kind in (T_LPAREN, T_LBRACK):
+                nesting += 1
+            elif kind in (T_RPAREN, T_RBRACK) or (kind == T_RBRACE and nesting):
+                nesting = max(0, nesting - 1)
+            if kind != T_LBRACE:
+                continue
+            if nesting or _literal_brace(tokens_line, i, head_end):
+                nesting += 1
                 continue
-            if _is_block_opener(tokens_line[: i + 1]):
-                j = _find_matching_rbrace_inline(tokens_line, i)
-                if j is not None:
-                    idx_lbrace = i
-                    idx_rbrace = j
-                break
+            j = _find_matching_rbrace_inline(tokens_line, i)
+            if j is not None:
+                idx_lbrace = i
+                idx_rbrace = j
+            break
 
         if idx_lbrace is not None and idx_rbrace is not None:
             # emit OPEN
             opener_tokens = tokens_line[: idx_lbrace + 1]
             yield (E_OPEN, opener_tokens)
-            stack.append("{")
+            state.depth += 1
 
             # body as LINE (if any)
             body = _strip_leading_ws(tokens_line[idx_lbrace + 1 : idx_rbrace])
@@ -283,7 +323,7 @@ def format_events_from_text(src: str) -> Iterator[tuple[str, object]]:
             # emit CLOSE
             close_tok = tokens_line[idx_rbrace : idx_rbrace + 1]
             yield (E_CLOSE, close_tok)
-            stack.pop()
+            state.depth -= 1
 
             # remainder after inline close (formatter rozbije dalej jeśli trzeba)
             tokens_line = _strip_leading_ws(tokens_line[idx_rbrace + 1 :])
@@ -293,31 +333,31 @@ def format_events_from_text(src: str) -> Iterator[tuple[str, object]]:
         # 3) normal opener
         if _is_block_opener(tokens_line):
             yield (E_OPEN, tokens_line)
-            stack.append("{")
+            state.depth += 1
             continue
 
         # 4) normal line
-        literal_depth = _update_literal_depth(tokens_line, literal_depth)
+        state.literal_depth = _update_literal_depth(tokens_line, state.literal_depth)
         yield (E_LINE, tokens_line)
 
     # brakujące } powinny być złapane przez checker, ale dla pewności:
-    if stack:
+    if state.depth:
         # nic nie emitujemy; to błąd składni, ale do formattera i tak nie dojdziemy,
         # bo check_text ma być odpalony wcześniej.
         pass
 
 
-def emit_pretty(events: Iterable[tuple[str, object]], *, indent: str = "    ") -> str:
+def iter_pretty_lines(
+    events: Iterable[tuple[str, object]], *, indent: str = "    ", level: int = 0
+) -> Iterator[str]:
     """
-    Emitter dla typan (formatowanie brace-syntax).
-    Zasady:
-      - OPEN: header w jednej linii + '{'
-      - CLOSE: '}' w jednej linii
-      - LINE: trim leading/trailing, wstaw indent wg poziomu
-      - BLANK: maks 1 pusta linia pod rząd
+    Leniwa wersja emit_pretty: zwraca kolejne linie (bez '\n').
+    Puste linie są wstrzymywane do pierwszej linii z treścią, więc
+    końcowe puste linie nigdy nie wychodzą (jak rstrip() w emit_pretty).
+    `level` to początkowy poziom bloku (dla format_range).
     """
-    out: list[str] = []
-    level = 0
+    emitted = False
+    last_blank = False
     blank_pending = False
 
     for kind, payload in events:
@@ -325,57 +365,212 @@ def emit_pretty(events: Iterable[tuple[str, object]], *, indent: str = "    ") -
             blank_pending = True
             continue
 
-        if blank_pending:
-            # maks 1 pusta linia
-            if out and out[-1] != "":
-                out.append("")
-            blank_pending = False
-
-        if kind == E_OPEN:
-            line = _format_open_header(payload)  # type: ignore[arg-type]
-            out.append(f"{indent * level}{line}")
-            level += 1
-            continue
-
-        if kind == E_CLOSE:
-            # payload może być: sam token '}' albo '}' + trailing
-            level = max(0, level - 1)
-            # jeśli payload to lista tokenów, pierwszy to '}'
-            trailing = _format_close_trailing(payload)  # type: ignore[arg-type]
-            if trailing:
-                out.append(f"{indent * level}}} {trailing}")
-            else:
-                out.append(f"{indent * level}}}")
-            continue
-
         if kind == E_LINE:
             txt = _format_line_text(payload)  # type: ignore[arg-type]
             if txt == "":
                 # traktuj jako blank, ale nadal ogranicz do 1
-                if out and out[-1] != "":
-                    out.append("")
+                blank_pending = True
                 continue
-            out.append(f"{indent * level}{txt}")
+            line = f"{indent * level}{txt}"
+        elif kind == E_OPEN:
+            line = f"{indent * level}{_format_open_header(payload)}"  # type: ignore[arg-type]
+            level += 1
+        elif kind == E_CLOSE:
+            # payload może być: sam token '}' albo '}' + trailing
+            level = max(0, level - 1)
+            trailing = _format_close_trailing(payload)  # type: ignore[arg-type]
+            line = f"{indent * level}}} {trailing}" if trailing else f"{indent * level}}}"
+        else:
+            # unknown event: ignore
             continue
 
-        # unknown event: ignore
+        if blank_pending:
+            # maks 1 pusta linia, nigdy na początku pliku
+            if emitted and not last_blank:
+                yield ""
+            blank_pending = False
+
+        yield line
+        emitted = True
+        last_blank = False
 
+
+def emit_pretty(events: Iterable[tuple[str, object]], *, indent: str = "    ") -> str:
+    """
+    Emitter dla typan (formatowanie brace-syntax).
+    Zasady:
+      - OPEN: header w jednej linii + '{'
+      - CLOSE: '}' w jednej linii
+      - LINE: trim leading/trailing, wstaw indent wg poziomu
+      - BLANK: maks 1 pusta linia pod rząd
+    """
     # newline na końcu pliku
-    return "\n".join(out).rstrip() + "\n"
+    return "\n".join(iter_pretty_lines(events, indent=indent)).rstrip() + "\n"
 
 
-def format_text(src: str, *, indent: str = "    ") -> str:
+def _validate_or_raise(
+    src: str, indent: str, limits: Limits | None = None, pipeline: PipelineResult | None = None,
+) -> PipelineResult:
     """
-    Najpierw check (preprocess+compile). Jeśli OK -> format.
-    Jeśli nie OK -> rzuca SyntaxError z komunikatem jak typan-check.
+    check_text na wspólnym PipelineResult; zwraca go, żeby formatter
+    użył tych samych logical lines (źródło jest lexowane tylko raz).
     """
-    ok, diags, _transformed = check_text(src, indent=indent)
+    if pipeline is None:
+        pipeline = PipelineResult(src, indent=indent, limits=limits)
+    ok, diags, _transformed = check_text(src, indent=indent, pipeline=pipeline)
     if not ok:
         d = diags[0]
         raise SyntaxError(d.message)
+    return pipeline
+
 
-    events = format_events_from_text(src)
-    return emit_pretty(events, indent=indent)
+def first_unformatted_line(src: str, *, indent: str = "    ") -> Optional[int]:
+    """
+    Porównuje sformatowane linie ze źródłem linia po linii i kończy
+    na pierwszej różnicy.
+    Zwraca numer linii (1-based) pierwszej różnicy albo None, jeśli
+    plik jest już sformatowany.
+
+    Pełna walidacja (check_text, compile) idzie dopiero, gdy porównanie
+    dojdzie do końca bez różnicy - wtedy rzuca SyntaxError jak format_text.
+    Przy różnicy błąd kompilacji dalej w pliku nie jest zgłaszany (plik
+    i tak trzeba przeformatować); błąd struktury (lex / klamry) napotkany
+    przed różnicą rzuca ten sam SyntaxError co format_text.
+    """
+    pipeline = PipelineResult(src, indent=indent)
+    try:
+        with stage("format_check"):
+            lineno = _first_difference(src, _format_events_from_lines(pipeline.lines, _EventState()), indent)
+    except SyntaxError:
+        # komunikat jak z format_text (typan-check)
+        _validate_or_raise(src, indent, pipeline=pipeline)
+        raise
+    if lineno is None:
+        _validate_or_raise(src, indent, pipeline=pipeline)
+    return lineno
+
+
+def _first_difference(src: str, events, indent: str) -> Optional[int]:
+    pos = 0
+    n = len(src)
+    lineno = 0
+
+    for lineno, line in enumerate(iter_pretty_lines(events, indent=indent), start=1):
+        end = pos + len(line)
+        if end >= n or src[end] != "\n" or not src.startswith(line, pos):
+            return lineno
+        pos = end + 1
+
+    if lineno == 0:
+        # pusty wynik formatowania to "\n"
+        return None if src == "\n" else 1
+
+    if pos != n:
+        return lineno + 1
+    return None
+
+
+def format_text(src: str, *, indent: str = "    ", limits: Limits | None = None) -> str:
+    """
+    Najpierw check (preprocess+compile). Jeśli OK -> format.
+    Jeśli nie OK -> rzuca SyntaxError z komunikatem jak typan-check.
+    limits: jak w check_text (errors.LimitExceeded).
+    """
+    pipeline = _validate_or_raise(src, indent, limits)
+    if pipeline.budget is not None:
+        pipeline.budget.check_time()
+
+    with stage("format"):
+        events = _format_events_from_lines(pipeline.lines, _EventState())
+        return emit_pretty(events, indent=indent)
+
+
+def _checked_region_events(src: str, events, level: int):
+    """
+    Walidacja tylko edytowanego fragmentu: '}' nie może zamknąć
+    więcej bloków niż jest otwartych na początku zakresu.
+    """
+    for kind, payload in events:
+        if kind == E_OPEN:
+            level += 1
+        elif kind == E_CLOSE:
+            if level == 0:
+                _, _, ln, col = payload[0]  # type: ignore[index]
+                raise PreprocessError("Unmatched '}'", ln, col, src)
+            level -= 1
+        yield kind, payload
+
+
+def format_range(src: str, start_line: int, end_line: int, *, indent: str = "    ") -> str:
+    """
+    Formatuje tylko linie start_line..end_line (1-based, włącznie).
+    Zakres jest rozszerzany do granic logical lines. Poziom bloku na
+    początku zakresu liczy prescan struktury (bez budowania tekstu),
+    a plik za zakresem nie jest nawet lexowany. Wszystko poza zakresem
+    wraca bez zmian; walidowana jest tylko struktura klamer w zakresie.
+    """
+    if start_line < 1 or end_line < start_line:
+        raise ValueError(f"invalid line range: {start_line}:{end_line}")
+
+    raw = src.split("\n")
+    has_final_nl = src.endswith("\n")
+    if has_final_nl:
+        raw.pop()
+    total = len(raw)
+    if start_line > total:
+        return src
+    end_line = min(end_line, total)
+
+    spans = logical_lines_with_spans(lex(src))
+    state = _EventState()
+    pending: list[tuple[int, int, list]] = []
+
+    def _prefix():
+        for span in spans:
+            if span[1] >= start_line:
+                pending.append(span)
+                return
+            yield span[2]
+
+    # prescan: tylko stan (depth/literal_depth), eventy są wyrzucane
+    for _ in _format_events_from_lines(_prefix(), state):
+        pass
+
+    region_first = pending[0][0] if pending else start_line
+    region_last = region_first - 1
+
+    def _region():
+        nonlocal region_last
+        for first, last, line_tokens in itertools.chain(pending, spans):
+            if first > end_line:
+                return
+            region_last = last
+            yield line_tokens
+
+    level = state.depth
+    events = _checked_region_events(src, _format_events_from_lines(_region(), state), level)
+    formatted = list(iter_pretty_lines(events, indent=indent, level=level))
+
+    if region_last < region_first:
+        return src
+
+    region_raw = raw[region_first - 1:region_last]
+    if not formatted:
+        formatted = [""]
+    else:
+        # puste linie na brzegach zakresu zwijamy do jednej, nie usuwamy
+        if region_raw[0].strip() == "" and region_first > 1:
+            formatted.insert(0, "")
+        if region_raw[-1].strip() == "" and region_last < total:
+            formatted.append("")
+
+    # wstawione linie dostają styl końców linii pliku (CRLF: '\r' zostaje w raw)
+    first_nl = src.find("\n")
+    if first_nl > 0 and src[first_nl - 1] == "\r":
+        formatted = [line + "\r" for line in formatted]
+
+    out = raw[:region_first - 1] + formatted + raw[region_last:]
+    return "\n".join(out) + ("\n" if has_final_nl or region_last >= total else "")
 
 
 def format_file(in_path: str, out_path: str, *, indent: str = "    ") -> None:
@@ -390,12 +585,13 @@ def format_in_place(path: str, *, indent: str = "    ", check_only: bool = False
     p = pathlib.Path(path)
     src = p.read_text(encoding="utf-8")
 
+    if check_only:
+        # nie budujemy całego wyniku, wystarczy pierwsza różnica
+        return first_unformatted_line(src, indent=indent) is not None
+
     out = format_text(src, indent=indent)
     changed = (out != src)
 
-    if check_only:
-        return changed
-
     if changed:
         p.write_text(out, encoding="utf-8", newline="\n")
     return changed
@@ -0,0 +1,341 @@
+# from_python.py
+# `typan from-python`: convert existing Python to brace syntax (migrations).
+#
+#   typan from-python src/ -j 8            # a.py -> a.tp next to every .py under src/
+#   typan from-python app.py -o -          # print the converted source
+#   typan from-python src/ --check         # convert + verify only, write nothing
+#
+# The conversion only inserts braces: the header ':' of every block becomes '{'
+# and a '}' line closes it, everything else (indentation, comments, strings)
+# is kept byte for byte. Blocks come from the tokenize INDENT/DEDENT stream,
+# so the result is exact for anything the Python tokenizer accepts; every
+# file is then verified by preprocessing it back and comparing the ASTs.
+from __future__ import annotations
+
+import argparse
+import ast
+import io
+import os
+import sys
+import tokenize
+from pathlib import Path
+
+from batch import run_pool
+
+# heads that may carry a one-line suite (`if x: return`); 'case' only inside a match block
+_SUITE_HEADS = frozenset({
+    "if", "elif", "else", "for", "while", "def", "class",
+    "try", "except", "finally", "with", "async",
+})
+
+_SKIP_DIRS = frozenset({"__pycache__", ".git", ".hg", ".svn", ".tox", ".nox", ".venv", "venv", "node_modules"})
+
+
+class ConvertError(SyntaxError):
+    """The file can't be converted (tokenize error) or did not round-trip."""
+
+
+class _Block:
+    __slots__ = ("indent", "body_col", "head")
+
+    def __init__(self, indent: str, body_col: int, head: str):
+        self.indent = indent  # leading whitespace of the header line
+        self.body_col = body_col
+        self.head = head
+
+
+def _header_colon(line: list) -> int | None:
+    """
+    Index of the block ':' in a logical line: the first ':' outside brackets
+    that does not end a lambda's parameters.
+    """
+    depth = 0
+    lambdas = 0
+    for i, tok in enumerate(line):
+        if tok.type == tokenize.OP:
+            if tok.string in "([{":
+                depth += 1
+            elif tok.string in ")]}":
+                depth -= 1
+            elif tok.string == ":" and depth == 0:
+                if not lambdas:
+                    return i
+                lambdas -= 1
+        elif tok.type == tokenize.NAME and tok.string == "lambda" and depth == 0:
+            lambdas += 1
+    return None
+
+
+def from_python(text: str) -> str:
+    """
+    Python source -> typan source. Raises ConvertError for input the Python
+    tokenizer rejects (bad indentation, unterminated strings...).
+    """
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(text).readline))
+    except (tokenize.TokenError, IndentationError) as e:
+        msg, pos = (e.args[0], e.args[1]) if isinstance(e, tokenize.TokenError) else (e.msg, (e.lineno, e.offset))
+        raise ConvertError(f"cannot tokenize: {msg}", ("<python>", pos[0], pos[1], None)) from None
+
+    src_lines = text.split("\n")
+    crlf = "\r\n" in text
+    # (line, col, removed chars, inserted text); lines are 1-based
+    edits: list[tuple[int, int, int, str]] = []
+    stack: list[_Block] = []
+    line: list = []  # code tokens of the current logical line
+    header = None  # (indent, head) of a line that ended in ':' and is followed by INDENT
+    last_code_line = 0
+    comments: list[tuple[int, int]] = []  # comment-only lines since the last statement
+
+    def leading_ws(lineno: int) -> str:
+        s = src_lines[lineno - 1]
+        return s[: len(s) - len(s.lstrip(" \t\f"))]
+
+    def replace_colon(line: list, colon: int) -> None:
+        # typan joins only () / [] lines: a header '{' literal spanning lines
+        # goes into parentheses (`if k in ({\n...\n}) {` - same AST)
+        depth = 0
+        opened = None
+        for tok in line[:colon]:
+            if tok.type != tokenize.OP:
+                continue
+            if tok.string in "([{":
+                if depth == 0 and tok.string == "{":
+                    opened = tok
+                depth += 1
+            elif tok.string in ")]}":
+                depth -= 1
+                if depth == 0 and opened is not None:
+                    if tok.start[0] != opened.start[0]:
+                        edits.append((*opened.start, 0, "("))
+                        edits.append((*tok.end, 0, ")"))
+                    opened = None
+        # 'if x:' -> 'if x {', 'else :' -> 'else {'
+        tok = line[colon]
+        row, col = tok.start
+        before = src_lines[row - 1][col - 1:col] if col else ""
+        edits.append((row, col, 1, "{" if before in (" ", "\t") else " {"))
+
+    for i, tok in enumerate(tokens):
+        kind = tok.type
+        if kind == tokenize.COMMENT and not line:
+            comments.append(tok.start)
+            continue
+        if kind in (tokenize.NL, tokenize.COMMENT, tokenize.ENCODING, tokenize.ENDMARKER):
+            continue
+
+        if kind == tokenize.INDENT:
+            if header is None:
+                raise ConvertError("unexpected indent", ("<python>", tok.start[0], 1, None))
+            stack.append(_Block(header[0], tok.end[1], header[1]))
+            header = None
+            continue
+
+        if kind == tokenize.DEDENT:
+            block = stack.pop()
+            # comment lines still indented like the body stay inside the block
+            at = last_code_line
+            for row, col in comments:
+                if col < block.body_col:
+                    break
+                at = row
+            # the file's own line terminator (CRLF sources stay CRLF)
+            nl = "\r\n" if src_lines[at - 1].endswith("\r") or (at == len(src_lines) and crlf) else "\n"
+            edits.append((at + 1, 0, 0, block.indent + "}" + nl))
+            continue
+
+        if kind != tokenize.NEWLINE:
+            line.append(tok)
+            continue
+
+        # end of a logical line
+        last_code_line = tok.start[0]
+        comments = []
+        if line:
+            first = line[0].string if line[0].type == tokenize.NAME else None
+            j = i + 1
+            while tokens[j].type in (tokenize.NL, tokenize.COMMENT):
+                j += 1
+            colon = _header_colon(line)
+            if tokens[j].type == tokenize.INDENT:
+                if colon is None:
+                    raise ConvertError("block without a ':' header", ("<python>", line[0].start[0], 1, None))
+                replace_colon(line, colon)
+                header = (leading_ws(line[0].start[0]), first)
+            elif colon is not None and colon + 1 < len(line) and (
+                first in _SUITE_HEADS or (first == "case" and stack and stack[-1].head == "match")
+            ):
+                # one-line suite: 'if x: y' -> 'if x { y }'
+                replace_colon(line, colon)
+                row, col = line[-1].end
+                edits.append((row, col, 0, " }"))
+        line = []
+
+    return _apply(text, edits, "\r\n" if crlf else "\n")
+
+
+def _apply(text: str, edits: list[tuple[int, int, int, str]], nl: str = "\n") -> str:
+    starts = [0]
+    for i, ch in enumerate(text):
+        if ch == "\n":
+            starts.append(i + 1)
+    if any(row > len(starts) for row, *_ in edits):
+        # a closer after an unterminated last line
+        text += nl
+        starts.append(len(text))
+
+    out = []
+    pos = 0
+    # stable sort: insertions at one spot keep their order (inner block's '}' first)
+    for row, col, removed, new in sorted(edits, key=lambda e: (e[0], e[1])):
+        at = starts[row - 1] + col
+        out.append(text[pos:at])
+        out.append(new)
+        pos = at + removed
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def verify(python: str, converted: str) -> None:
+    """
+    Raise ConvertError unless preprocessing `converted` gives the same AST as `python`.
+    """
+    from preprocess import preprocess_text
+
+    try:
+        back = preprocess_text(converted)
+    except SyntaxError as e:
+        raise ConvertError(f"converted source does not preprocess: {e}") from None
+    try:
+        same = ast.dump(ast.parse(back)) == ast.dump(ast.parse(python))
+    except SyntaxError as e:
+        raise ConvertError(f"converted source does not parse back: {e.msg} (line {e.lineno})") from None
+    if not same:
+        raise ConvertError("converted source does not round-trip (AST differs)")
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+
+def iter_python_files(paths: list[str]) -> list[Path]:
+    """
+    Files as given, directories walked for *.py (sorted, skipping VCS/venv/cache dirs).
+    """
+    out = []
+    for p in map(Path, paths):
+        if not p.is_dir():
+            out.append(p)
+            continue
+        for root, dirs, files in os.walk(p):
+            dirs[:] = sorted(d for d in dirs if d not in _SKIP_DIRS and not d.startswith("."))
+            out.extend(Path(root) / f for f in sorted(files) if f.endswith(".py") and not f.endswith(".tp.py"))
+    return out
+
+
+def target_path(path: Path, out_dir: str | None, suffix: str) -> Path:
+    name = path.name[: -len(".py")] if path.name.endswith(".py") else path.name
+    if not out_dir:
+        return path.with_name(name + suffix)
+    # keep the layout relative to cwd; files outside cwd go flat into out_dir (as typan convert)
+    rel = Path(os.path.relpath(path))
+    if rel.parts[:1] == ("..",):
+        rel = Path(path.name)
+    return Path(out_dir) / rel.parent / (name + suffix)
+
+
+def _convert_one(path: str, *, out_dir: str | None, suffix: str, check: bool, verify_ast: bool, force: bool):
+    """
+    Worker (runs in a pool process). Returns (exit_code, stderr_message).
+    """
+    p = Path(path)
+    try:
+        src = p.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError) as e:
+        return 2, f"typan from-python: failed to read file: {p}: {e}"
+
+    try:
+        out = from_python(src)
+        if verify_ast:
+            verify(src, out)
+    except ConvertError as e:
+        loc = f":{e.lineno}" if e.lineno else ""
+        return 1, f"{p}{loc}: {e.msg}"
+
+    if check:
+        return 0, ""
+
+    target = target_path(p, out_dir, suffix)
+    if target.exists() and not force:
+        return 1, f"typan from-python: {target} exists (use --force to overwrite)"
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(out, encoding="utf-8", newline="\n")
+    except OSError as e:
+        return 2, f"typan from-python: failed to write output file: {target}: {e}"
+    return 0, f"{p} -> {target}"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="typan from-python",
+        description="Convert Python files to typan brace syntax; every result is verified by "
+                    "preprocessing it back and comparing ASTs.",
+    )
+    p.add_argument("paths", nargs="+", help="Python files or directories (walked for *.py).")
+    p.add_argument(
+        "-o", "--output",
+        default=None,
+        help="Output directory (default: next to each source). '-' prints a single file's result to stdout.",
+    )
+    p.add_argument("--suffix", choices=(".tp", ".tp.py"), default=".tp", help="Output suffix (default: .tp).")
+    p.add_argument("--check", action="store_true", help="Convert and verify only, write nothing.")
+    p.add_argument("--no-verify", action="store_true", help="Skip the AST round-trip check.")
+    p.add_argument("--force", action="store_true", help="Overwrite existing outputs.")
+    p.add_argument("-q", "--quiet", action="store_true", help="Report failures only.")
+    p.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes (default: CPU count).",
+    )
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.output == "-":
+        if len(args.paths) != 1 or Path(args.paths[0]).is_dir():
+            print("typan from-python: -o - needs exactly one file", file=sys.stderr)
+            return 2
+        try:
+            src = Path(args.paths[0]).read_text(encoding="utf-8")
+            out = from_python(src)
+            if not args.no_verify:
+                verify(src, out)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"typan from-python: failed to read file: {args.paths[0]}: {e}", file=sys.stderr)
+            return 2
+        except ConvertError as e:
+            print(f"{args.paths[0]}: {e.msg}", file=sys.stderr)
+            return 1
+        sys.stdout.write(out)
+        return 0
+
+    rc = 0
+    results = run_pool(
+        _convert_one, iter_python_files(args.paths), jobs=args.jobs,
+        out_dir=args.output, suffix=args.suffix, check=args.check,
+        verify_ast=not args.no_verify, force=args.force,
+    )
+    # streamed: each file is reported as soon as it (and everything before it) is done
+    for code, msg in results:
+        if msg and (code or not args.quiet):
+            print(msg, file=sys.stderr if code else sys.stdout, flush=True)
+        rc = max(rc, code)
+    return rc
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import importlib.abc
+import importlib.util
+import os
+import sys
+
+from preprocess import preprocess_text
+
+
+SOURCE_SUFFIXES = (".tp", ".tp.py")
+
+
+class TpLoader(importlib.abc.FileLoader, importlib.abc.SourceLoader):
+    """
+    Loads a typan source: preprocess -> compile with the real .tp filename.
+    The output keeps the source's line numbers, so tracebacks show the .tp lines.
+    No bytecode cache is written (path_stats is not implemented), so a .tp module
+    never shares a __pycache__ entry with a .py module of the same name.
+    """
+
+    indent = "    "
+
+    def source_to_code(self, data, path, *, _optimize=-1):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        out = preprocess_text(data, indent=self.indent, preserve_lines=True)
+        return compile(out, path, "exec", dont_inherit=True, optimize=_optimize)
+
+
+class TpFinder(importlib.abc.MetaPathFinder):
+    """
+    Finds `name.tp` / `name.tp.py` modules and packages with `__init__.tp`.
+    Installed at the END of sys.meta_path, so regular .py modules win.
+    """
+
+    def find_spec(self, fullname, path=None, target=None):
+        name = fullname.rpartition(".")[2]
+        for entry in (path if path is not None else sys.path):
+            base = os.path.join(entry or ".", name)
+
+            if os.path.isdir(base):
+                for suffix in SOURCE_SUFFIXES:
+                    init = os.path.join(base, "__init__" + suffix)
+                    if os.path.isfile(init):
+                        return importlib.util.spec_from_file_location(
+                            fullname, init,
+                            loader=TpLoader(fullname, init),
+                            submodule_search_locations=[base],
+                        )
+
+            for suffix in SOURCE_SUFFIXES:
+                filename = base + suffix
+                if os.path.isfile(filename):
+                    return importlib.util.spec_from_file_location(
+                        fullname, filename, loader=TpLoader(fullname, filename),
+                    )
+        return None
+
+
+_finder: TpFinder | None = None
+
+
+def install() -> None:
+    """
+    Make `import foo` find foo.tp. Idempotent.
+    """
+    global _finder
+    if _finder is None:
+        _finder = TpFinder()
+    # checked on sys.meta_path itself: something may have restored it since (pytester does)
+    if _finder not in sys.meta_path:
+        sys.meta_path.append(_finder)
+
+
+def installed() -> bool:
+    return _finder is not None and _finder in sys.meta_path
+
+
+def uninstall() -> None:
+    global _finder
+    if _finder is not None:
+        try:
+            sys.meta_path.remove(_finder)
+        except ValueError:
+            pass
+        _finder = None
+
+
+def is_tp_module(module) -> bool:
+    return isinstance(getattr(module, "__loader__", None), TpLoader)
@@ -0,0 +1,171 @@
+# instrument.py
+# Opt-in per-stage timings and counters.
+#
+#   with profile() as prof:
+#       format_text(src)
+#   print(prof.format_table())
+#
+# When no profile is active the pipeline pays one ContextVar.get() per stage,
+# nothing per token.
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+
+@dataclass
+class Profile:
+    stages: dict[str, float] = field(default_factory=dict)  # stage -> seconds (summed over sources)
+    sources: int = 0
+    input_bytes: int = 0
+    tokens: int = 0
+    logical_lines: int = 0
+    events: int = 0
+    max_depth: int = 0
+    output_bytes: int = 0
+    cache_hits: int = 0  # daemon answers served from its result cache
+    cache_misses: int = 0
+    wall: float = 0.0  # seconds inside profile(), set on exit
+    cpu: float = 0.0
+    on_stage: Optional[Callable[[str, float], None]] = field(default=None, repr=False, compare=False)
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self.on_stage is not None:
+            self.on_stage(name, seconds)
+
+    def add_events(self, events: list) -> None:
+        # imported here: the CLIs load this module before any pipeline module
+        from transform import E_OPEN, E_CLOSE
+
+        self.events += len(events)
+        depth = 0
+        deepest = self.max_depth
+        for kind, _payload in events:
+            if kind == E_OPEN:
+                depth += 1
+                if depth > deepest:
+                    deepest = depth
+            elif kind == E_CLOSE:
+                depth -= 1
+        self.max_depth = deepest
+
+    def merge(self, other: dict) -> None:
+        """
+        Add a to_dict() result (e.g. from a pool worker) into this profile.
+        wall/cpu are not added: this profile's own profile() block spans the
+        worker's run, so summing them would count the same time twice (or N
+        times with N workers).
+        """
+        for name, seconds in other.get("stages", {}).items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        for key in _MERGED:
+            setattr(self, key, getattr(self, key) + other.get(key, 0))
+        self.max_depth = max(self.max_depth, other.get("max_depth", 0))
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": dict(self.stages),
+            **{key: getattr(self, key) for key in _SUMMED},
+            "max_depth": self.max_depth,
+        }
+
+    def to_json(self) -> str:
+        import json
+
+        return json.dumps(self.to_dict(), indent=2)
+
+    def format_table(self) -> str:
+        rows = [f"{'stage':<16}{'ms':>12}"]
+        for name, seconds in self.stages.items():
+            rows.append(f"{name:<16}{seconds * 1000:>12.3f}")
+        rows.append(f"{'total':<16}{sum(self.stages.values()) * 1000:>12.3f}")
+        rows.append("")
+        for key in ("sources", "input_bytes", "tokens", "logical_lines", "events", "max_depth", "output_bytes"):
+            rows.append(f"{key:<16}{getattr(self, key):>12}")
+        if self.cache_hits or self.cache_misses:
+            rows.append(f"{'cache_hits':<16}{self.cache_hits:>12}")
+            rows.append(f"{'cache_misses':<16}{self.cache_misses:>12}")
+        return "\n".join(rows)
+
+
+_SUMMED = (
+    "sources", "input_bytes", "tokens", "logical_lines", "events", "output_bytes",
+    "cache_hits", "cache_misses", "wall", "cpu",
+)
+_MERGED = tuple(key for key in _SUMMED if key not in ("wall", "cpu"))
+
+
+_current: ContextVar[Optional[Profile]] = ContextVar("typan_profile", default=None)
+
+
+def current() -> Optional[Profile]:
+    return _current.get()
+
+
+@contextmanager
+def profile(
+    *,
+    on_stage: Optional[Callable[[str, float], None]] = None,
+    on_done: Optional[Callable[[Profile], None]] = None,
+) -> Iterator[Profile]:
+    """
+    Collect timings/counters for everything typan does inside the block.
+    on_stage(name, seconds) fires as each stage finishes, on_done(profile) at exit -
+    hooks for feeding an embedding application's own telemetry.
+    """
+    prof = Profile(on_stage=on_stage)
+    token = _current.set(prof)
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield prof
+    finally:
+        _current.reset(token)
+        prof.wall += time.perf_counter() - t0
+        prof.cpu += time.process_time() - c0
+        if on_done is not None:
+            on_done(prof)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a block as `name` if profiling is active (no-op otherwise).
+    """
+    prof = _current.get()
+    if prof is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add_stage(name, time.perf_counter() - t0)
+
+
+def run_profiled(fn: Callable, *args, **kwargs) -> tuple:
+    """
+    (fn(*args, **kwargs), profile dict) - for pool workers, whose profile has to
+    travel back to the parent (see batch.run_pool).
+    """
+    with profile() as prof:
+        result = fn(*args, **kwargs)
+    return result, prof.to_dict()
+
+
+def add_profile_argument(p) -> None:
+    p.add_argument(
+        "--profile",
+        nargs="?",
+        const="table",
+        choices=("table", "json"),
+        default=None,
+        help="Print per-stage timings and counters to stderr (table or json).",
+    )
+
+
+def print_profile(prof: Profile, fmt: str, file) -> None:
+    print(prof.to_json() if fmt == "json" else prof.format_table(), file=file)
@@ -1,7 +1,8 @@
 from typing import Iterator, Tuple
 from create_token import *
+from errors import PreprocessError
 
-_STRING_PREFIX_CHARS = set("rRbBuUfF")
+_STRING_PREFIX_CHARS = frozenset("rRbBuUfF")
 
 def _is_prefix_char(ch: str) -> bool:
     return ch in _STRING_PREFIX_CHARS
@@ -34,6 +35,10 @@ def _scan_string(text: str, i: int):
         delim = quote * 3
         k = j + 3
         while k + 2 < n:
+            if text[k] == "\\":
+                # escaped char (also in raw strings: r"""\"""" is not the end)
+                k += 2
+                continue
             if text[k] == quote and text[k+1] == quote and text[k+2] == quote:
                 k += 3
                 return k, text[i:k]
@@ -41,32 +46,29 @@ def _scan_string(text: str, i: int):
         raise SyntaxError("Unterminated triple-quoted string")
     else:
         k = j + 1
-        # treat raw strings a bit: if any 'r'/'R' in prefix, backslash doesn't escape quote
-        prefix = text[i:j].lower()
-        is_raw = "r" in prefix
-
+        # a backslash escapes the next char in raw strings too (r"\"" is one string),
+        # only the value differs; backslash-newline continues the literal
         escaped = False
         while k < n:
             c = text[k]
-            if c == "\n":
+            if escaped:
+                escaped = False
+            elif c == "\n":
                 # single-quoted strings cannot cross newline
                 raise SyntaxError("Unterminated string literal (newline in single-quoted string)")
-            if not is_raw:
-                if escaped:
-                    escaped = False
-                elif c == "\\":
-                    escaped = True
-                elif c == quote:
-                    k += 1
-                    return k, text[i:k]
-            else:
-                if c == quote:
-                    k += 1
-                    return k, text[i:k]
+            elif c == "\\":
+                escaped = True
+            elif c == quote:
+                k += 1
+                return k, text[i:k]
             k += 1
         raise SyntaxError("Unterminated string literal")
 
-def lex(text: str) -> Iterator[Tuple[int, str | None, int, int]]:
+def lex(text: str, errors: list | None = None) -> Iterator[Tuple[int, str | None, int, int]]:
+    """
+    errors=None: raise PreprocessError on the first unterminated string.
+    errors=[...]: append it there and keep going (see preprocess.collect_errors).
+    """
     i = 0
     line = 1
     col = 1
@@ -85,7 +87,18 @@ def lex(text: str) -> Iterator[Tuple[int, str | None, int, int]]:
 
         # STRING
         if _is_prefix_char(ch) or ch in ("'", '"'):
-            scanned = _scan_string(text, i)
+            try:
+                scanned = _scan_string(text, i)
+            except SyntaxError as e:
+                err = PreprocessError(e.args[0], line, col)
+                if errors is None:
+                    raise err from None
+                # recover: the string runs to the end of the line (or of the file, if triple-quoted)
+                errors.append(err)
+                end = n if "triple" in err.msg else text.find("\n", i)
+                if end < 0:
+                    end = n
+                scanned = end, text[i:end]
             if scanned is not None:
                 end, literal = scanned
                 start_col = col
@@ -0,0 +1,108 @@
+# limits.py
+# Resource limits for preprocessing untrusted input in a shared service:
+#
+#   limits = Limits(max_bytes=1 << 20, max_depth=100, timeout=0.5)
+#   preprocess_text(src, limits=limits)      # raises errors.LimitExceeded
+#
+# The checks wrap the lex / logical_lines / transform streams, so an oversized
+# input is rejected while it is being read, not after it was fully processed.
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from errors import LimitExceeded
+from transform import E_OPEN, E_CLOSE
+
+# tokens / events between two clock reads
+_CLOCK_EVERY = 4096
+
+
+@dataclass(frozen=True)
+class Limits:
+    max_bytes: Optional[int] = None  # UTF-8 size of the source
+    max_tokens: Optional[int] = None
+    max_depth: Optional[int] = None  # nested blocks
+    max_line_length: Optional[int] = None  # characters in one logical line
+    timeout: Optional[float] = None  # wall-clock seconds for the whole call
+
+    def start(self) -> "Budget":
+        return Budget(self)
+
+
+class Budget:
+    """
+    Limits of one call; the timeout runs from start().
+    """
+
+    __slots__ = ("limits", "t0", "deadline")
+
+    def __init__(self, limits: Limits):
+        self.limits = limits
+        self.t0 = time.monotonic()
+        self.deadline = None if limits.timeout is None else self.t0 + limits.timeout
+
+    def check_time(self) -> None:
+        if self.deadline is not None:
+            now = time.monotonic()
+            if now > self.deadline:
+                raise LimitExceeded("timeout", round(now - self.t0, 3), self.limits.timeout)
+
+    def check_input(self, text: str) -> None:
+        maximum = self.limits.max_bytes
+        if maximum is not None:
+            size = len(text) if text.isascii() else len(text.encode("utf-8"))
+            if size > maximum:
+                raise LimitExceeded("max_bytes", size, maximum)
+
+    def tokens(self, tokens: Iterable) -> Iterator:
+        maximum = self.limits.max_tokens
+        if maximum is None and self.deadline is None:
+            return iter(tokens)
+        return self._tokens(tokens, maximum)
+
+    def _tokens(self, tokens: Iterable, maximum: Optional[int]) -> Iterator:
+        n = 0
+        for tok in tokens:
+            n += 1
+            if maximum is not None and n > maximum:
+                raise LimitExceeded("max_tokens", n, maximum)
+            if not n % _CLOCK_EVERY:
+                self.check_time()
+            yield tok
+
+    def lines(self, lines: Iterable[list]) -> Iterator[list]:
+        maximum = self.limits.max_line_length
+        if maximum is None:
+            return iter(lines)
+        return self._lines(lines, maximum)
+
+    def _lines(self, lines: Iterable[list], maximum: int) -> Iterator[list]:
+        for line in lines:
+            length = sum(len(v) for _, v, *_ in line if v)
+            if length > maximum:
+                raise LimitExceeded("max_line_length", length, maximum)
+            yield line
+
+    def events(self, events: Iterable) -> Iterator:
+        maximum = self.limits.max_depth
+        if maximum is None and self.deadline is None:
+            return iter(events)
+        return self._events(events, maximum)
+
+    def _events(self, events: Iterable, maximum: Optional[int]) -> Iterator:
+        depth = 0
+        n = 0
+        for event in events:
+            kind = event[0]
+            if kind == E_OPEN:
+                depth += 1
+                if maximum is not None and depth > maximum:
+                    raise LimitExceeded("max_depth", depth, maximum)
+            elif kind == E_CLOSE:
+                depth -= 1
+            n += 1
+            if not n % _CLOCK_EVERY:
+                self.check_time()
+            yield event
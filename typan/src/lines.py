@@ -1,5 +1,5 @@
 from create_token import (
-    T_NEWLINE, T_LPAREN, T_RPAREN, T_LBRACK, T_RBRACK,
+    T_NEWLINE, T_LPAREN, T_RPAREN, T_LBRACK, T_RBRACK, T_WS, T_COMMENT, T_OTHER, T_STRING,
 )
 
 def logical_lines(tokens):
@@ -39,6 +39,11 @@ def logical_lines(tokens):
             continue
 
         if kind == T_NEWLINE:
+            if buf and buf[-1][:2] == (T_OTHER, "\\"):
+                # kontynuacja '\' - linia fizyczna się kończy, logiczna nie
+                # (nagłówek bloku może tak przechodzić przez kilka linii)
+                buf.append((T_WS, "\n", line, col))
+                continue
             # NEWLINE kończy logical line tylko jeśli nie jesteśmy w () lub []
             if paren == 0 and brack == 0:
                 if buf:
@@ -47,14 +52,38 @@ def logical_lines(tokens):
                 else:
                     # pusta linia -> emituj pustą (przyda się w emitterze)
                     yield []
-            else:
-                # newline wewnątrz nawiasów jest ignorowany (ale możesz zachować, jeśli chcesz)
-                # buf.append(tok)  # opcjonalnie
-                pass
+            elif buf and buf[-1][0] == T_COMMENT:
+                # newline wewnątrz nawiasów jest ignorowany - poza tym po komentarzu,
+                # bo sklejony z następną linią zjadłby ją; zostaje jako WS "\n"
+                buf.append((T_WS, "\n", line, col))
             continue
 
         buf.append(tok)
 
     # jeśli coś zostało bez newline na końcu pliku
     if buf:
-        yield buf
\ No newline at end of file
+        yield buf
+
+
+def logical_lines_with_spans(tokens):
+    """
+    logical_lines + physical line range: (first_line, last_line, tokens).
+    The last token consumed before a line is yielded is the NEWLINE that ends it,
+    so its line number is last_line. Blank lines are yielded as (n, n, []).
+    A last line without a NEWLINE ends where its last token ends (a triple-quoted
+    string at EOF spans several lines).
+    """
+    cursor = [1]
+
+    def _tracked(toks):
+        for tok in toks:
+            cursor[0] = tok[2]
+            if tok[0] == T_STRING:
+                cursor[0] += tok[1].count("\n")
+            yield tok
+
+    first = 1
+    for line_tokens in logical_lines(_tracked(tokens)):
+        last = cursor[0]
+        yield first, last, line_tokens
+        first = last + 1
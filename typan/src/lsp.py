@@ -0,0 +1,535 @@
+from __future__ import annotations
+
+import bisect
+import json
+import sys
+import threading
+from typing import BinaryIO, Optional
+
+from lex import lex
+from lines import logical_lines_with_spans
+from transform import E_CLOSE, TransformState, transform
+from check_text import check_text
+from pipeline import PipelineResult
+from formatter import format_range, format_text
+
+
+# LSP constants
+_SYNC_INCREMENTAL = 2
+_SEVERITY_ERROR = 1
+_METHOD_NOT_FOUND = -32601
+_INVALID_REQUEST = -32600
+_INVALID_PARAMS = -32602
+_INTERNAL_ERROR = -32603
+
+
+# ------------------------------------------------------------
+# JSON-RPC framing (Content-Length headers)
+# ------------------------------------------------------------
+
+def read_message(stream: BinaryIO) -> Optional[dict]:
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        if name.lower() == "content-length":
+            length = int(value.strip())
+    if length is None:
+        return None
+    return json.loads(stream.read(length).decode("utf-8"))
+
+
+def write_message(stream: BinaryIO, msg: dict) -> None:
+    body = json.dumps(msg).encode("utf-8")
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    stream.flush()
+
+
+# ------------------------------------------------------------
+# positions: LSP counts UTF-16 code units
+# ------------------------------------------------------------
+
+def _utf16_to_index(s: str, character: int) -> int:
+    if s.isascii():
+        return min(character, len(s))
+    units = 0
+    for i, ch in enumerate(s):
+        if units >= character:
+            return i
+        units += 2 if ord(ch) > 0xFFFF else 1
+    return len(s)
+
+
+def _index_to_utf16(s: str, idx: int) -> int:
+    if s.isascii():
+        return idx
+    return sum(2 if ord(ch) > 0xFFFF else 1 for ch in s[:idx])
+
+
+# ------------------------------------------------------------
+# document with incremental token state
+# ------------------------------------------------------------
+
+class Document:
+    """
+    Text as physical lines plus cached logical lines ("spans") and their transform events.
+
+    span = [first_line, last_line, offset, tokens, events, state]; token line numbers
+    are relative, the real line is token_line + offset, so spans after an edit are
+    shifted in O(1) each without touching their tokens. events are transform's events
+    for the span in the same relative positions (None until computed), state the
+    TransformState after it.
+
+    An edit re-lexes from the logical line containing the edit and stops as soon as a
+    new logical-line boundary lands on an old one past the edit: from a logical-line
+    boundary the lexer has no state, so everything after it is unchanged.
+    events() re-transforms from the first re-lexed span the same way, until the
+    transform state after a span is what it was before the edit.
+    """
+
+    def __init__(self, uri: str, text: str, version: int = 0):
+        self.uri = uri
+        self.version = version
+        self.lines = text.split("\n")
+        self.spans: Optional[list[list]] = None
+        self.lex_error: Optional[SyntaxError] = None
+        self.relexed_lines = 0  # physical lines re-lexed by the last update (for tests / tuning)
+        self.retransformed = 0  # spans re-transformed by the last events() (for tests / tuning)
+        self._dirty = 0  # index of the first span whose events are missing
+        self._full_lex()
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def _full_lex(self) -> None:
+        try:
+            self.spans = [[f, l, 0, t, None, None] for f, l, t in logical_lines_with_spans(lex(self.text))]
+            self.lex_error = None
+            self._dirty = 0
+        except SyntaxError as e:
+            self.spans = None
+            self.lex_error = e
+        self.relexed_lines = len(self.lines)
+
+    def set_text(self, text: str, version: int) -> None:
+        self.version = version
+        self.lines = text.split("\n")
+        self._full_lex()
+
+    def apply_change(self, change: dict, version: int) -> None:
+        self.version = version
+        rng = change.get("range")
+        if rng is None:
+            self.set_text(change["text"], version)
+            return
+
+        last_idx = len(self.lines) - 1
+        sl = min(rng["start"]["line"], last_idx)
+        el = min(rng["end"]["line"], last_idx)
+        start_line = self.lines[sl]
+        end_line = self.lines[el]
+        prefix = start_line[:_utf16_to_index(start_line, rng["start"]["character"])]
+        suffix = end_line[_utf16_to_index(end_line, rng["end"]["character"]):]
+
+        new = (prefix + change["text"] + suffix).split("\n")
+        self.lines[sl:el + 1] = new
+        self._relex(sl + 1, el + 1, len(new) - (el - sl + 1))
+
+    def _relex(self, a: int, b: int, delta: int) -> None:
+        """
+        Old physical lines a..b (1-based) were replaced; line count changed by delta.
+        """
+        spans = self.spans
+        if spans is None:
+            self._full_lex()
+            return
+
+        i0 = bisect.bisect_left(spans, a, key=lambda s: s[1])
+        if i0 == len(spans) and spans:
+            # edit past the last span: that span may not be closed by a NEWLINE
+            # (EOF, or open parens), so it has to be re-lexed too
+            i0 -= 1
+        s0 = spans[i0][0] if spans else 1
+        j = bisect.bisect_left(spans, b + 1, key=lambda s: s[0])
+
+        base = s0 - 1
+        text = "\n".join(self.lines[base:])
+        new_spans: list[list] = []
+        k = j
+        try:
+            for first, last, toks in logical_lines_with_spans(lex(text)):
+                first += base
+                last += base
+                new_spans.append([first, last, base, toks, None, None])
+                if last < b + delta:
+                    continue
+                next_old = last + 1 - delta
+                while k < len(spans) and spans[k][0] < next_old:
+                    k += 1
+                if k < len(spans) and spans[k][0] == next_old:
+                    tail = spans[k:]
+                    if delta:
+                        for sp in tail:
+                            sp[0] += delta
+                            sp[1] += delta
+                            sp[2] += delta
+                    self.spans = spans[:i0] + new_spans + tail
+                    self.relexed_lines = last - base
+                    self._dirty = min(self._dirty, i0)
+                    return
+        except SyntaxError as e:
+            if e.lineno is not None:
+                e.lineno += base  # lexed from line base + 1
+            self.spans = None
+            self.lex_error = e
+            return
+
+        self.spans = spans[:i0] + new_spans
+        self.relexed_lines = len(self.lines) - base
+        self._dirty = min(self._dirty, i0)
+
+    def logical_lines(self):
+        """
+        Cached logical lines with absolute token positions (input for transform).
+        """
+        for _first, _last, offset, toks, *_ in self.spans or ():
+            if offset:
+                yield [(k, v, ln + offset, col) for k, v, ln, col in toks]
+            else:
+                yield toks
+
+    def events(self) -> Optional[list]:
+        """
+        transform's events with absolute positions, or None if the document doesn't
+        preprocess (a lex or transform error - left to check_text to report).
+        """
+        spans = self.spans
+        if spans is None:
+            return None
+        n = len(spans)
+        k = self._dirty
+        self.retransformed = 0
+        if k < n:
+            state = _state_at(spans[k - 1]) if k else TransformState()
+            try:
+                while k < n:
+                    span = spans[k]
+                    offset = span[2]
+                    old = span[5]
+                    toks = span[3]
+                    if offset:
+                        toks = [(kd, v, ln + offset, col) for kd, v, ln, col in toks]
+                    events = list(transform([toks], state=state))
+                    # stored like the tokens: relative to the span's offset
+                    span[4] = [_shifted(e, -offset) for e in events] if offset else events
+                    span[5] = _shifted_state(state, -offset)
+                    self.retransformed += 1
+                    k += 1
+                    if old is not None and _same_future(old, state):
+                        # the spans up to the next re-lexed one keep their events
+                        while k < n and spans[k][4] is not None:
+                            k += 1
+                        if k < n:
+                            state = _state_at(spans[k - 1])
+            except SyntaxError:
+                spans[k][4] = spans[k][5] = None
+                self._dirty = k
+                return None
+            self._dirty = n
+        if n and spans[-1][5].stack:
+            return None  # a block still open at EOF
+
+        out: list = []
+        for _first, _last, offset, _toks, events, _state in spans:
+            if offset:
+                out.extend(_shifted(e, offset) for e in events)
+            else:
+                out.extend(events)
+        return out
+
+
+def _shifted(event, delta: int):
+    kind, payload = event
+    if payload is None:
+        return event
+    if kind == E_CLOSE:
+        k, v, ln, col = payload
+        return kind, (k, v, ln + delta, col)
+    return kind, [(k, v, ln + delta, col) for k, v, ln, col in payload]
+
+
+def _shifted_state(state: TransformState, delta: int) -> TransformState:
+    out = state.copy()
+    if delta:
+        out.stack = [((k, v, ln + delta, col), has_body) for (k, v, ln, col), has_body in out.stack]
+    return out
+
+
+def _state_at(span) -> TransformState:
+    # transform state after `span`, with absolute positions
+    return _shifted_state(span[5], span[2])
+
+
+def _same_future(old: TransformState, new: TransformState) -> bool:
+    """
+    The lines after a span transform the same from `new` as from `old`: same literal
+    depth and open blocks, none of them still empty (its 'pass' token would carry
+    the position of its '{').
+    """
+    return (
+        old.literal_depth == new.literal_depth and len(old.stack) == len(new.stack)
+        and all(has_body for _, has_body in old.stack) and all(has_body for _, has_body in new.stack)
+    )
+
+
+def diagnose(doc: Document, *, indent: str = "    ") -> list[dict]:
+    """
+    check_text on the document's cached logical lines and events, so the
+    diagnostics are exactly typan-check's; only errors pay for a full re-run.
+    """
+    if doc.spans is None:
+        doc._full_lex()
+    text = doc.text
+    if doc.spans is None:
+        pipeline = PipelineResult(text, indent=indent)
+    else:
+        pipeline = PipelineResult(text, indent=indent, lines=list(doc.logical_lines()), events=doc.events())
+    result = check_text(text, indent=indent, pipeline=pipeline)
+    return [
+        _diagnostic(doc, (d.lineno, d.col or 1) if d.lineno else None, d.raw_message, d.stage)
+        for d in result.diagnostics
+    ]
+
+
+def _diagnostic(doc: Document, loc, message: str, stage: str) -> dict:
+    if loc is None:
+        line, char = 0, 0
+    else:
+        line = max(0, min(loc[0] - 1, len(doc.lines) - 1))
+        src = doc.lines[line]
+        char = _index_to_utf16(src, max(0, min(loc[1] - 1, len(src))))
+    pos = {"line": line, "character": char}
+    return {
+        "range": {"start": pos, "end": {"line": line, "character": char + 1}},
+        "severity": _SEVERITY_ERROR,
+        "source": f"typan ({stage})",
+        "message": message,
+    }
+
+
+def _split_keepends(s: str) -> list[str]:
+    parts = s.split("\n")
+    out = [p + "\n" for p in parts[:-1]]
+    if parts[-1]:
+        out.append(parts[-1])
+    return out
+
+
+def _edit_between(old: str, new: str) -> list[dict]:
+    """
+    One TextEdit replacing only the lines that differ.
+    """
+    if old == new:
+        return []
+    a = _split_keepends(old)
+    b = _split_keepends(new)
+    lo = 0
+    while lo < len(a) and lo < len(b) and a[lo] == b[lo]:
+        lo += 1
+    hi_a, hi_b = len(a), len(b)
+    while hi_a > lo and hi_b > lo and a[hi_a - 1] == b[hi_b - 1]:
+        hi_a -= 1
+        hi_b -= 1
+    return [{
+        "range": {"start": {"line": lo, "character": 0}, "end": {"line": hi_a, "character": 0}},
+        "newText": "".join(b[lo:hi_b]),
+    }]
+
+
+# ------------------------------------------------------------
+# server
+# ------------------------------------------------------------
+
+class LanguageServer:
+    """
+    Minimal typan language server: incremental sync, debounced diagnostics,
+    document + range formatting.
+    """
+
+    def __init__(self, out: BinaryIO, *, debounce: float = 0.3, indent: str = "    "):
+        self.out = out
+        self.debounce = debounce
+        self.indent = indent
+        self.docs: dict[str, Document] = {}
+        self.shutdown_requested = False
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timers: dict[str, threading.Timer] = {}
+
+    def send(self, msg: dict) -> None:
+        msg["jsonrpc"] = "2.0"
+        with self._write_lock:
+            write_message(self.out, msg)
+
+    # ---- diagnostics ----
+
+    def publish(self, uri: str) -> None:
+        with self._lock:
+            doc = self.docs.get(uri)
+            if doc is None:
+                return
+            diags = diagnose(doc, indent=self.indent)
+            version = doc.version
+        self.send({
+            "method": "textDocument/publishDiagnostics",
+            "params": {"uri": uri, "version": version, "diagnostics": diags},
+        })
+
+    def schedule(self, uri: str) -> None:
+        old = self._timers.pop(uri, None)
+        if old is not None:
+            old.cancel()
+        if self.debounce <= 0:
+            self.publish(uri)
+            return
+        t = threading.Timer(self.debounce, self.publish, args=(uri,))
+        t.daemon = True
+        self._timers[uri] = t
+        t.start()
+
+    # ---- dispatch ----
+
+    def handle(self, msg: dict) -> bool:
+        """
+        Returns False when the client sent `exit`.
+        """
+        method = msg.get("method")
+        params = msg.get("params") or {}
+        msg_id = msg.get("id")
+
+        if method == "exit":
+            return False
+
+        handler = getattr(self, "_on_" + (method or "").replace("/", "_").replace("$", "_"), None)
+        if handler is None:
+            if msg_id is not None and method is not None:
+                self.send({"id": msg_id, "error": {"code": _METHOD_NOT_FOUND, "message": f"unknown method {method}"}})
+            return True
+
+        try:
+            result = handler(params)
+        except Exception as e:
+            # a malformed message must not take the server down
+            if msg_id is not None:
+                code = _INVALID_PARAMS if isinstance(e, (KeyError, TypeError, ValueError)) else _INTERNAL_ERROR
+                self.send({"id": msg_id, "error": {"code": code, "message": f"{method}: {type(e).__name__}: {e}"}})
+            return True
+        if msg_id is not None:
+            self.send({"id": msg_id, "result": result})
+        return True
+
+    def _on_initialize(self, params):
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": _SYNC_INCREMENTAL},
+                "documentFormattingProvider": True,
+                "documentRangeFormattingProvider": True,
+            },
+            "serverInfo": {"name": "typan"},
+        }
+
+    def _on_initialized(self, params):
+        return None
+
+    def _on_shutdown(self, params):
+        self.shutdown_requested = True
+        for t in self._timers.values():
+            t.cancel()
+        return None
+
+    def _on_textDocument_didOpen(self, params):
+        td = params["textDocument"]
+        with self._lock:
+            self.docs[td["uri"]] = Document(td["uri"], td["text"], td.get("version", 0))
+        self.schedule(td["uri"])
+
+    def _on_textDocument_didChange(self, params):
+        uri = params["textDocument"]["uri"]
+        version = params["textDocument"].get("version", 0)
+        with self._lock:
+            doc = self.docs.get(uri)
+            if doc is None:
+                return None
+            for change in params.get("contentChanges", []):
+                doc.apply_change(change, version)
+        self.schedule(uri)
+
+    def _on_textDocument_didClose(self, params):
+        uri = params["textDocument"]["uri"]
+        with self._lock:
+            self.docs.pop(uri, None)
+        t = self._timers.pop(uri, None)
+        if t is not None:
+            t.cancel()
+        self.send({"method": "textDocument/publishDiagnostics", "params": {"uri": uri, "diagnostics": []}})
+
+    def _on_textDocument_formatting(self, params):
+        with self._lock:
+            doc = self.docs.get(params["textDocument"]["uri"])
+            if doc is None:
+                return []
+            src = doc.text
+        try:
+            return _edit_between(src, format_text(src, indent=self.indent))
+        except SyntaxError:
+            return []
+
+    def _on_textDocument_rangeFormatting(self, params):
+        with self._lock:
+            doc = self.docs.get(params["textDocument"]["uri"])
+            if doc is None:
+                return []
+            src = doc.text
+        rng = params["range"]
+        start = rng["start"]["line"] + 1
+        end = rng["end"]["line"] + (0 if rng["end"]["character"] == 0 else 1)
+        end = max(start, end)
+        try:
+            return _edit_between(src, format_range(src, start, end, indent=self.indent))
+        except (SyntaxError, ValueError):
+            return []
+
+
+def serve(stdin: BinaryIO, stdout: BinaryIO, *, debounce: float = 0.3) -> int:
+    server = LanguageServer(stdout, debounce=debounce)
+    while True:
+        try:
+            msg = read_message(stdin)
+        except ValueError:
+            server.send({"id": None, "error": {"code": _INVALID_REQUEST, "message": "invalid message"}})
+            continue
+        if msg is None:
+            break
+        if not server.handle(msg):
+            break
+    # LSP: exit code 0 only after a shutdown request
+    return 0 if server.shutdown_requested else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    p = argparse.ArgumentParser(prog="typan lsp", description="typan lsp: language server over stdio.")
+    p.add_argument("--debounce", type=float, default=0.3, help="Diagnostics delay in seconds after the last change (default: 0.3).")
+    args = p.parse_args(argv)
+    return serve(sys.stdin.buffer, sys.stdout.buffer, debounce=args.debounce)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
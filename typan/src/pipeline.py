@@ -0,0 +1,188 @@
+# pipeline.py
+from __future__ import annotations
+
+import ast
+import time
+
+from lex import lex
+from lines import logical_lines
+from transform import transform
+from emit import emit
+from preprocess import _located
+from instrument import current, stage
+from sourcemap import SourceMap
+from limits import Budget, Limits
+
+
+class PipelineResult:
+    """
+    All stages of the typan pipeline for ONE source, computed lazily and at most once:
+
+        tokens -> lines (logical lines) -> events -> output -> code
+                                          events -> source_map (output -> .tp positions)
+
+    check_text, format_text and the CLIs share one instance, so a source is lexed
+    exactly once per invocation no matter how many consumers need it.
+    A stage that failed re-raises the same PreprocessError (with the source
+    attached, so str() renders it like preprocess_text) instead of being recomputed.
+
+    limits: checked while the stages run (errors.LimitExceeded); the timeout
+    counts from the creation of the instance.
+    lines / events: stages already computed for `text` elsewhere (lsp.Document
+    keeps them up to date incrementally); they are used as they are.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        *,
+        indent: str = "    ",
+        preserve_lines: bool = False,
+        minify: bool = False,
+        limits: Limits | None = None,
+        lines: list | None = None,
+        events: list | None = None,
+    ):
+        self.text = text
+        self.indent = indent
+        self.preserve_lines = preserve_lines
+        self.minify = minify
+        self._tokens: list | None = None
+        self._lines: list | None = lines
+        self._events: list | None = events
+        self._output: str | None = None
+        self._code = None
+        self._code_remapped = False
+        self._source_map: SourceMap | None = None
+        self._error: SyntaxError | None = None
+        self.budget: Budget | None = limits.start() if limits is not None else None
+
+    def _fail(self, e: SyntaxError) -> SyntaxError:
+        self._error = _located(self.text, e)
+        return self._error
+
+    @property
+    def tokens(self) -> list:
+        if self._tokens is None:
+            if self._error is not None:
+                raise self._error
+            prof = current()
+            t0 = time.perf_counter() if prof else 0.0
+            budget = self.budget
+            if budget is not None:
+                budget.check_input(self.text)
+            try:
+                tokens = lex(self.text)
+                self._tokens = list(tokens if budget is None else budget.tokens(tokens))
+            except SyntaxError as e:
+                raise self._fail(e) from None
+            if prof:
+                prof.add_stage("lex", time.perf_counter() - t0)
+                prof.sources += 1
+                prof.input_bytes += len(self.text.encode("utf-8"))
+                prof.tokens += len(self._tokens)
+        return self._tokens
+
+    @property
+    def lines(self) -> list:
+        if self._lines is None:
+            tokens = self.tokens
+            prof = current()
+            t0 = time.perf_counter() if prof else 0.0
+            lines = logical_lines(tokens)
+            self._lines = list(lines if self.budget is None else self.budget.lines(lines))
+            if prof:
+                prof.add_stage("logical_lines", time.perf_counter() - t0)
+                prof.logical_lines += len(self._lines)
+        return self._lines
+
+    @property
+    def events(self) -> list:
+        if self._events is None:
+            lines = self.lines
+            if self._error is not None:
+                raise self._error
+            prof = current()
+            t0 = time.perf_counter() if prof else 0.0
+            try:
+                events = transform(lines)
+                self._events = list(events if self.budget is None else self.budget.events(events))
+            except SyntaxError as e:
+                raise self._fail(e) from None
+            if prof:
+                prof.add_stage("transform", time.perf_counter() - t0)
+                prof.add_events(self._events)
+        return self._events
+
+    @property
+    def output(self) -> str:
+        if self._output is None:
+            events = self.events
+            if self.budget is not None:
+                self.budget.check_time()
+            prof = current()
+            t0 = time.perf_counter() if prof else 0.0
+            self._output = emit(events, indent_str=self.indent, preserve_lines=self.preserve_lines, minify=self.minify)
+            if prof:
+                prof.add_stage("emit", time.perf_counter() - t0)
+                prof.output_bytes += len(self._output.encode("utf-8"))
+        return self._output
+
+    @property
+    def source_map(self) -> SourceMap:
+        """
+        Output -> source positions; a second emit pass that records where every token lands.
+        """
+        if self._source_map is None:
+            events = self.events
+            out = self.output
+            with stage("source_map"):
+                positions: list = []
+                emit(
+                    events,
+                    indent_str=self.indent,
+                    preserve_lines=self.preserve_lines,
+                    minify=self.minify,
+                    positions=positions,
+                )
+                self._source_map = SourceMap(positions, self.text, out)
+        return self._source_map
+
+    def compile(self, filename: str = "<typan>", *, remap: bool = True):
+        """
+        Code object for the output (cached).
+
+        remap=True: line/column positions are .tp positions - the output is
+        parsed, every AST node is moved back through source_map, then compiled,
+        so tracebacks, warnings and profilers show the .tp lines (compiler,
+        importer). remap=False: a plain compile() of the output, positions are
+        output positions - the cheap path for checks that only need the verdict
+        (check_text); the source map is only built if there's an error to move.
+        SyntaxErrors are raised in source coordinates either way.
+        """
+        code = self._code
+        if code is None or code.co_filename != filename or (remap and not self._code_remapped):
+            out = self.output
+            if self.budget is not None:
+                self.budget.check_time()
+            with stage("compile"):
+                if not remap:
+                    try:
+                        self._code = compile(out, filename, "exec", dont_inherit=True)
+                    except SyntaxError as e:
+                        raise self.source_map.remap_error(e)
+                    self._code_remapped = False
+                    return self._code
+                smap = self.source_map
+                try:
+                    tree = compile(out, filename, "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
+                except SyntaxError as e:
+                    raise smap.remap_error(e)
+                smap.remap_tree(tree)
+                try:
+                    self._code = compile(tree, filename, "exec", dont_inherit=True)
+                except SyntaxError as e:
+                    # found on the remapped tree ('return' outside function...): already .tp positions
+                    raise smap.attach_text(e)
+                self._code_remapped = True
+        return self._code
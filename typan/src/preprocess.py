@@ -2,40 +2,87 @@ from __future__ import annotations
 
 from lex import lex
 from lines import logical_lines
-from errors import format_error
+from errors import PreprocessError, syntax_error_location
 from transform import transform
 from emit import emit
+from instrument import current
+from limits import Budget, Limits
 
 
-def preprocess_text(text: str, *, indent: str = "    ") -> str:
+def _located(text: str, e: SyntaxError) -> SyntaxError:
+    # attach the source so str(e) renders the line and a caret (lazily)
+    if isinstance(e, PreprocessError):
+        return e.with_source(text)
+    msg = e.args[0] if e.args else "SyntaxError"
+    loc = syntax_error_location(e)
+    if loc is not None:
+        return PreprocessError(msg, loc[0], loc[1], text)
+    return e
+
+
+def collect_errors(
+    text: str,
+    *,
+    indent: str = "    ",
+    positions: list | None = None,
+    budget: Budget | None = None,
+) -> tuple[list[PreprocessError], str]:
+    """
+    One recovering pass (lex + transform with an error sink) instead of
+    stopping at the first error: (every preprocess error in source order,
+    best-effort output). The output is only meant for finding further
+    Python errors - it is not what the user wrote. positions: filled with
+    the output's source map segments (see emit). budget: a running
+    limits.Budget to keep enforcing.
+    """
+    errors: list[PreprocessError] = []
+    tokens = lex(text, errors)
+    if budget is not None:
+        budget.check_input(text)
+        tokens = budget.tokens(tokens)
+    lines = logical_lines(tokens)
+    if budget is not None:
+        lines = budget.lines(lines)
+    events = transform(lines, errors)
+    if budget is not None:
+        events = budget.events(events)
+    out = emit(events, indent_str=indent, positions=positions)
+    errors.sort(key=lambda e: (e.lineno or 0, e.offset or 0))
+    return [e.with_source(text) for e in errors], out
+
+
+def preprocess_text(
+    text: str,
+    *,
+    indent: str = "    ",
+    preserve_lines: bool = False,
+    minify: bool = False,
+    limits: Limits | None = None,
+) -> str:
+    """
+    preserve_lines=True: line N of the output is line N of `text` (closing braces
+    become blank lines, inline blocks single-line suites), so tracebacks and
+    compile errors point at the .tp line without any mapping.
+    minify=True: smallest output for deployment - no comments or blank lines,
+    1-space indent, simple statements joined with ';' (`indent` is ignored).
+    limits: raises errors.LimitExceeded when one is hit.
+    """
+    if current() is not None or limits is not None:
+        # profiling / limits: go through PipelineResult, which times and checks every stage
+        from pipeline import PipelineResult
+        p = PipelineResult(text, indent=indent, preserve_lines=preserve_lines, minify=minify, limits=limits)
+        return p.output
+
     try:
         tokens = lex(text)
         lines = logical_lines(tokens)
         events = transform(lines)
-        return emit(events, indent_str=indent)
+        return emit(events, indent_str=indent, preserve_lines=preserve_lines, minify=minify)
     except SyntaxError as e:
-        # try extract "at line X, col Y" from args? we have better: raise SyntaxError with known coords.
-        # We'll support two patterns:
-        # 1) e.args[0] contains "... line {ln}, col {col}"
-        # 2) e has attributes lineno/offset (sometimes)
-        msg = e.args[0] if e.args else "SyntaxError"
-
-        # Prefer lineno/offset if present
-        ln = getattr(e, "lineno", None)
-        col = getattr(e, "offset", None)
-
-        # Fallback: parse simple pattern we use in transform
-        if ln is None or col is None:
-            import re
-            m = re.search(r"line\s+(\d+),\s*col\s+(\d+)", msg)
-            if m:
-                ln = int(m.group(1))
-                col = int(m.group(2))
-
-        if ln is not None and col is not None:
-            raise SyntaxError(format_error(text, ln, col, msg)) from None
-
-        raise
+        err = _located(text, e)
+        if err is e:
+            raise
+        raise err from None
 
 
 def preprocess_file(in_path: str, out_path: str, *, indent: str = "    ") -> None:
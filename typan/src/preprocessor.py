@@ -0,0 +1,221 @@
+# preprocessor.py
+# Many small documents with the same options: the in-process counterpart of the
+# CLI multi-file mode (batch.py).
+#
+#   with Preprocessor(indent="  ", cache=1024) as pre:
+#       for out in pre.preprocess_many(docs, jobs=4):
+#           ...
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Union
+
+from batch import make_executor
+from cache import ResultCache
+from errors import LimitExceeded
+from instrument import current, run_profiled
+from limits import Limits
+from preprocess import preprocess_text
+
+# errors that belong to one document; anything else is a bug and propagates
+_DOC_ERRORS = (SyntaxError, LimitExceeded)
+
+
+def _preprocess_chunk(options: dict, texts: list[str]) -> list:
+    """
+    Pool worker: one result per text, a document's error is returned in its place.
+    """
+    out = []
+    for text in texts:
+        try:
+            out.append(preprocess_text(text, **options))
+        except _DOC_ERRORS as e:
+            out.append(e)
+    return out
+
+
+class Preprocessor:
+    """
+    preprocess_text with its options bound once, plus what pays off across
+    thousands of calls:
+
+      - cache: an LRU of outputs keyed on sha1(options + text) (an int size, or a
+        cache.ResultCache to share one between instances, whatever their options; 0 = off);
+      - preprocess_many(): streams results in input order, optionally from a
+        worker pool that is started once and reused until close(). Texts are
+        shipped in chunks of `chunksize` to keep IPC overhead low. The pool is
+        a process pool, or threads on a free-threaded build (threads=None, see
+        batch.make_executor; True/False forces one).
+
+    Options are the preprocess_text keywords (indent, preserve_lines, minify, limits).
+    """
+
+    def __init__(
+        self,
+        *,
+        indent: str = "    ",
+        preserve_lines: bool = False,
+        minify: bool = False,
+        limits: Optional[Limits] = None,
+        cache: Union[int, ResultCache] = 0,
+        threads: Optional[bool] = None,
+    ):
+        self.options = {"indent": indent, "preserve_lines": preserve_lines, "minify": minify, "limits": limits}
+        # the options are part of every cache key: a shared cache must not hand
+        # a 4-space output to an instance with indent="  "
+        self._key_prefix = repr(sorted(self.options.items())).encode("utf-8") + b"\0"
+        if isinstance(cache, ResultCache):
+            self.cache: Optional[ResultCache] = cache
+        else:
+            self.cache = ResultCache(cache) if cache > 0 else None
+        self.threads = threads
+        self._executor = None
+        self._jobs = 0
+
+    def preprocess(self, text: str) -> str:
+        if self.cache is None:
+            return preprocess_text(text, **self.options)
+        key = _key(self._key_prefix, text)
+        out = self.cache.get(key)
+        if out is None:
+            out = preprocess_text(text, **self.options)
+            self.cache.put(key, out)
+        return out
+
+    __call__ = preprocess
+
+    def preprocess_many(
+        self,
+        texts: Iterable[str],
+        *,
+        jobs: Optional[int] = 1,
+        chunksize: int = 64,
+        return_exceptions: bool = False,
+    ) -> Iterator[Union[str, Exception]]:
+        """
+        Yield the output of every text, in input order. `texts` is consumed lazily
+        (at most 2 * jobs chunks ahead), so it can be a generator over a huge corpus.
+
+        jobs: workers (None: CPU count); 1 runs in the calling thread.
+        return_exceptions: yield a document's SyntaxError / LimitExceeded in its
+        place instead of raising it (and ending the stream).
+        """
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        if jobs <= 1:
+            for text in texts:
+                try:
+                    yield self.preprocess(text)
+                except _DOC_ERRORS as e:
+                    if not return_exceptions:
+                        raise
+                    yield e
+            return
+
+        executor = self._pool(jobs)
+        pending: deque = deque()
+        try:
+            for chunk in _chunks(texts, chunksize):
+                pending.append(self._submit(executor, chunk))
+                if len(pending) >= 2 * jobs:
+                    yield from self._collect(pending.popleft(), return_exceptions)
+            while pending:
+                yield from self._collect(pending.popleft(), return_exceptions)
+        finally:
+            # consumer stopped early (or an error was raised): drop the queued chunks
+            for *_, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def close(self, *, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            self._jobs = 0
+
+    def __enter__(self) -> "Preprocessor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _pool(self, jobs: int):
+        if self._executor is None or self._jobs != jobs:
+            self.close()
+            self._executor = make_executor(jobs, threads=self.threads)
+            self._jobs = jobs
+        return self._executor
+
+    def _submit(self, executor, chunk: list[str]) -> tuple:
+        # cache hits are answered here; only the misses travel to a worker
+        results: list = [None] * len(chunk)
+        keys: list = []
+        misses: list[int] = []
+        for i, text in enumerate(chunk):
+            if self.cache is not None:
+                key = _key(self._key_prefix, text)
+                out = self.cache.get(key)
+                if out is not None:
+                    results[i] = out
+                    continue
+                keys.append(key)
+            misses.append(i)
+        future = None
+        if misses:
+            work = [chunk[i] for i in misses]
+            if current() is not None:
+                # worker profiles are merged into the active one (see batch.run_pool)
+                future = executor.submit(run_profiled, _preprocess_chunk, self.options, work)
+            else:
+                future = executor.submit(_preprocess_chunk, self.options, work)
+        return results, misses, keys, future
+
+    def _collect(self, entry: tuple, return_exceptions: bool) -> Iterator:
+        results, misses, keys, future = entry
+        if future is not None:
+            done = future.result()
+            if isinstance(done, tuple):  # submitted through run_profiled
+                done, worker_prof = done
+                prof = current()
+                if prof is not None:
+                    prof.merge(worker_prof)
+            for n, (i, out) in enumerate(zip(misses, done)):
+                results[i] = out
+                if self.cache is not None and isinstance(out, str):
+                    self.cache.put(keys[n], out)
+        for out in results:
+            if isinstance(out, Exception) and not return_exceptions:
+                raise out
+            yield out
+
+
+def _key(prefix: bytes, text: str) -> bytes:
+    return hashlib.sha1(prefix + text.encode("utf-8")).digest()
+
+
+def _chunks(texts: Iterable[str], size: int) -> Iterator[list[str]]:
+    it = iter(texts)
+    size = max(1, size)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def preprocess_many(
+    texts: Iterable[str],
+    *,
+    jobs: Optional[int] = 1,
+    chunksize: int = 64,
+    return_exceptions: bool = False,
+    **options,
+) -> Iterator[Union[str, Exception]]:
+    """
+    One-shot Preprocessor(**options).preprocess_many(...); the pool lives as long as the iteration.
+    """
+    with Preprocessor(**options) as pre:
+        yield from pre.preprocess_many(texts, jobs=jobs, chunksize=chunksize, return_exceptions=return_exceptions)
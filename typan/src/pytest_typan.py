@@ -0,0 +1,195 @@
+# pytest_typan.py
+# pytest plugin: collect test_*.tp (and test_*.tp.py) files directly, no convert step.
+#
+#   pytest -p pytest_typan            # or automatically, once typan is installed (pytest11 entry point)
+#
+# Each test file is preprocessed with preserve_lines (line N of the code is line N
+# of the .tp file), assert-rewritten like a .py test module and compiled with the
+# .tp filename, so failures and tracebacks point at the .tp source. The compiled
+# code is cached in .pytest_cache/d/typan, keyed on the content hash: an
+# unchanged suite is collected from marshal data, as pytest does for .py files.
+# Cache entries are written atomically, so `pytest -n` workers can share them.
+from __future__ import annotations
+
+import ast
+import hashlib
+import importlib
+import importlib.util
+import marshal
+import os
+import sys
+from fnmatch import fnmatch
+from pathlib import Path
+
+import pytest
+
+import importer
+from importer import TpLoader
+from preprocess import preprocess_text
+
+# modules whose code decides the output; their sources (plus the Python magic
+# number and the pytest version) are part of the cache key
+_PIPELINE = ("lex", "lines", "transform", "emit", "preprocess", "pytest_typan")
+
+_fingerprint: bytes | None = None
+
+
+def _pipeline_fingerprint() -> bytes:
+    global _fingerprint
+    if _fingerprint is None:
+        h = hashlib.sha1(importlib.util.MAGIC_NUMBER)
+        # the assertion rewrite is baked into the cached code and changes between
+        # pytest versions (pytest's own .pyc tag carries its version too)
+        h.update(pytest.__version__.encode("ascii"))
+        for name in _PIPELINE:
+            h.update(Path(sys.modules[name].__file__).read_bytes())
+        _fingerprint = h.digest()
+    return _fingerprint
+
+
+def _is_test_file(path: Path, parent) -> bool:
+    # test_x.tp matches the python_files patterns as test_x.py would
+    if parent.session.isinitpath(path):
+        return True
+    name = path.name[: -len(".tp")] + ".py"
+    return any(fnmatch(name, pattern) for pattern in parent.config.getini("python_files"))
+
+
+def pytest_collect_file(file_path: Path, parent):
+    if file_path.suffix == ".tp" and _is_test_file(file_path, parent):
+        return TpModule.from_parent(parent, path=file_path)
+    return None
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pycollect_makemodule(module_path: Path, parent):
+    # test_x.tp.py passes the regular python_files check; it must not be imported as Python
+    if module_path.name.endswith(".tp.py"):
+        return TpModule.from_parent(parent, path=module_path)
+    return None
+
+
+def pytest_configure(config) -> None:
+    # plain `import helpers` of a helpers.tp next to the tests
+    if not importer.installed():
+        importer.install()
+        config.add_cleanup(importer.uninstall)
+
+
+class TpTestLoader(TpLoader):
+    """
+    TpLoader for test modules: assert rewriting + the compiled-code cache.
+    """
+
+    def __init__(self, fullname: str, path: str, config):
+        super().__init__(fullname, path)
+        self.config = config
+
+    def source_to_code(self, data, path, *, _optimize=-1):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        rewrite = self.config.getoption("assertmode") == "rewrite"
+        cache = getattr(self.config, "cache", None)  # None with -p no:cacheprovider
+        cache_dir = cache.mkdir("typan") if cache is not None else None
+
+        key = hashlib.sha1(_pipeline_fingerprint())
+        key.update(f"{path}\0{rewrite}\0".encode("utf-8", "surrogateescape"))
+        key.update(data)
+        cached = cache_dir / f"{key.hexdigest()}.code" if cache_dir is not None else None
+        if cached is not None:
+            try:
+                return marshal.loads(cached.read_bytes())
+            except (OSError, EOFError, ValueError, TypeError):
+                pass
+
+        out = preprocess_text(data.decode("utf-8"), indent=self.indent, preserve_lines=True)
+        tree = ast.parse(out, filename=path)
+        if rewrite:
+            from _pytest.assertion.rewrite import rewrite_asserts
+
+            rewrite_asserts(tree, out.encode("utf-8"), path, self.config)
+        code = compile(tree, path, "exec", dont_inherit=True)
+
+        if cached is not None:
+            tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+            try:
+                tmp.write_bytes(marshal.dumps(code))
+                os.replace(tmp, cached)  # atomic: concurrent xdist workers see all or nothing
+            except OSError:
+                pass
+        return code
+
+
+def _module_name(path: Path) -> tuple[Path, str]:
+    """
+    (directory to put on sys.path, dotted module name), with packages marked by
+    __init__.py or __init__.tp - pytest's rootdir-less "prepend" resolution.
+    """
+    name = path.name
+    for suffix in importer.SOURCE_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    parts = [name]
+    root = path.parent
+    while any((root / f"__init__{s}").is_file() for s in (".py", *importer.SOURCE_SUFFIXES)):
+        parts.append(root.name)
+        root = root.parent
+    return root, ".".join(reversed(parts))
+
+
+class TpModule(pytest.Module):
+    """
+    A typan test file. Imported per --import-mode like a .py test module.
+    """
+
+    def _getobj(self):
+        try:
+            return self._import_tp()
+        except SyntaxError as e:
+            raise self.CollectError(f"{self.path}: {e}") from e
+        except ImportError as e:
+            exc_info = pytest.ExceptionInfo.from_current()
+            raise self.CollectError(
+                f"ImportError while importing test module '{self.path}'.\n"
+                f"Traceback:\n{exc_info.getrepr(style='short')}"
+            ) from e
+
+    def _import_tp(self):
+        config = self.config
+        mode = str(config.getoption("importmode"))
+        root, name = _module_name(self.path)
+        if mode == "importlib":
+            from _pytest.pathlib import module_name_from_path
+
+            name = module_name_from_path(self.path.with_name(name.rpartition(".")[2]), config.rootpath)
+        elif mode == "append":
+            if str(root) not in sys.path:
+                sys.path.append(str(root))
+        elif sys.path[:1] != [str(root)]:
+            sys.path.insert(0, str(root))
+
+        mod = sys.modules.get(name)
+        if mod is not None:
+            if os.path.samefile(getattr(mod, "__file__", "") or os.devnull, self.path):
+                return mod
+            raise self.CollectError(
+                f"import file mismatch: module {name!r} is already imported from "
+                f"{mod.__file__}, not {self.path}\n"
+                "HINT: use a unique basename for your test file modules"
+            )
+
+        package = name.rpartition(".")[0]
+        if package and mode != "importlib":
+            importlib.import_module(package)
+        loader = TpTestLoader(name, str(self.path), config)
+        spec = importlib.util.spec_from_file_location(name, str(self.path), loader=loader)
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod
+        try:
+            loader.exec_module(mod)
+        except BaseException:
+            del sys.modules[name]
+            raise
+        config.pluginmanager.consider_module(mod)
+        return mod
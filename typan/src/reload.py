@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import importlib
+import os
+import sys
+import threading
+from typing import Callable, Optional
+
+from importer import is_tp_module
+
+
+def _stat_key(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _digest(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=16).digest()
+    except OSError:
+        return None
+
+
+class Reloader:
+    """
+    Hot reload for already-imported .tp modules (see importer.install()).
+
+    check() stats the source file of every .tp module in sys.modules; only files whose
+    stat AND content hash changed are reloaded via importlib.reload, which runs
+    preprocess + compile for that one module. Unchanged modules are never reprocessed.
+
+    on_reload(module) is called after a successful reload,
+    on_error(module, exc) when the new source fails (the old module stays in place).
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.5,
+        on_reload: Optional[Callable[[object], None]] = None,
+        on_error: Optional[Callable[[object, BaseException], None]] = None,
+    ):
+        self.interval = interval
+        self._on_reload = [on_reload] if on_reload else []
+        self._on_error = [on_error] if on_error else []
+        self._seen: dict[str, tuple[tuple[int, int] | None, bytes | None]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_callback(self, fn: Callable[[object], None]) -> None:
+        self._on_reload.append(fn)
+
+    def add_error_callback(self, fn: Callable[[object, BaseException], None]) -> None:
+        self._on_error.append(fn)
+
+    def _tracked(self) -> list[tuple[str, object, str]]:
+        out = []
+        for name, module in list(sys.modules.items()):
+            if module is None or not is_tp_module(module):
+                continue
+            path = getattr(module, "__file__", None)
+            if path:
+                out.append((name, module, path))
+        return out
+
+    def check(self) -> list[object]:
+        """
+        One polling pass. Returns the list of modules that were reloaded.
+        """
+        reloaded = []
+        with self._lock:
+            for name, module, path in self._tracked():
+                key = _stat_key(path)
+                prev = self._seen.get(name)
+                if prev is None:
+                    # first time we see it: remember, don't reload
+                    self._seen[name] = (key, _digest(path))
+                    continue
+                if prev[0] == key:
+                    continue
+
+                digest = _digest(path)
+                self._seen[name] = (key, digest)
+                if digest == prev[1]:
+                    # touched, not edited
+                    continue
+
+                try:
+                    module = importlib.reload(module)
+                except Exception as e:
+                    for fn in self._on_error:
+                        fn(module, e)
+                    continue
+
+                reloaded.append(module)
+                for fn in self._on_reload:
+                    fn(module)
+        return reloaded
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        """
+        Poll in a daemon thread until stop().
+        """
+        if self._thread is not None:
+            return
+        self.check()  # prime stat/hash state for modules imported so far
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="typan-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
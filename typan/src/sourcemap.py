@@ -0,0 +1,112 @@
+# sourcemap.py
+# Output position -> .tp position, from the segments emit(..., positions=[...]) records.
+from __future__ import annotations
+
+import ast
+from bisect import bisect_right
+from operator import itemgetter
+
+_OUT_COL = itemgetter(0)
+
+
+class SourceMap:
+    """
+    Maps (line, col) in the generated Python back to the .tp source.
+
+    Columns are converted between the two units Python uses: AST nodes carry
+    UTF-8 byte offsets, SyntaxError carries 1-based character offsets.
+    A position in a generated piece of text (the ':' of a header, indentation)
+    maps to the nearest source token before it on the same output line.
+    """
+
+    def __init__(self, positions: list, source: str, output: str):
+        self.positions = positions
+        self.source = source
+        self.output = output
+        self._ascii = source.isascii() and output.isascii()
+        self._src_lines: list[str] | None = None
+        self._out_lines: list[str] | None = None
+
+    def _lines(self) -> tuple[list[str], list[str]]:
+        if self._src_lines is None:
+            self._src_lines = self.source.split("\n")
+            self._out_lines = self.output.split("\n")
+        return self._src_lines, self._out_lines
+
+    def position(self, lineno: int, col: int, *, end: bool = False) -> tuple[int, int]:
+        """
+        (lineno, 0-based char col) in the output -> the same in the source.
+        end=True: `col` is an exclusive end, mapped via the character before it.
+        """
+        if not 0 < lineno <= len(self.positions) or not self.positions[lineno - 1]:
+            return lineno, col
+        segs = self.positions[lineno - 1]
+        c = col - 1 if end and col > 0 else col
+        i = max(0, bisect_right(segs, c, key=_OUT_COL) - 1)
+        out_col, src_line, src_col = segs[i]
+        src_col += max(0, c - out_col)
+        if end and col > 0:
+            src_col += 1
+        return src_line, src_col
+
+    def _byte_position(self, lineno: int, col: int, end: bool) -> tuple[int, int]:
+        if self._ascii:
+            return self.position(lineno, col, end=end)
+        src_lines, out_lines = self._lines()
+        if 0 < lineno <= len(out_lines):
+            col = len(out_lines[lineno - 1].encode("utf-8")[:col].decode("utf-8", "replace"))
+        src_line, src_col = self.position(lineno, col, end=end)
+        if 0 < src_line <= len(src_lines):
+            src_col = len(src_lines[src_line - 1][:src_col].encode("utf-8"))
+        return src_line, src_col
+
+    def remap_tree(self, tree: ast.AST) -> ast.AST:
+        """
+        Rewrite every node's lineno/col_offset/end_lineno/end_col_offset in place.
+        """
+        seen: dict = {}
+        for node in ast.walk(tree):
+            lineno = getattr(node, "lineno", None)
+            if lineno is None:
+                continue
+            key = (lineno, node.col_offset, False)
+            start = seen.get(key)
+            if start is None:
+                start = seen[key] = self._byte_position(lineno, node.col_offset, False)
+            node.lineno, node.col_offset = start
+
+            end_lineno = getattr(node, "end_lineno", None)
+            end_col = getattr(node, "end_col_offset", None)
+            if end_lineno is None or end_col is None:
+                continue
+            key = (end_lineno, end_col, True)
+            stop = seen.get(key)
+            if stop is None:
+                stop = seen[key] = self._byte_position(end_lineno, end_col, True)
+            # the inserted 'pass' of an empty block maps onto its '{' - never end before the start
+            node.end_lineno, node.end_col_offset = max(start, stop)
+        return tree
+
+    def remap_error(self, e: SyntaxError) -> SyntaxError:
+        """
+        Move a SyntaxError raised on the output to source coordinates (in place).
+        """
+        if e.lineno is not None and e.offset is not None:
+            lineno, col = self.position(e.lineno, max(0, e.offset - 1))
+            end_lineno = getattr(e, "end_lineno", None)
+            end_offset = getattr(e, "end_offset", None)
+            if end_lineno is not None and end_offset is not None and end_offset > 0:
+                end_lineno, end_col = self.position(end_lineno, end_offset - 1, end=True)
+                e.end_lineno, e.end_offset = max((lineno, col + 1), (end_lineno, end_col + 1))
+            e.lineno, e.offset = lineno, col + 1
+        elif e.lineno is not None:
+            e.lineno = self.position(e.lineno, 0)[0]
+        return self.attach_text(e)
+
+    def attach_text(self, e: SyntaxError) -> SyntaxError:
+        # the line shown under the message is the .tp line
+        if e.lineno is not None:
+            src_lines = self._lines()[0]
+            if 0 < e.lineno <= len(src_lines):
+                e.text = src_lines[e.lineno - 1] + "\n"
+        return e
@@ -0,0 +1,113 @@
+# stats.py
+# --stats for multi-file runs: throughput totals and the slowest files,
+# built from the per-file profiles collected by batch.run_pool.
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+
+
+class BatchStats:
+    """
+    Collects one profile dict per file (see instrument.Profile.to_dict).
+    Wall time is the whole run as seen by the parent; CPU time includes
+    pool workers (they are reaped before finish()).
+    """
+
+    def __init__(self):
+        self.files: list[tuple[str, dict]] = []
+        self._t0 = time.perf_counter()
+        self._c0 = _cpu_seconds()
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def add(self, path: str, prof: dict) -> None:
+        self.files.append((path, prof))
+
+    def finish(self) -> None:
+        self.wall = time.perf_counter() - self._t0
+        self.cpu = _cpu_seconds() - self._c0
+
+    def to_dict(self, *, top: int = 10) -> dict:
+        n_bytes = sum(p.get("input_bytes", 0) for _, p in self.files)
+        hits = sum(p.get("cache_hits", 0) for _, p in self.files)
+        misses = sum(p.get("cache_misses", 0) for _, p in self.files)
+        stages: dict[str, float] = {}
+        for _, p in self.files:
+            for name, seconds in p.get("stages", {}).items():
+                stages[name] = stages.get(name, 0.0) + seconds
+
+        slowest = sorted(self.files, key=lambda f: f[1].get("wall", 0.0), reverse=True)[:top]
+        return {
+            "files": len(self.files),
+            "bytes": n_bytes,
+            "tokens": sum(p.get("tokens", 0) for _, p in self.files),
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "mb_per_s": (n_bytes / 1e6) / self.wall if self.wall else None,
+            "stages": stages,
+            "cache": {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else None,
+            },
+            "slowest": [
+                {"path": path, "wall": p.get("wall", 0.0), "stages": p.get("stages", {})}
+                for path, p in slowest
+            ],
+        }
+
+    def format_report(self, *, top: int = 10) -> str:
+        d = self.to_dict(top=top)
+        cache = d["cache"]
+        if cache["hit_rate"] is None:
+            cache_line = "n/a (no daemon)"
+        else:
+            cache_line = f"{cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate'] * 100:.1f}%)"
+
+        rows = [
+            f"{'files':<12}{d['files']:>12}",
+            f"{'bytes':<12}{d['bytes']:>12}",
+            f"{'tokens':<12}{d['tokens']:>12}",
+            f"{'wall':<12}{d['wall']:>11.3f}s",
+            f"{'cpu':<12}{d['cpu']:>11.3f}s",
+            f"{'throughput':<12}{d['mb_per_s'] or 0:>8.2f} MB/s",
+            f"{'cache':<12}{cache_line}",
+        ]
+        if d["slowest"]:
+            rows.append("")
+            rows.append(f"slowest {len(d['slowest'])} files (ms):")
+            for f in d["slowest"]:
+                parts = "  ".join(f"{name} {s * 1000:.1f}" for name, s in f["stages"].items())
+                rows.append(f"{f['wall'] * 1000:>10.1f}  {f['path']}  [{parts}]")
+        return "\n".join(rows)
+
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def new_stats(args) -> BatchStats | None:
+    return BatchStats() if args.stats or args.stats_json else None
+
+
+def report(stats: BatchStats | None, args, file) -> int:
+    """
+    Print (--stats) and/or write (--stats-json) the report; call after the pool is done.
+    Returns the exit code: 2 if the JSON file can't be written, else 0.
+    """
+    if stats is None:
+        return 0
+    stats.finish()
+    if args.stats:
+        print(stats.format_report(top=args.stats_top), file=file)
+    if args.stats_json:
+        try:
+            Path(args.stats_json).write_text(json.dumps(stats.to_dict(top=args.stats_top), indent=2), encoding="utf-8")
+        except OSError as e:
+            print(f"typan: cannot write stats: {e}", file=file)
+            return 2
+    return 0
@@ -17,10 +17,10 @@ def main(argv: list[str] | None = None) -> int:
 
     try:
         w = int(args.indent)
-        if w < 0:
+        if w < 1:
             raise ValueError
     except ValueError:
-        print("typan-check: --indent must be a non-negative integer", file=sys.stderr)
+        print("typan-check: --indent must be a positive integer", file=sys.stderr)
         return 2
 
     indent = " " * w
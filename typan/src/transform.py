@@ -1,7 +1,8 @@
 # transform.py
 from create_token import (
-    T_IDENT, T_LBRACE, T_RBRACE, T_WS, T_COMMENT
+    T_IDENT, T_LBRACE, T_RBRACE, T_LPAREN, T_RPAREN, T_LBRACK, T_RBRACK, T_WS, T_COMMENT, T_OTHER
 )
+from errors import PreprocessError
 
 # event kinds
 E_LINE  = "LINE"
@@ -9,14 +10,17 @@ E_OPEN  = "OPEN"
 E_CLOSE = "CLOSE"
 E_BLANK = "BLANK"
 
-BLOCK_HEADS = {
+BLOCK_HEADS = frozenset({
     "if", "elif", "else",
     "for", "while",
     "def", "class",
     "try", "except", "finally",
     "with",
     "match", "case",
-}
+})
+
+# heads that continue the previous block; never a resync point
+_CONTINUATION_HEADS = frozenset({"else", "elif", "except", "finally", "case"})
 
 def _strip_trailing_ws_comment(tokens):
     j = len(tokens)
@@ -71,6 +75,51 @@ def _is_block_opener(tokens):
 
     return first in BLOCK_HEADS
 
+def _block_head_end(tokens):
+    """
+    Index just past the block-head keyword of a line (the first ident, or the
+    second one after 'async'), or None if the line can't open a block.
+    Only a '{' after this index can be a block opener - see _is_block_opener.
+    """
+    seen = 0
+    first = None
+    for i, (kind, value, *_) in enumerate(tokens):
+        if kind != T_IDENT:
+            continue
+        seen += 1
+        if seen == 1:
+            if value in BLOCK_HEADS:
+                return i + 1
+            if value != "async":
+                return None
+            first = value
+        elif first == "async":
+            return i + 1 if value in ("def", "for", "with") else None
+    return None
+
+# after these a '{' starts a value (`if k in {1, 2} {`), not the block
+_EXPR_KEYWORDS = frozenset({"in", "not", "and", "or", "is", "if", "else", "lambda", "await", "yield", "return"})
+# heads directly followed by an expression / pattern (`if {a} <= s {`, `case {"k": v} {`)
+_EXPR_HEADS = frozenset({"if", "elif", "while", "match", "case"})
+
+
+def _literal_brace(tokens, i, head_end):
+    """
+    True if the '{' at tokens[i] (at bracket depth 0 of a block header) opens a
+    dict/set literal: it stands where an expression starts - after an operator,
+    ',' / ':' / '=' or an expression keyword - or right after a head that takes one.
+    """
+    j = i - 1
+    while j >= 0 and tokens[j][0] in (T_WS, T_COMMENT):
+        j -= 1
+    if j < head_end:
+        return tokens[head_end - 1][1] in _EXPR_HEADS
+    kind, value = tokens[j][0], tokens[j][1]
+    if kind == T_OTHER:
+        # digits and '.' are T_OTHER too and end a value: `if n == 2 {`, `if x is ... {`
+        return not (value.isalnum() or value == ".")
+    return kind == T_IDENT and value in _EXPR_KEYWORDS
+
 def _line_has_code(tokens):
     for k, v, *_ in tokens:
         if k == T_WS or k == T_COMMENT:
@@ -117,7 +166,63 @@ def _find_matching_rbrace_inline(tokens, start_idx):
 
     return None
 
-def transform(lines):
+def _fail(errors, err):
+    if errors is None:
+        raise err
+    errors.append(err)
+
+def _missing_close(open_tok):
+    _, _, ln, col = open_tok
+    return PreprocessError("Missing closing '}' for the block opened", ln, col)
+
+def _close_missing(stack, heads, keep, errors):
+    """
+    Recovery: report and close every block above stack[keep].
+    """
+    while len(stack) > keep:
+        open_tok, has_body = stack.pop()
+        heads.pop()
+        errors.append(_missing_close(open_tok))
+        if not has_body:
+            yield (E_LINE, [_make_pass_token(open_tok)])
+        yield (E_CLOSE, open_tok)
+
+def _is_resync_point(tokens, prev_indented):
+    """
+    Indentation hint (error recovery only): a block opener at column 1 right
+    after an indented line, e.g. the next top-level `def` after a function
+    whose '}' is missing.
+    """
+    if not prev_indented or tokens[0][3] != 1:
+        return False
+    if _block_head_end(tokens) is None or _first_ident(tokens) in _CONTINUATION_HEADS:
+        return False
+    return any(tok[0] == T_LBRACE for tok in tokens)
+
+class TransformState:
+    """
+    What transform carries from one logical line to the next. Passed to
+    transform(state=...), it is updated in place, so a caller can snapshot it
+    (copy()) between lines and resume from there later (lsp.Document).
+    """
+
+    __slots__ = ("stack", "literal_depth", "heads", "prev_indented")
+
+    def __init__(self):
+        self.stack = []  # (open_lbrace_token, has_body_bool)
+        self.literal_depth = 0
+        self.heads = []  # recovering only: indentation column of each block header on the stack
+        self.prev_indented = False
+
+    def copy(self) -> "TransformState":
+        other = TransformState()
+        other.stack = list(self.stack)
+        other.literal_depth = self.literal_depth
+        other.heads = list(self.heads)
+        other.prev_indented = self.prev_indented
+        return other
+
+def transform(lines, errors=None, state=None):
     """
     Features:
       - supports constructs like '} else {' on the same logical line
@@ -125,9 +230,26 @@ def transform(lines):
       - ignores dict/set braces via literal_depth (multiline dict won't close blocks)
       - inline single-statement blocks: `if x { stmt }`
         (only if the closing '}' is on the SAME logical line)
+
+    errors=None: raise PreprocessError on the first problem.
+    errors=[...]: collect every problem there and recover - a stray '}' is
+    dropped; unclosed blocks are closed at an indentation hint (the next
+    depth-0 opener after an indented line, or a '}' lined up with an outer
+    block's header) or at EOF - so the events stay balanced and emit() works.
+
+    state: a TransformState to start from and leave updated - `lines` is then
+    only part of the input, so blocks still open at its end are not an error.
     """
-    stack = []  # (open_lbrace_token, has_body_bool)
-    literal_depth = 0
+    if state is None:
+        state = TransformState()
+        resumable = False
+    else:
+        resumable = True
+    stack = state.stack
+    literal_depth = state.literal_depth
+    recover = errors is not None
+    heads = state.heads
+    prev_indented = state.prev_indented
 
     for line_tokens in lines:
         if line_tokens == []:
@@ -136,27 +258,50 @@ def transform(lines):
 
         tokens = line_tokens
 
+        if recover:
+            stripped = _strip_leading_ws(line_tokens)
+            line_col = stripped[0][3] if stripped else 1
+            if stack and stripped and _is_resync_point(stripped, prev_indented):
+                yield from _close_missing(stack, heads, 0, errors)
+                literal_depth = 0
+            elif (
+                stack and stripped and stripped[0][0] == T_RBRACE and literal_depth == 0
+                and heads[-1] > line_col and line_col in heads
+            ):
+                # '}' indented like an outer block's header: the inner blocks lost their '}'
+                keep = len(heads) - heads[::-1].index(line_col)
+                yield from _close_missing(stack, heads, keep, errors)
+            if _line_has_code(line_tokens):
+                prev_indented = line_tokens[0][0] == T_WS
+
         # ------------------------------------------------------------
         # 1) Leading '}' closes a BLOCK only when not inside literal braces
         # ------------------------------------------------------------
+        # index walk, not repeated slicing: '}}}}...' must stay linear
+        i = 0
+        n = len(tokens)
         while True:
-            t = _strip_leading_ws(tokens)
-            if t and t[0][0] == T_RBRACE and literal_depth == 0:
+            while i < n and tokens[i][0] == T_WS:
+                i += 1
+            if i < n and tokens[i][0] == T_RBRACE and literal_depth == 0:
                 if not stack:
-                    _, _, ln, col = t[0]
-                    raise SyntaxError(f"Unmatched '}}' at line {ln}, col {col}")
+                    _, _, ln, col = tokens[i]
+                    _fail(errors, PreprocessError("Unmatched '}'", ln, col))
+                    i += 1
+                    continue
 
                 open_tok, has_body = stack.pop()
+                if recover:
+                    heads.pop()
                 if not has_body:
                     yield (E_LINE, [_make_pass_token(open_tok)])
 
-                yield (E_CLOSE, t[0])
-
-                tokens = t[1:]
-                if not tokens:
-                    break
+                yield (E_CLOSE, tokens[i])
+                i += 1
                 continue
             break
+        if i:
+            tokens = tokens[i:]
 
         tokens = _strip_leading_ws(tokens)
         if not tokens:
@@ -169,10 +314,24 @@ def transform(lines):
         idx_lbrace = None
         idx_rbrace = None
 
-        for i, tok in enumerate(tokens):
-            if tok[0] != T_LBRACE:
-                continue
-            if _is_block_opener(tokens[:i + 1]):
+        # one pass, not _is_block_opener(tokens[:i + 1]) per '{' (quadratic
+        # on lines with thousands of literal braces)
+        head_end = _block_head_end(tokens)
+        if head_end is not None:
+            # () / [] / literal {} - a '{' inside them is a literal too:
+            # `for k in d.get(x, {}).items() {`, `if k in {1, 2} { ... }`
+            nesting = 0
+            for i in range(head_end, len(tokens)):
+                kind = tokens[i][0]
+                if kind == T_LPAREN or kind == T_LBRACK:
+                    nesting += 1
+                elif kind == T_RPAREN or kind == T_RBRACK or (kind == T_RBRACE and nesting):
+                    nesting = max(0, nesting - 1)
+                if kind != T_LBRACE:
+                    continue
+                if nesting or _literal_brace(tokens, i, head_end):
+                    nesting += 1
+                    continue
                 j = _find_matching_rbrace_inline(tokens, i)
                 if j is not None:
                     idx_lbrace = i
@@ -216,9 +375,8 @@ def transform(lines):
             first = _first_ident(tokens)
             if first in ("else", "elif", "except", "finally"):
                 _, _, ln, col = tokens[0]
-                raise SyntaxError(
-                    f"Inline '{first}' is not allowed; put '{first}' on a new line (line {ln}, col {col})"
-                )
+                _fail(errors, PreprocessError(f"Inline '{first}' is not allowed; put '{first}' on a new line", ln, col))
+                continue  # recovering: drop the rest of the line
 
         # ------------------------------------------------------------
         # 3) Normal multiline block opener
@@ -233,6 +391,8 @@ def transform(lines):
                 stack[-1] = (parent_open, True)
 
             stack.append((open_tok, False))
+            if recover:
+                heads.append(line_col)
             yield (E_OPEN, header)
             continue
 
@@ -247,7 +407,11 @@ def transform(lines):
         literal_depth = _update_literal_depth(tokens, literal_depth)
         yield (E_LINE, tokens)
 
+    if resumable:
+        state.literal_depth = literal_depth
+        state.prev_indented = prev_indented
+        return
     if stack:
-        open_tok, _ = stack[-1]
-        _, _, ln, col = open_tok
-        raise SyntaxError(f"Missing closing '}}' for block opened at line {ln}, col {col}")
+        if not recover:
+            raise _missing_close(stack[-1][0])
+        yield from _close_missing(stack, heads, 0, errors)
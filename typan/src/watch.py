@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from batch import is_source, output_name
+from check_text import check_text
+from preprocess import preprocess_text
+
+
+def scan(root: Path) -> dict[str, tuple[int, int]]:
+    """
+    Stat snapshot {path: (mtime_ns, size)} of all typan sources under root.
+    Uses os.scandir so each directory costs one syscall batch, no extra stat().
+    """
+    if root.is_file():
+        st = root.stat()
+        return {str(root): (st.st_mtime_ns, st.st_size)}
+
+    snap: dict[str, tuple[int, int]] = {}
+    stack = [str(root)]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif entry.is_file() and is_source(entry.name):
+                        st = entry.stat()
+                        snap[entry.path] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    # file vanished between scandir and stat
+                    continue
+    return snap
+
+
+def diff_snapshots(old: dict, new: dict) -> tuple[list[str], list[str]]:
+    """
+    Returns (changed_or_added, removed), both sorted.
+    """
+    changed = [p for p, st in new.items() if old.get(p) != st]
+    removed = [p for p in old if p not in new]
+    return sorted(changed), sorted(removed)
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """
+    Write to a temp file in the same directory, then os.replace() it over the target,
+    so readers never see a half-written output.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+@dataclass
+class WatchState:
+    src: Path
+    out: Optional[Path]
+    indent: str = "    "
+    validate: bool = False
+    snapshot: dict = field(default_factory=dict)
+    hashes: dict = field(default_factory=dict)
+    written: dict = field(default_factory=dict)  # source -> output written by this watcher
+
+    def target_for(self, path: str) -> Path:
+        p = Path(path)
+        if self.src.is_file():
+            return self.out if self.out is not None else p.with_name(output_name(p.name))
+        rel = p.relative_to(self.src)
+        base = self.out if self.out is not None else self.src
+        return base / rel.parent / output_name(rel.name)
+
+
+def rebuild(state: WatchState, paths: list[str], log: Callable[[str], None]) -> tuple[int, int]:
+    """
+    Re-preprocess the given sources. Files whose content hash did not change are skipped.
+    Errors are reported through `log` and never raised.
+    Returns (rebuilt, failed).
+    """
+    rebuilt = 0
+    failed = 0
+
+    for path in paths:
+        t0 = time.perf_counter()
+        try:
+            data = Path(path).read_bytes()
+        except OSError as e:
+            log(f"typan watch: failed to read {path}: {e}")
+            failed += 1
+            continue
+
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if state.hashes.get(path) == digest:
+            continue
+
+        try:
+            src = data.decode("utf-8")
+        except UnicodeDecodeError as e:
+            log(f"typan watch: {path}: not valid UTF-8: {e}")
+            state.hashes.pop(path, None)
+            failed += 1
+            continue
+
+        try:
+            if state.validate:
+                ok, diags, out = check_text(src, indent=state.indent)
+                if not ok:
+                    d = diags[0]
+                    if d.stage == "preprocess":
+                        raise SyntaxError(d.message)
+                    raise SyntaxError(f"Python syntax error (line {d.lineno}, col {d.col}) {d.message}")
+            else:
+                out = preprocess_text(src, indent=state.indent)
+        except SyntaxError as e:
+            log(f"typan watch: {path}: {e}")
+            # forget the hash so the next save is always rebuilt
+            state.hashes.pop(path, None)
+            failed += 1
+            continue
+
+        target = state.target_for(path)
+        try:
+            write_atomic(target, out)
+        except OSError as e:
+            log(f"typan watch: failed to write {target}: {e}")
+            failed += 1
+            continue
+
+        state.hashes[path] = digest
+        state.written[path] = target
+        rebuilt += 1
+        ms = (time.perf_counter() - t0) * 1000
+        log(f"typan watch: {path} -> {target} ({ms:.1f} ms)")
+
+    return rebuilt, failed
+
+
+def remove(state: WatchState, paths: list[str], log: Callable[[str], None]) -> None:
+    """
+    Sources that were deleted: their output goes too if this watcher wrote it;
+    any other output at the target path is left alone and reported as stale.
+    """
+    for path in paths:
+        state.hashes.pop(path, None)
+        target = state.written.pop(path, None)
+        if target is not None:
+            try:
+                target.unlink()
+                log(f"typan watch: {path} removed, deleted {target}")
+                continue
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log(f"typan watch: {path} removed, failed to delete {target}: {e}")
+                continue
+        target = state.target_for(path)
+        if target.exists():
+            log(f"typan watch: {path} removed, stale output left: {target}")
+        else:
+            log(f"typan watch: {path} removed")
+
+
+def watch(
+    state: WatchState,
+    *,
+    interval: float = 0.5,
+    debounce: float = 0.1,
+    log: Callable[[str], None] = print,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> None:
+    """
+    Initial full build, then poll until should_stop() returns True.
+    A change is processed only after the snapshot stays stable for `debounce` seconds
+    (editors often write a file in several steps).
+    """
+    state.snapshot = scan(state.src)
+    rebuild(state, sorted(state.snapshot), log)
+
+    while not should_stop():
+        time.sleep(interval)
+        snap = scan(state.src)
+        if snap == state.snapshot:
+            continue
+
+        # debounce: wait until the tree stops changing
+        while True:
+            time.sleep(debounce)
+            again = scan(state.src)
+            if again == snap:
+                break
+            snap = again
+
+        changed, removed = diff_snapshots(state.snapshot, snap)
+        state.snapshot = snap
+        remove(state, removed, log)
+        if changed:
+            rebuild(state, changed, log)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="typan watch",
+        description="typan watch: keep preprocessed outputs in sync with .tp sources (polling, no restart).",
+    )
+    p.add_argument("src", help="Source file or directory (*.tp, *.tp.py).")
+    p.add_argument(
+        "-o", "--output",
+        default=None,
+        help="Output file (file SRC) or directory (directory SRC). Default: next to the sources.",
+    )
+    p.add_argument("--indent", default="4", help="Indent width in spaces (default: 4).")
+    p.add_argument("--validate", action="store_true", help="Run typan-check validation before writing each output.")
+    p.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds (default: 0.5).")
+    p.add_argument("--debounce", type=float, default=0.1, help="Quiet period before rebuilding, in seconds (default: 0.1).")
+    p.add_argument("--once", action="store_true", help="Build once and exit (no polling).")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        w = int(args.indent)
+        if w < 1:
+            raise ValueError
+    except ValueError:
+        print("typan watch: --indent must be a positive integer", file=sys.stderr)
+        return 2
+
+    src = Path(args.src)
+    if not src.exists():
+        print(f"typan watch: source not found: {src}", file=sys.stderr)
+        return 2
+
+    state = WatchState(
+        src=src,
+        out=Path(args.output) if args.output else None,
+        indent=" " * w,
+        validate=args.validate,
+    )
+
+    def log(msg: str) -> None:
+        print(msg, file=sys.stderr, flush=True)
+
+    if args.once:
+        state.snapshot = scan(src)
+        _rebuilt, failed = rebuild(state, sorted(state.snapshot), log)
+        return 1 if failed else 0
+
+    try:
+        watch(state, interval=args.interval, debounce=args.debounce, log=log)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,10 @@
 # tests/_util.py
 from __future__ import annotations
 
+import os
+
+import pytest
+
 from preprocess import preprocess_text
 
 def run(code: str, indent: int = 4) -> str:
@@ -14,3 +18,7 @@ def assert_out(got: str, expected: str):
     got_n = norm(got)
     exp_n = norm(expected)
     assert got_n == exp_n, f"\n--- GOT ---\n{got_n}\n--- EXP ---\n{exp_n}\n"
+
+# wall-time / memory-scaling assertions flake on loaded or single-CPU machines:
+# they only run with TYPAN_SLOW_TESTS=1
+slow = pytest.mark.skipif(not os.environ.get("TYPAN_SLOW_TESTS"), reason="timing test; set TYPAN_SLOW_TESTS=1")
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+import aio
+from aio import AsyncRunner
+from check_text import check_text
+from formatter import format_text
+from preprocess import preprocess_text
+
+SRC = "if x {\nprint(1)\n}\n"
+
+
+def test_results_match_the_sync_api():
+    async def main():
+        async with AsyncRunner(processes=False) as r:
+            return (
+                await r.preprocess_text(SRC, indent="  "),
+                await r.check_text(SRC),
+                await r.format_text(SRC),
+            )
+
+    out, checked, formatted = asyncio.run(main())
+    assert out == preprocess_text(SRC, indent="  ")
+    assert checked == check_text(SRC)
+    assert checked.code is not None
+    assert formatted == format_text(SRC)
+
+
+def test_process_pool_and_errors():
+    async def main():
+        async with AsyncRunner(max_workers=1) as r:
+            checked = await r.check_text("if x {\n")
+            with pytest.raises(SyntaxError):
+                await r.preprocess_text("}\n")
+            return checked, await r.preprocess_text(SRC)
+
+    checked, out = asyncio.run(main())
+    assert checked.ok is False and checked.diagnostics[0].stage == "preprocess"
+    assert checked.code is None  # code objects don't cross the process boundary
+    assert out == preprocess_text(SRC)
+
+
+@pytest.fixture
+def gated(monkeypatch):
+    """
+    aio.preprocess_text blocks until gate is set; calls are counted.
+    """
+    gate = threading.Event()
+    calls = []
+
+    def slow(text, **kw):
+        calls.append(text)
+        gate.wait(5)
+        return preprocess_text(text, **kw)
+
+    monkeypatch.setattr(aio, "preprocess_text", slow)
+    return gate, calls
+
+
+def test_identical_requests_are_coalesced(gated):
+    gate, calls = gated
+
+    async def main():
+        async with AsyncRunner(processes=False) as r:
+            jobs = [asyncio.ensure_future(r.preprocess_text(SRC)) for _ in range(5)]
+            jobs.append(asyncio.ensure_future(r.preprocess_text(SRC, indent="  ")))
+            await asyncio.sleep(0.05)
+            gate.set()
+            return await asyncio.gather(*jobs), r.coalesced
+
+    results, coalesced = asyncio.run(main())
+    assert len(calls) == 2
+    assert coalesced == 4
+    assert results[0] == results[4] == preprocess_text(SRC)
+    assert results[5] == preprocess_text(SRC, indent="  ")
+
+
+def test_cancelling_one_caller_keeps_the_shared_result(gated):
+    gate, calls = gated
+
+    async def main():
+        async with AsyncRunner(processes=False) as r:
+            a = asyncio.ensure_future(r.preprocess_text(SRC))
+            b = asyncio.ensure_future(r.preprocess_text(SRC))
+            await asyncio.sleep(0.05)
+            a.cancel()
+            gate.set()
+            with pytest.raises(asyncio.CancelledError):
+                await a
+            return await b
+
+    assert asyncio.run(main()) == preprocess_text(SRC)
+
+
+def test_cancelled_queued_request_never_runs(gated):
+    gate, calls = gated
+
+    async def main():
+        async with AsyncRunner(processes=False, max_concurrency=1) as r:
+            first = asyncio.ensure_future(r.preprocess_text("a = 1\n"))
+            queued = asyncio.ensure_future(r.preprocess_text("b = 2\n"))
+            await asyncio.sleep(0.05)
+            queued.cancel()
+            gate.set()
+            await first
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert calls == ["a = 1\n"]
+
+
+def test_module_level_functions_use_the_default_runner(monkeypatch):
+    monkeypatch.setattr(aio, "_default", AsyncRunner(processes=False))
+    try:
+        assert asyncio.run(aio.preprocess_text_async(SRC)) == preprocess_text(SRC)
+        assert asyncio.run(aio.check_text_async(SRC, level="parse")).ok
+        assert asyncio.run(aio.format_text_async(SRC)) == format_text(SRC)
+    finally:
+        aio.shutdown()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from batch import collect_paths, git_changed_files, read_paths, run_pool
+from cli import main
+from cli_check import main as check_main
+from cli_fmt import main as fmt_main
+
+
+def write(p: Path, s: str):
+    p.write_text(s, encoding="utf-8", newline="\n")
+
+
+def _git(cwd: Path, *args: str):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path: Path, monkeypatch):
+    try:
+        _git(tmp_path, "init", "-q")
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip("git not available")
+    _git(tmp_path, "config", "user.email", "t@example.com")
+    _git(tmp_path, "config", "user.name", "t")
+    write(tmp_path / "a.tp", "if x {\nprint(1)\n}\n")
+    write(tmp_path / "b.tp", "if y {\nprint(2)\n}\n")
+    write(tmp_path / "notes.txt", "x\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "init")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_read_paths_nul_and_newline():
+    assert read_paths("a.tp\0b c.tp\0") == [Path("a.tp"), Path("b c.tp")]
+    assert read_paths("a.tp\nb.tp\n") == [Path("a.tp"), Path("b.tp")]
+
+
+def test_git_changed_and_staged(repo: Path):
+    write(repo / "a.tp", "if x {\nprint(10)\n}\n")
+    write(repo / "notes.txt", "y\n")
+    assert git_changed_files(since="HEAD") == [repo / "a.tp"]
+    assert git_changed_files(staged=True) == []
+    _git(repo, "add", "a.tp")
+    assert git_changed_files(staged=True) == [repo / "a.tp"]
+
+
+def test_staged_files_are_read_from_the_working_tree(repo: Path, capsys):
+    write(repo / "a.tp", "if x {\nprint(10)\n}\n")
+    _git(repo, "add", "a.tp")
+    write(repo / "a.tp", "}\n")  # unstaged breakage
+    assert check_main(["--staged", "-j", "1"]) == 1
+    assert "a.tp" in capsys.readouterr().err
+
+
+def test_check_changed_since_only_checks_changed(repo: Path, capsys):
+    write(repo / "b.tp", "}\n")
+    _git(repo, "commit", "-qam", "break b")
+    write(repo / "a.tp", "if x {\nprint(3)\n}\n")
+    # b.tp is broken but unchanged since HEAD -> not checked
+    assert check_main(["--changed-since", "HEAD"]) == 0
+    assert check_main(["--changed-since", "HEAD~1", "-j", "2"]) == 1
+    assert "b.tp: Unmatched" in capsys.readouterr().err
+
+
+def test_convert_and_fmt_files_from_stdin(tmp_path: Path, monkeypatch, capsys):
+    a = tmp_path / "a.tp"
+    b = tmp_path / "b.tp"
+    write(a, "if x {\nprint(1)\n}\n")
+    write(b, "if y {\n}\n")
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("a.tp\0b.tp\0"))
+    assert main(["--files-from", "-", "-o", "out"]) == 0
+    assert (tmp_path / "out" / "a.py").read_text(encoding="utf-8") == "if x:\n    print(1)\n"
+    assert (tmp_path / "out" / "b.py").read_text(encoding="utf-8") == "if y:\n    pass\n"
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("a.tp\0b.tp\0"))
+    assert fmt_main(["--files-from", "-", "--check"]) == 1
+    assert "a.tp: would reformat" in capsys.readouterr().err
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("a.tp\0"))
+    assert fmt_main(["--files-from", "-", "--in-place"]) == 0
+    assert a.read_text(encoding="utf-8") == "if x {\n    print(1)\n}\n"
+
+
+def test_run_pool_preserves_order():
+    paths = [Path(f"p{i}") for i in range(20)]
+    assert list(run_pool(str.upper, paths, jobs=3)) == [f"P{i}" for i in range(20)]
+
+
+def test_missing_input_is_usage_error(capsys):
+    assert check_main([]) == 2
+    assert fmt_main([]) == 2
+
+
+def test_stats_report_and_json(tmp_path: Path, monkeypatch, capsys):
+    monkeypatch.setenv("TYPAN_NO_DAEMON", "1")
+    for name in ("a.tp", "b.tp", "c.tp"):
+        write(tmp_path / name, "if x {\nd = {1: 2}\n}\n")
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("a.tp\0b.tp\0c.tp\0"))
+    assert check_main(["--files-from", "-", "--stats", "--stats-top", "2", "--stats-json", "s.json"]) == 0
+    err = capsys.readouterr().err
+    assert "throughput" in err and "n/a (no daemon)" in err
+
+    data = json.loads((tmp_path / "s.json").read_text(encoding="utf-8"))
+    assert data["files"] == 3
+    assert data["bytes"] == 3 * len("if x {\nd = {1: 2}\n}\n")
+    assert data["tokens"] > 0 and data["wall"] > 0
+    assert len(data["slowest"]) == 2
+    assert "compile" in data["slowest"][0]["stages"]
+
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("a.tp\0"))
+    assert check_main(["--files-from", "-", "--stats-json", str(tmp_path / "missing" / "s.json")]) == 2
+    assert "typan: cannot write stats:" in capsys.readouterr().err
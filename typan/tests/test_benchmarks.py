@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.corpus import SHAPES, generate, parse_size
+from benchmarks.memory import nonlinear, scaling_exponent
+from benchmarks.memory import run as memory_run
+from benchmarks.run import STAGES, compare, run
+from check_text import check_text
+from tests._util import slow
+
+
+def test_parse_size():
+    assert parse_size("1KB") == 1024
+    assert parse_size("50MB") == 50 * 1024 * 1024
+    assert parse_size("300") == 300
+
+
+@pytest.mark.parametrize("shape", sorted(SHAPES))
+def test_corpus_is_deterministic_and_valid(shape):
+    src = generate(shape, 4096)
+    assert src == generate(shape, 4096)
+    assert len(src) >= 4096
+    assert check_text(src).ok
+
+
+def test_run_reports_every_stage():
+    data = run(["inline"], [1024], repeat=1)
+    res = data["results"]["inline/1KB"]
+    assert set(res["stages"]) == set(STAGES)
+    assert res["tokens"] > 0
+    assert all(s["mb_per_s"] > 0 for s in res["stages"].values())
+
+
+def test_compare_flags_regressions():
+    def mk(sec):
+        return {"results": {"a/1KB": {"stages": {"lex": {"seconds": sec}}}}}
+
+    assert compare(mk(1.0), mk(1.05)) == []
+    assert len(compare(mk(1.0), mk(1.5))) == 1
+
+
+def test_scaling_exponent():
+    assert scaling_exponent([(1, 10), (10, 100), (100, 1000)]) == pytest.approx(1.0)
+    assert scaling_exponent([(1, 10), (10, 1000)]) == pytest.approx(2.0)
+
+
+@slow
+@pytest.mark.parametrize("shape", sorted(SHAPES))
+def test_peak_memory_scales_linearly(shape):
+    data = memory_run([shape], [4096, 32768])
+    small, large = data["results"].values()
+    assert small["stages"]["lex"]["retained"] > 0
+    assert large["stages"]["preprocess_text"]["peak"] > 0
+    assert nonlinear(data, max_exponent=1.15) == []
+
+
+def test_thread_scaling_report():
+    from benchmarks.threads import run as threads_run
+
+    data = threads_run([1, 2], files=4, size=1024, repeat=1)
+    assert set(data["results"]) == {"1", "2"}
+    assert data["results"]["1"]["speedup"] == pytest.approx(1.0)
+    assert all(r["mb_per_s"] > 0 for r in data["results"].values())
@@ -28,6 +28,24 @@ def test_cli_stdout(tmp_path: Path, capsys):
     assert out == "if x:\n    print(1)\n"
 
 
+def test_cli_preserve_lines(tmp_path: Path, capsys):
+    inp = tmp_path / "a.tp.py"
+    write(inp, "if x {\nprint(1)\n}\nif y { z() }\n")
+    assert main([str(inp), "--preserve-lines"]) == 0
+    assert capsys.readouterr().out == "if x:\n    print(1)\n\nif y: z()\n"
+    assert main([str(inp), "--preserve-lines", "--validate"]) == 0
+    assert capsys.readouterr().out == "if x:\n    print(1)\n\nif y: z()\n"
+
+
+def test_cli_minify(tmp_path: Path, capsys):
+    inp = tmp_path / "a.tp.py"
+    write(inp, "# c\nif x {\n\nprint(1)\nprint(2)\n}\n")
+    assert main([str(inp), "--minify"]) == 0
+    assert capsys.readouterr().out == "if x:print(1);print(2)\n"
+    with pytest.raises(SystemExit):
+        main([str(inp), "--minify", "--preserve-lines"])
+
+
 def test_cli_output_file(tmp_path: Path):
     inp = tmp_path / "a.tp.py"
     outp = tmp_path / "out.py"
@@ -78,3 +96,15 @@ def test_cli_indent_option(tmp_path: Path):
     write(inp, "if x {\nprint(1)\n}\n")
     rc = main([str(inp), "--indent", "2"])
     assert rc == 0
+
+
+def test_cli_subcommands_dispatch(tmp_path: Path, capsys):
+    inp = tmp_path / "a.tp"
+    write(inp, "if x {\nprint(1)\n}\n")
+    assert main(["convert", str(inp)]) == 0
+    assert capsys.readouterr().out == "if x:\n    print(1)\n"
+    assert main(["check", str(inp)]) == 0
+    assert main(["fmt", str(inp)]) == 0
+    assert capsys.readouterr().out == "if x {\n    print(1)\n}\n"
+    assert main(["--help"]) == 0
+    assert "subcommands" in capsys.readouterr().out
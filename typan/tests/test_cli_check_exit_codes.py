@@ -80,10 +80,11 @@ def test_exit_code_2_for_missing_file(tmp_path, capsys):
 
 
 def test_exit_code_2_for_invalid_indent(capsys):
-    code = main(["-", "--indent", "-1"])
-    out = capsys.readouterr()
-    assert code == 2
-    assert "--indent must be a non-negative integer" in out.err
+    for width in ("-1", "0"):
+        code = main(["-", "--indent", width])
+        out = capsys.readouterr()
+        assert code == 2
+        assert "--indent must be a positive integer" in out.err
 
 
 def test_stdin_mode_ok(monkeypatch, capsys):
@@ -100,3 +101,10 @@ def test_exit_code_2_for_unknown_flag(capsys):
     assert code == 2
     # argparse pisze usage + error na stderr
     assert "usage:" in out.err.lower()
+
+
+def test_level_flag(tmp_path):
+    p = write(tmp_path, "pyerr.tp", "if x {\nreturn 1\n}\n")
+    assert main([str(p), "--level", "structure"]) == 0
+    assert main([str(p), "--level", "parse"]) == 0
+    assert main([str(p), "--level", "compile"]) == 1
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import ast
+import traceback
+
+import pytest
+
+from compiler import compile as tp_compile
+from pipeline import PipelineResult
+
+
+SRC = """\
+def f(a,
+      b) {
+    if a { return g(a) }
+
+    x = [1,
+         2]
+    return x
+}
+
+def g(v) {
+    raise ValueError(v)
+}
+"""
+
+
+def _raise_line(code) -> int:
+    ns: dict = {}
+    exec(code, ns)
+    try:
+        ns["f"](1, 2)
+    except ValueError as e:
+        return traceback.extract_tb(e.__traceback__)[-1].lineno
+    raise AssertionError("no exception")
+
+
+def test_code_positions_are_tp_positions():
+    code = tp_compile(SRC, "m.tp")
+    assert code.co_filename == "m.tp"
+    assert _raise_line(code) == 11
+
+    f = next(c for c in code.co_consts if getattr(c, "co_name", None) == "f")
+    lines = {pos[0] for pos in f.co_positions() if pos[0] is not None}
+    assert {3, 5, 6, 7} <= lines
+
+
+def test_node_columns_follow_the_source():
+    p = PipelineResult(SRC)
+    smap = p.source_map
+    # the header's two lines are joined, so output line 3 is "        return g(a)"
+    assert smap.position(3, 8) == (3, 11)
+    # "2]" continues output line 5 but lives on source line 6
+    out_col = p.output.splitlines()[4].index("2]")
+    assert smap.position(5, out_col) == (6, 9)
+
+
+def test_non_ascii_columns_are_utf8_offsets():
+    src = "if x {\n    é = 1; y = é\n}\n"
+    tree = ast.parse(PipelineResult(src, indent="  ").output)
+    PipelineResult(src, indent="  ").source_map.remap_tree(tree)
+    assign = tree.body[0].body[1]
+    assert (assign.lineno, assign.col_offset) == (2, len("    é = 1; ".encode("utf-8")))
+
+
+def test_syntax_errors_are_raised_at_source_positions():
+    with pytest.raises(SyntaxError) as info:
+        tp_compile("if x {\n      y = = 1\n}\n", "m.tp")
+    e = info.value
+    assert (e.lineno, e.offset) == (2, 11)
+    assert e.text == "      y = = 1\n"
+
+    # found after parsing, on the remapped tree
+    with pytest.raises(SyntaxError) as info:
+        tp_compile("x = 1\nif x { return 2 }\n", "m.tp")
+    assert (info.value.lineno, info.value.offset) == (2, 8)
+
+
+def test_preserve_lines_pipeline_maps_columns_too():
+    p = PipelineResult("if a {\n  b = 1\n}\nif c { d }\n", preserve_lines=True)
+    assert p.output == "if a:\n    b = 1\n\nif c: d\n"
+    assert p.source_map.position(2, 4) == (2, 2)
+    assert p.source_map.position(4, 6) == (4, 7)
+    exec(p.compile(), {"a": 0, "c": 0})
+
+
+def test_minified_code_keeps_tp_positions():
+    p = PipelineResult(SRC, minify=True)
+    assert "\n\n" not in p.output
+    assert _raise_line(p.compile("m.tp")) == 11
+    with pytest.raises(SyntaxError) as info:
+        PipelineResult("x = 1  # c\nif x {\n  y = = 1\n}\n", minify=True).compile()
+    assert (info.value.lineno, info.value.offset) == (3, 7)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from benchmarks.pathological import SHAPES, STAGES, exponent, fuzz, shrink
+from tests._util import slow
+
+# fitted exponent of time vs input+output size; 1.0 is linear
+MAX_EXPONENT = float(os.environ.get("TYPAN_MAX_EXPONENT", "1.3"))
+
+
+@slow
+@pytest.mark.parametrize("stage", sorted(STAGES))
+@pytest.mark.parametrize("shape", sorted(SHAPES))
+def test_adversarial_shape_scales_linearly(shape, stage):
+    k = exponent(STAGES[stage], SHAPES[shape], (500, 4000))
+    assert k <= MAX_EXPONENT, f"{shape} {stage}: time ~ size^{k:.2f}"
+
+
+@slow
+def test_block_opener_scan_is_linear():
+    # regression: every '{' on a line used to re-scan the line prefix
+    assert exponent(STAGES["preprocess_text"], SHAPES["opens_one_line"], (2000, 16000)) <= MAX_EXPONENT
+
+
+def test_shrink_finds_minimal_repro():
+    assert shrink("x = 1; {{ a }} # c", lambda u: "{{" in u) == "{{"
+    assert len(shrink("abc", lambda u: True)) == 1
+
+
+@slow
+def test_fuzz_finds_nothing_slow():
+    assert fuzz(seed=0, iterations=40, max_exponent=MAX_EXPONENT) == []
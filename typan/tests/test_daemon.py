@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+import client
+from cli import main
+from cli_check import main as check_main
+from daemon import DaemonService, serve
+
+pytestmark = pytest.mark.skipif(not hasattr(__import__("socket"), "AF_UNIX"), reason="needs unix sockets")
+
+
+@pytest.fixture
+def running_daemon(monkeypatch):
+    # short path: unix socket paths are limited to ~100 bytes
+    d = tempfile.mkdtemp(prefix="tpd")
+    sock = str(Path(d) / "s")
+    ready = threading.Event()
+    t = threading.Thread(target=serve, args=(sock,), kwargs={"ready": ready}, daemon=True)
+    t.start()
+    assert ready.wait(5)
+    monkeypatch.setenv("TYPAN_DAEMON", sock)
+    monkeypatch.delenv("TYPAN_NO_DAEMON", raising=False)
+    yield sock
+    client.request({"op": "shutdown"}, address=sock)
+    t.join(5)
+    shutil.rmtree(d, ignore_errors=True)
+
+
+def test_service_caches_results():
+    svc = DaemonService()
+    req = {"op": "preprocess", "src": "if x {\n}\n", "indent": "    "}
+    assert svc.handle(req) == {"ok": True, "out": "if x:\n    pass\n"}
+    svc.handle(req)
+    assert (svc.cache.hits, svc.cache.misses) == (1, 1)
+
+
+def test_service_reports_errors():
+    resp = DaemonService().handle({"op": "format", "src": "}\n"})
+    assert resp["ok"] is False
+    assert "Unmatched" in resp["error"]
+
+
+def test_client_falls_back_without_daemon(monkeypatch, tmp_path):
+    monkeypatch.setenv("TYPAN_DAEMON", str(tmp_path / "missing.sock"))
+    assert client.request({"op": "ping"}) is None
+    assert client.preprocess_text("if x {\n}\n") == "if x:\n    pass\n"
+
+
+def test_clis_forward_to_daemon(running_daemon, tmp_path, capsys):
+    p = tmp_path / "a.tp"
+    p.write_text("if x {\nprint(1)\n}\n", encoding="utf-8")
+    assert main([str(p)]) == 0
+    assert capsys.readouterr().out == "if x:\n    print(1)\n"
+
+    p.write_text("}\n", encoding="utf-8")
+    assert check_main([str(p)]) == 1
+    assert "Unmatched" in capsys.readouterr().err
+
+    stats = client.request({"op": "stats"})
+    assert stats["misses"] == 2
+
+
+def test_service_returns_profile_on_request():
+    svc = DaemonService()
+    req = {"op": "check", "src": "if x {\n}\n", "profile": True}
+    first = svc.handle(req)
+    again = svc.handle(req)
+    assert (first["cached"], again["cached"]) == (False, True)
+    assert "compile" in first["profile"]["stages"]
+    assert again["profile"]["stages"] == {}
+    assert again["profile"]["tokens"] == first["profile"]["tokens"] > 0
+    assert "profile" not in svc.handle({**req, "profile": False})
+
+    # an entry computed without profiling still carries its counters
+    plain = {"op": "preprocess", "src": "if y {\n}\n"}
+    svc.handle(plain)
+    hit = svc.handle({**plain, "profile": True})
+    assert hit["cached"] is True and hit["profile"]["tokens"] > 0 and hit["profile"]["input_bytes"] == 9
+
+
+def test_stats_count_daemon_cache_hits(running_daemon, tmp_path, monkeypatch, capsys):
+    p = tmp_path / "a.tp"
+    p.write_text("if x {\nprint(1)\n}\n", encoding="utf-8")
+    lst = tmp_path / "list"
+    lst.write_text(f"{p}\n{p}\n", encoding="utf-8")
+    out = tmp_path / "s.json"
+    assert check_main(["--files-from", str(lst), "-j", "1", "--stats-json", str(out)]) == 0
+    data = json.loads(out.read_text(encoding="utf-8"))
+    # the same path is listed twice but collect_paths de-duplicates it
+    assert data["cache"] == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+    assert check_main(["--files-from", str(lst), "-j", "1", "--stats-json", str(out)]) == 0
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert data["cache"]["hit_rate"] == 1.0
+    assert data["tokens"] > 0
+
+
+def test_client_ignores_sockets_it_does_not_trust(monkeypatch, tmp_path):
+    # a socket owned by someone else (or in a dir others can write) is never used
+    sock = tmp_path / "s"
+    sock.write_text("")
+    st = os.stat(sock)
+    assert client._trusted(str(sock), st)
+    monkeypatch.setattr(client.os, "getuid", lambda: st.st_uid + 1)
+    assert not client._trusted(str(sock), st)
+    monkeypatch.undo()
+    tmp_path.chmod(0o777)
+    try:
+        assert not client._trusted(str(sock), st)
+    finally:
+        tmp_path.chmod(0o700)
+
+
+def test_default_address_is_in_a_private_directory(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    addr = client.default_address()
+    assert Path(addr).parent.parent == tmp_path
+    ready = threading.Event()
+    t = threading.Thread(target=serve, kwargs={"ready": ready}, daemon=True)
+    t.start()
+    assert ready.wait(5)
+    try:
+        assert Path(addr).parent.stat().st_mode & 0o777 == 0o700
+        assert client.request({"op": "ping"}, address=addr) is not None
+    finally:
+        client.request({"op": "shutdown"}, address=addr)
+        t.join(5)
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import pytest
+from preprocess import preprocess_text
 from tests._util import run, assert_out
 
 
@@ -508,3 +509,204 @@ def test_multiline_opener_not_inline_error():
     code = "if x {\nprint(1)\n}\n"
     expected = "if x:\n    print(1)\n"
     assert_out(run(code), expected)
+
+
+# ------------------------------------------------------------
+# preserve_lines: output line N == source line N
+# ------------------------------------------------------------
+
+def test_preserve_lines_keeps_every_line_in_place():
+    code = '''\
+def f(a,
+      b) {
+    if a { return 1 }
+    x = [
+        1, 2,
+    ]
+    while x {
+    }
+    s = """a
+{ b }
+c"""
+    if x { y = 1 }  # tail
+    return (a +
+            b)
+}
+
+print(f(1, 2))
+'''
+    expected = '''\
+def f(a,
+      b):
+    if a: return 1
+    x = [
+        1, 2,
+    ]
+    while x: pass
+
+    s = """a
+{ b }
+c"""
+    if x: y = 1  # tail
+    return (a +
+            b)
+
+
+print(f(1, 2))
+'''
+    out = preprocess_text(code, preserve_lines=True)
+    assert_out(out, expected)
+    compile(out, "<t>", "exec")
+
+
+def test_preserve_lines_pass_goes_on_the_closing_brace_line():
+    code = "if x {\n# just comment\n}\ny = 1\n"
+    assert_out(preprocess_text(code, preserve_lines=True), "if x:\n    # just comment\n    pass\ny = 1\n")
+
+
+def test_preserve_lines_else_chain():
+    code = "if x {\na = 1\n} else {\na = 2\n}\n"
+    assert_out(preprocess_text(code, preserve_lines=True), "if x:\n    a = 1\nelse:\n    a = 2\n")
+
+
+def test_preserve_lines_compound_inline_body_shifts_then_realigns():
+    # `while a: for ...` is not Python: the body takes the next line, and the
+    # blank line after the block absorbs the shift
+    code = "while a { for i in b: pass }\n\nz = 1\n"
+    out = preprocess_text(code, preserve_lines=True)
+    assert_out(out, "while a:\n    for i in b: pass\nz = 1\n")
+    compile(out, "<t>", "exec")
+
+
+# ------------------------------------------------------------
+# minify
+# ------------------------------------------------------------
+
+def test_minify_output():
+    code = '''\
+#!/usr/bin/env python
+# comment
+import os  # trailing
+
+def f(a,
+      b) {
+    """doc"""
+    x = 1
+    y   =   2
+    if a { return x }
+    for i in range(3) {
+        # only comment
+    }
+    t = 1 + \\
+        2
+    return x + y + t
+}
+
+@staticmethod
+def g() { }
+
+class C {
+    def m(self) {
+        return 1
+    }
+}
+'''
+    expected = '''\
+#!/usr/bin/env python
+import os
+def f(a, b):
+ """doc""";x = 1;y = 2
+ if a:return x
+ for i in range(3):pass
+ t = 1 + 2;return x + y + t
+@staticmethod
+def g():pass
+class C:
+ def m(self):return 1
+'''
+    out = preprocess_text(code, minify=True)
+    assert_out(out, expected)
+    ns = {}
+    exec(compile(out, "<t>", "exec"), ns)
+    assert ns["f"](0, 1) == 6
+
+
+def test_minify_keeps_block_bodies_with_nested_blocks_indented():
+    code = "while a {\nx = 1\nif b {\nbreak\n}\ny = 2\n}\nz = 3\n"
+    expected = "while a:\n x = 1\n if b:break\n y = 2\nz = 3\n"
+    assert_out(preprocess_text(code, minify=True), expected)
+
+
+def test_minify_joins_multiline_literals_before_merging():
+    code = 'if a {\nd = {\n    "k": 1,  # c\n\n    "s": {2},\n}\ne = 1\n}\n'
+    out = preprocess_text(code, minify=True)
+    assert_out(out, 'if a:d = { "k": 1, "s": {2}, };e = 1\n')
+    compile(out, "<t>", "exec")
+
+
+def test_escapes_in_raw_triple_and_continued_strings():
+    code = 'a = r"\\"{"\nb = """x\\"""{"""\nc = "x\\\n{"\nif a {\nf(b, c)\n}\n'
+    out = run(code)
+    assert out.startswith(code[:code.index("if a")])
+    assert out.endswith("if a:\n    f(b, c)\n")
+    compile(out, "<t>", "exec")
+
+
+def test_comment_and_backslash_inside_brackets_keep_their_line_break():
+    code = """\
+def f(a,  # first
+      b) {
+x = [1, \\
+     2]
+if a and \\
+        b { return x }
+}
+"""
+    expected = """\
+def f(a,  # first
+      b):
+    x = [1, \\
+     2]
+    if a and \\
+        b:
+        return x
+"""
+    assert_out(run(code), expected)
+    for mode in ({"preserve_lines": True}, {"minify": True}):
+        compile(preprocess_text(code, **mode), "<t>", "exec")
+    assert preprocess_text(code, minify=True) == "def f(a, b):\n x = [1, 2]\n if a and b:return x\n"
+
+
+def test_literal_braces_in_block_header():
+    code = """\
+if k in {1, 2} { a = {3} }
+for v in d.get(k, {}) {
+b()
+}
+match m {
+case {"k": 1} { c() }
+}
+"""
+    expected = """\
+if k in {1, 2}:
+    a = {3}
+for v in d.get(k, {}):
+    b()
+match m:
+    case {"k": 1}:
+        c()
+"""
+    assert_out(run(code), expected)
+
+
+def test_minify_drops_trailing_semicolons_before_joining():
+    out = preprocess_text("if a {\nx = 1;\ny = 2;  # c\n}\n", minify=True)
+    assert_out(out, "if a:x = 1;y = 2\n")
+    compile(out, "<t>", "exec")
+
+
+def test_minify_drops_a_leading_continuation_without_indenting():
+    for code in ("\\\nif x {\n y = 1\n}\n", "if a {\nx = 1\n\\\n  if b {\nc\nd\n}\n}\n"):
+        out = preprocess_text(code, minify=True)
+        compile(out, "<t>", "exec")
+    assert preprocess_text("\\\nif x {\n y = 1\n}\n", minify=True) == "if x:y = 1\n"
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import pytest
-from formatter import format_text
+from cli_fmt import main as fmt_main
+from formatter import first_unformatted_line, format_range, format_text
 
 
 def test_formatter_refuses_on_syntax_error():
@@ -26,3 +27,111 @@ def test_formatter_idempotent():
     out1 = format_text(src)
     out2 = format_text(out1)
     assert out1 == out2
+
+
+def test_first_unformatted_line_none_when_formatted():
+    src = format_text("if x{\nprint(1)\n\n\n}\n")
+    assert first_unformatted_line(src) is None
+
+
+def test_first_unformatted_line_reports_first_difference():
+    src = "if x {\n    print(1)\n  y = 2\n}\n"
+    assert first_unformatted_line(src) == 3
+
+
+def test_first_unformatted_line_trailing_content():
+    assert first_unformatted_line("x = 1\n\n\n") == 2
+    assert first_unformatted_line("x = 1") == 1
+
+
+def test_first_unformatted_line_matches_format_text():
+    for src in ["", "\n", "a=1\n", "if x { y }\n", "\n\nif x {\n}\n"]:
+        formatted = format_text(src) == src
+        assert (first_unformatted_line(src) is None) == formatted
+
+
+def test_first_unformatted_line_raises_like_format_text():
+    # a formatted file is fully validated: a compile-only error ('return' outside
+    # function) and a brace error fail both the same way
+    for src in ["return 1\n", "if x {\n    return 1\n}\n", "x = 1\n}\n", 'x = "a\n']:
+        with pytest.raises(SyntaxError) as fmt_err:
+            format_text(src)
+        with pytest.raises(SyntaxError) as check_err:
+            first_unformatted_line(src)
+        assert str(check_err.value) == str(fmt_err.value)
+
+
+def test_first_unformatted_line_validates_only_without_a_difference(monkeypatch):
+    import formatter
+
+    calls = []
+    real = formatter.check_text
+    monkeypatch.setattr(formatter, "check_text", lambda *a, **k: calls.append(a) or real(*a, **k))
+    # the difference at line 2 is reported without compiling the file ('return' outside function)
+    assert first_unformatted_line("if x {\n  return 1\n}\nreturn 2\n") == 2
+    assert calls == []
+    assert first_unformatted_line("x = 1\n") is None
+    assert len(calls) == 1
+
+
+def test_cli_fmt_check_reports_line(tmp_path, capsys):
+    p = tmp_path / "a.tp"
+    p.write_text("if x {\nprint(1)\n}\n", encoding="utf-8")
+    assert fmt_main([str(p), "--check"]) == 1
+    assert "line 2" in capsys.readouterr().err
+    assert p.read_text(encoding="utf-8") == "if x {\nprint(1)\n}\n"
+
+    p.write_text("if x {\n    print(1)\n}\n", encoding="utf-8")
+    assert fmt_main([str(p), "--in-place", "--check"]) == 0
+
+
+def test_format_range_uses_block_depth_and_leaves_rest_untouched():
+    src = "x  =  1\nif a {\nif b {\ny  = 2\n}\n}\nw  =  4\n"
+    out = format_range(src, 4, 4)
+    assert out == "x  =  1\nif a {\nif b {\n        y = 2\n}\n}\nw  =  4\n"
+
+
+def test_format_range_full_file_matches_format_text():
+    src = "x  =  1\nif a {\nif b {\ny  = 2\n}\n}\nw  =  4\n"
+    assert format_range(src, 1, 7) == format_text(src)
+
+
+def test_format_range_extends_to_logical_line():
+    src = 'x = """\nabc\n  def"""\ny  =  1\n'
+    assert format_range(src, 2, 2) == src
+
+
+def test_format_range_keeps_crlf_line_endings():
+    assert format_range("x\r\ny  =  2\r\n", 2, 2) == "x\r\ny = 2\r\n"
+    src = "if a {\r\nb  =  1\r\n\r\n\r\nc = 2\r\n}\r\n"
+    assert format_range(src, 2, 4) == "if a {\r\n    b = 1\r\n\r\nc = 2\r\n}\r\n"
+    assert format_range("x\r\ny  =  2", 2, 2) == "x\r\ny = 2\r\n"
+
+
+def test_format_range_validates_region_only():
+    with pytest.raises(SyntaxError):
+        format_range("if a {\n}\n}\n", 3, 3)
+    # unbalanced code after the range is not looked at
+    assert format_range("a  =  1\n}\n", 1, 1) == "a = 1\n}\n"
+
+
+def test_cli_fmt_lines(tmp_path, capsys):
+    p = tmp_path / "a.tp"
+    p.write_text("a  =  1\nb  =  2\n", encoding="utf-8")
+    assert fmt_main([str(p), "--lines", "2:2"]) == 0
+    assert capsys.readouterr().out == "a  =  1\nb = 2\n"
+    assert fmt_main([str(p), "--lines", "2:1"]) == 2
+
+
+def test_formatter_keeps_line_breaks_after_comments_in_brackets():
+    src = "y = f(a,  # why\n      b)\n"
+    out = format_text(src)
+    assert out == "y = f(a, # why\n      b)\n"
+    assert format_text(out) == out
+
+
+def test_formatter_keeps_literal_header_braces():
+    src = "if e in {1, 2} { x }\nfor v in d.get(k, {}) { y }\n"
+    out = format_text(src)
+    assert out == "if e in {1, 2} {\n    x\n}\nfor v in d.get(k, {}) {\n    y\n}\n"
+    assert format_text(out) == out
@@ -0,0 +1,208 @@
+# tests/test_from_python.py
+from __future__ import annotations
+
+import ast
+from pathlib import Path
+
+import pytest
+
+from cli import main as typan_main
+from from_python import ConvertError, from_python, main, verify
+from preprocess import preprocess_text
+
+
+def write(p: Path, s: str):
+    p.write_text(s, encoding="utf-8", newline="\n")
+
+
+def read(p: Path) -> str:
+    return p.read_text(encoding="utf-8")
+
+
+def roundtrip(src: str) -> str:
+    out = from_python(src)
+    verify(src, out)
+    assert ast.dump(ast.parse(preprocess_text(out))) == ast.dump(ast.parse(src))
+    return out
+
+
+def test_blocks_get_braces_everything_else_is_kept():
+    src = """\
+import os
+
+def f(a, b=1):
+    # comment
+    if a:
+        return b
+    elif b:  # why
+        pass
+    else :
+        x = {"k": 1}
+    return x
+"""
+    assert roundtrip(src) == """\
+import os
+
+def f(a, b=1) {
+    # comment
+    if a {
+        return b
+    }
+    elif b {  # why
+        pass
+    }
+    else {
+        x = {"k": 1}
+    }
+    return x
+}
+"""
+
+
+def test_one_line_suites_and_header_colons():
+    src = """\
+for i in range(3): print(i)
+if x: y = lambda a: a
+while d[1:2]: d = {1: 2}
+class A: pass
+f = lambda: 0
+"""
+    assert roundtrip(src) == """\
+for i in range(3) { print(i) }
+if x { y = lambda a: a }
+while d[1:2] { d = {1: 2} }
+class A { pass }
+f = lambda: 0
+"""
+
+
+def test_lambda_and_slice_in_block_header():
+    src = """\
+def g(key=lambda v: v[1:]):
+    with open(p) as f, ctx(lambda: {1: 2}):
+        pass
+"""
+    out = roundtrip(src)
+    assert out.startswith("def g(key=lambda v: v[1:]) {\n")
+    assert "ctx(lambda: {1: 2}) {\n" in out
+
+
+def test_closing_brace_after_trailing_comments_of_the_body():
+    src = """\
+if a:
+    b()
+    # still the body
+
+# top level again
+c()
+"""
+    assert roundtrip(src) == """\
+if a {
+    b()
+    # still the body
+}
+
+# top level again
+c()
+"""
+
+
+def test_match_case_and_nested_dedent_to_eof_without_newline():
+    src = """\
+match cmd:
+    case {"go": where}: move(where)
+    case _:
+        for x in y:
+            if x:
+                stop()"""
+    out = roundtrip(src)
+    assert '    case {"go": where} { move(where) }\n' in out
+    assert out.endswith("                stop()\n            }\n        }\n    }\n}\n")
+
+
+def test_multiline_literals_and_continuations_in_headers():
+    src = """\
+if k in {
+    1, 2,
+}:
+    pass
+if a and \\
+        b:  # c
+    for v in f(x,  # first
+               y):
+        pass
+"""
+    out = roundtrip(src)
+    assert "if k in ({\n    1, 2,\n}) {\n" in out
+
+
+def test_tokenize_errors_become_convert_errors():
+    with pytest.raises(ConvertError) as e:
+        from_python("if x:\n    a\n  b\n")
+    assert isinstance(e.value, SyntaxError)
+    with pytest.raises(ConvertError):
+        from_python("x = (1,\n")
+
+
+def test_verify_reports_a_different_ast():
+    with pytest.raises(ConvertError) as e:
+        verify("x = 1\n", "x = 2\n")
+    assert "AST differs" in e.value.msg
+    with pytest.raises(ConvertError) as e:
+        verify("x = 1\n", "if x {\n")
+    assert "does not preprocess" in e.value.msg
+
+
+def test_cli_writes_tp_next_to_sources_and_checks(tmp_path: Path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    pkg = tmp_path / "pkg"
+    (pkg / "__pycache__").mkdir(parents=True)
+    write(pkg / "a.py", "if x:\n    y()\n")
+    write(pkg / "b.py", "def f():\n    return 1\n")
+    write(pkg / "__pycache__" / "c.py", "if x:\n    y()\n")
+
+    assert typan_main(["from-python", "pkg", "--check", "-j", "1"]) == 0
+    assert not (pkg / "a.tp").exists()
+
+    assert typan_main(["from-python", "pkg", "-j", "2"]) == 0
+    assert read(pkg / "a.tp") == "if x {\n    y()\n}\n"
+    assert read(pkg / "b.tp") == "def f() {\n    return 1\n}\n"
+    assert not (pkg / "__pycache__" / "c.tp").exists()
+    assert "pkg/a.py -> pkg/a.tp" in capsys.readouterr().out.replace("\\", "/")
+
+    # existing outputs are kept unless --force
+    assert main(["pkg/a.py", "-q"]) == 1
+    assert "--force" in capsys.readouterr().err
+    assert main(["pkg/a.py", "-q", "--force", "--suffix", ".tp.py", "-o", "out"]) == 0
+    assert read(tmp_path / "out" / "pkg" / "a.tp.py") == "if x {\n    y()\n}\n"
+
+
+def test_cli_stdout_and_failures(tmp_path: Path, capsys):
+    good = tmp_path / "good.py"
+    bad = tmp_path / "bad.py"
+    write(good, "while True:\n    break\n")
+    write(bad, "if x:\n    a\n  b\n")
+
+    assert main([str(good), "-o", "-"]) == 0
+    assert capsys.readouterr().out == "while True {\n    break\n}\n"
+
+    assert main([str(bad), "-o", "-"]) == 1
+    assert "bad.py" in capsys.readouterr().err
+
+    assert main([str(good), str(bad), "--check", "-j", "1"]) == 1
+    err = capsys.readouterr().err
+    assert "bad.py:3" in err and "good.py" not in err
+
+    assert main([str(tmp_path / "missing.py"), "--check", "-j", "1"]) == 2
+
+
+def test_crlf_sources_keep_crlf():
+    assert roundtrip("if x:\r\n    y = 1\r\n") == "if x {\r\n    y = 1\r\n}\r\n"
+    assert roundtrip("if x:\r\n    if y:\r\n        z()") == "if x {\r\n    if y {\r\n        z()\r\n    }\r\n}\r\n"
+
+
+def test_cli_stdout_reports_undecodable_input(tmp_path: Path, capsys):
+    p = tmp_path / "latin.py"
+    p.write_bytes(b"s = '\xe9'\n")
+    assert main([str(p), "-o", "-"]) == 2
+    assert "latin.py" in capsys.readouterr().err
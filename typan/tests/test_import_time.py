@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from benchmarks.import_time import measure, parse_importtime
+from tests._util import slow
+
+# wall time: checked only with TYPAN_SLOW_TESTS=1; tighten locally with the env var
+BUDGET_MS = float(os.environ.get("TYPAN_IMPORT_BUDGET_MS", "150"))
+
+PIPELINE = {"lex", "lines", "transform", "emit", "preprocess", "check_text", "formatter"}
+
+
+def test_parse_importtime():
+    err = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       903 |       4386 |   pathlib\n"
+        "import time:      3305 |      25575 | cli_fmt\n"
+    )
+    assert parse_importtime(err) == {"pathlib": (903, 4386), "cli_fmt": (3305, 25575)}
+
+
+def test_dispatcher_imports_nothing_heavy():
+    _us, modules = measure("cli", runs=1)
+    assert not modules & (PIPELINE | {"argparse", "client", "cli_convert", "json", "socket"})
+
+
+@pytest.mark.parametrize("module", ["cli_convert", "cli_check", "cli_fmt"])
+def test_entry_points_defer_pipeline_imports(module):
+    _us, modules = measure(module, runs=1)
+    assert not modules & PIPELINE, modules & PIPELINE
+
+
+@slow
+@pytest.mark.parametrize("module", ["cli_convert", "cli_check", "cli_fmt"])
+def test_entry_points_import_within_budget(module):
+    us, _modules = measure(module, runs=3)
+    assert us / 1000 < BUDGET_MS
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+
+from check_text import check_text
+from cli_fmt import main as fmt_main
+from formatter import format_text
+from instrument import Profile, current, profile, stage
+from preprocess import preprocess_text
+
+
+SRC = "def f(x) {\n    if x {\n        return {1: 2}\n    }\n}\n"
+
+
+def test_disabled_by_default():
+    assert current() is None
+    with stage("noop"):
+        pass
+    assert preprocess_text(SRC).startswith("def f(x):")
+
+
+def test_profile_counts_stages_and_totals():
+    seen = []
+    done = []
+    with profile(on_stage=lambda name, s: seen.append(name), on_done=done.append) as prof:
+        preprocess_text(SRC)
+        check_text(SRC)
+    assert current() is None
+    assert done == [prof]
+
+    assert {"lex", "logical_lines", "transform", "emit", "compile"} <= set(prof.stages)
+    assert seen.count("lex") == 2
+    assert prof.sources == 2
+    assert prof.max_depth == 2
+    assert prof.output_bytes == 2 * len(preprocess_text(SRC).encode("utf-8"))
+    assert prof.tokens > 0 and prof.logical_lines > 0 and prof.events > 0
+
+
+def test_merge_adds_counters_but_not_wall_or_cpu():
+    prof = Profile(wall=1.0, cpu=0.5, tokens=3)
+    prof.merge({"stages": {"lex": 0.25}, "tokens": 4, "wall": 9.0, "cpu": 9.0})
+    assert (prof.tokens, prof.wall, prof.cpu, prof.stages) == (7, 1.0, 0.5, {"lex": 0.25})
+
+
+def test_profile_format_and_parse_stages():
+    with profile() as prof:
+        check_text(SRC, level="parse")
+    assert "parse" in prof.stages and "compile" not in prof.stages
+
+    with profile() as prof:
+        format_text(SRC)
+    assert "format" in prof.stages
+
+
+def test_merge_and_render():
+    a = Profile(stages={"lex": 1.0}, sources=1, tokens=10, max_depth=3)
+    a.merge({"stages": {"lex": 0.5, "emit": 0.25}, "sources": 2, "tokens": 5, "max_depth": 1})
+    assert a.stages == {"lex": 1.5, "emit": 0.25}
+    assert (a.sources, a.tokens, a.max_depth) == (3, 15, 3)
+    assert json.loads(a.to_json())["tokens"] == 15
+    assert "total" in a.format_table()
+
+
+def test_cli_profile_json(tmp_path, capsys, monkeypatch):
+    monkeypatch.setenv("TYPAN_NO_DAEMON", "1")
+    f = tmp_path / "a.tp"
+    f.write_text(SRC, encoding="utf-8")
+    assert fmt_main([str(f), "--profile", "json"]) == 0
+    data = json.loads(capsys.readouterr().err)
+    assert data["sources"] == 1 and "format" in data["stages"]
@@ -0,0 +1,38 @@
+# tests/test_lex.py
+from __future__ import annotations
+
+import pytest
+
+from create_token import T_STRING, T_NEWLINE, T_LBRACE
+from errors import PreprocessError
+from lex import lex
+
+
+def strings(text: str) -> list[str]:
+    return [value for kind, value, *_ in lex(text) if kind == T_STRING]
+
+
+def test_backslash_escapes_quote_in_raw_strings():
+    assert strings('r"\\"{"') == ['r"\\"{"']
+    assert strings("rb'\\''") == ["rb'\\''"]
+    # the escaped quote does not end the string, so its '{' is not a brace
+    assert T_LBRACE not in [tok[0] for tok in lex('a = r"\\"{"\n')]
+
+
+def test_backslash_escapes_quote_in_triple_quoted_strings():
+    assert strings('"""x\\"""{"""') == ['"""x\\"""{"""']
+    assert strings("r'''\\''''") == ["r'''\\''''"]
+
+
+def test_backslash_newline_continues_single_quoted_string():
+    toks = list(lex('c = "x\\\n{"\nd\n'))
+    assert [v for k, v, *_ in toks if k == T_STRING] == ['"x\\\n{"']
+    # the position after the string is on the continued line
+    assert [tok[2] for tok in toks if tok[0] == T_NEWLINE] == [2, 3]
+
+
+def test_plain_newline_still_ends_a_single_quoted_string():
+    with pytest.raises(PreprocessError):
+        list(lex('a = "x\ny"\n'))
+    with pytest.raises(PreprocessError):
+        list(lex('a = r"x\\\\\ny"\n'))
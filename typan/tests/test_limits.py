@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import pickle
+
+import pytest
+
+import limits as limits_mod
+import pipeline
+from check_text import check_text
+from errors import LimitExceeded
+from formatter import format_text
+from lex import lex
+from limits import Limits
+from preprocess import preprocess_text
+
+SRC = "def f() {\n    if a {\n        return {1: 2}\n    }\n}\n"
+
+APIS = [
+    lambda src, lim: preprocess_text(src, limits=lim),
+    lambda src, lim: check_text(src, limits=lim),
+    lambda src, lim: format_text(src, limits=lim),
+]
+
+
+@pytest.mark.parametrize("api", APIS)
+@pytest.mark.parametrize(
+    "lim, name",
+    [
+        (Limits(max_bytes=len(SRC) - 1), "max_bytes"),
+        (Limits(max_tokens=10), "max_tokens"),
+        (Limits(max_depth=1), "max_depth"),
+        (Limits(max_line_length=20), "max_line_length"),
+    ],
+)
+def test_each_limit_is_enforced(api, lim, name):
+    with pytest.raises(LimitExceeded) as info:
+        api(SRC, lim)
+    assert info.value.limit == name
+
+
+@pytest.mark.parametrize("api", APIS)
+def test_input_within_limits_is_unaffected(api):
+    lim = Limits(max_bytes=len(SRC), max_tokens=1000, max_depth=2, max_line_length=40, timeout=10)
+    assert api(SRC, lim) == api(SRC, None)
+
+
+def test_non_ascii_size_is_counted_in_utf8_bytes():
+    with pytest.raises(LimitExceeded):
+        preprocess_text("é = 1\n", limits=Limits(max_bytes=6))
+    assert preprocess_text("é = 1\n", limits=Limits(max_bytes=7)) == "é = 1\n"
+
+
+def test_max_tokens_stops_lexing_early(monkeypatch):
+    # the lexer is a generator: count how far it got before LimitExceeded
+    pulled = []
+
+    def counting_lex(text, *args):
+        for tok in lex(text, *args):
+            pulled.append(tok)
+            yield tok
+
+    monkeypatch.setattr(pipeline, "lex", counting_lex)
+    with pytest.raises(LimitExceeded):
+        preprocess_text("x = 1\n" * 200_000, limits=Limits(max_tokens=100))
+    assert len(pulled) == 101
+    assert pulled[-1][2] < 20  # line reached, out of 200000
+
+
+def test_timeout(monkeypatch):
+    monkeypatch.setattr(limits_mod, "_CLOCK_EVERY", 16)
+    with pytest.raises(LimitExceeded) as info:
+        check_text("x = 1\n" * 1000, limits=Limits(timeout=0.0))
+    assert info.value.limit == "timeout"
+
+
+def test_recovering_pass_is_limited_too():
+    # fails the fast path, so check_text re-lexes with recovery - under the same budget
+    src = "}\n" + "if a {\n" * 50
+    with pytest.raises(LimitExceeded):
+        check_text(src, limits=Limits(max_depth=10))
+
+
+def test_limit_exceeded_is_a_value_error_and_pickles():
+    e = LimitExceeded("max_tokens", 11, 10)
+    assert isinstance(e, ValueError)
+    assert str(e) == "max_tokens exceeded: 11 > 10"
+    assert pickle.loads(pickle.dumps(e)).limit == "max_tokens"
@@ -0,0 +1,38 @@
+# tests/test_lines.py
+from __future__ import annotations
+
+from create_token import T_WS, T_COMMENT, T_OTHER
+from lex import lex
+from lines import logical_lines, logical_lines_with_spans
+
+
+def text(line) -> str:
+    return "".join(value for _kind, value, *_ in line)
+
+
+def test_newline_inside_brackets_joins_lines():
+    lines = list(logical_lines(lex("x = [1,\n     2]\ny = 3\n")))
+    assert [text(line) for line in lines] == ["x = [1,     2]", "y = 3"]
+
+
+def test_line_break_after_comment_inside_brackets_is_kept():
+    lines = list(logical_lines(lex("f(a,  # why\n  b)\n")))
+    assert len(lines) == 1
+    assert text(lines[0]) == "f(a,  # why\n  b)"
+    k = [tok[0] for tok in lines[0]].index(T_COMMENT)
+    assert lines[0][k + 1][:2] == (T_WS, "\n")
+
+
+def test_backslash_continuation_is_kept_as_a_line_break():
+    lines = list(logical_lines(lex("if a and \\\n  b {\nx\n}\n")))
+    assert text(lines[0]) == "if a and \\\n  b {"
+    k = [tok[:2] for tok in lines[0]].index((T_OTHER, "\\"))
+    assert lines[0][k + 1][:2] == (T_WS, "\n")
+    # ...and inside brackets too
+    lines = list(logical_lines(lex("x = [1, \\\n 2]\n")))
+    assert text(lines[0]) == "x = [1, \\\n 2]"
+
+
+def test_spans_cover_kept_line_breaks():
+    spans = [(first, last) for first, last, _ in logical_lines_with_spans(lex("f(a,  # c\n  b)\nx = \\\n 1\ny\n"))]
+    assert spans == [(1, 2), (3, 4), (5, 5)]
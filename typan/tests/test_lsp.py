@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import io
+import json
+import random
+
+from check_text import check_text
+from lex import lex
+from lines import logical_lines
+from lsp import Document, LanguageServer, diagnose, read_message, serve, write_message
+from transform import transform
+
+
+def _change(sl, sc, el, ec, text):
+    return {"range": {"start": {"line": sl, "character": sc}, "end": {"line": el, "character": ec}}, "text": text}
+
+
+def _full_spans(doc: Document):
+    return [(f, l, [(k, v, ln + off, c) for k, v, ln, c in t]) for f, l, off, t, *_ in doc.spans]
+
+
+def test_incremental_change_relexes_only_affected_lines():
+    src = "".join(f"if x{i} {{\ny = {i}\n}}\n" for i in range(200))
+    doc = Document("file:///a.tp", src)
+    doc.apply_change(_change(301, 4, 301, 7, "42"), 1)
+    assert doc.lines[301] == "y = 42"
+    assert doc.relexed_lines < 5
+    assert _full_spans(doc) == _full_spans(Document("x", doc.text))
+
+
+def test_incremental_changes_match_full_lex_randomized():
+    rnd = random.Random(7)
+    doc = Document("x", 'if a {\nb = """x\n{y}"""\n}\nd = {\n1: 2}\n')
+    pieces = ["\n", "{", "}", '"""', "(", ")", "x", " ", "if q {", "#c"]
+    for v in range(300):
+        sl = rnd.randrange(len(doc.lines))
+        el = rnd.randrange(sl, len(doc.lines))
+        sc = rnd.randrange(len(doc.lines[sl]) + 1)
+        ec = rnd.randrange(len(doc.lines[el]) + 1) if el != sl else rnd.randrange(sc, len(doc.lines[el]) + 1)
+        doc.apply_change(_change(sl, sc, el, ec, rnd.choice(pieces)), v)
+        ref = Document("x", doc.text)
+        assert (doc.spans is None) == (ref.spans is None)
+        if doc.spans is not None:
+            assert _full_spans(doc) == _full_spans(ref)
+
+
+def test_incremental_matches_full_relex_with_string_at_eof():
+    doc = Document("u", 'x = 1\ny = 2\n} #"""')
+    doc.apply_change(_change(0, 4, 0, 5, '"""'), 1)
+    assert _full_spans(doc) == _full_spans(Document("u", doc.text))
+    assert diagnose(doc) == diagnose(Document("u", doc.text)) == []
+
+    rnd = random.Random(11)
+    doc = Document("x", 'a = """\n{"""\nif b { c }')  # no trailing newline
+    pieces = ["\n", "{", "}", '"""', "x", " ", "#"]
+    for v in range(300):
+        sl = rnd.randrange(len(doc.lines))
+        el = rnd.randrange(sl, len(doc.lines))
+        sc = rnd.randrange(len(doc.lines[sl]) + 1)
+        ec = rnd.randrange(len(doc.lines[el]) + 1) if el != sl else rnd.randrange(sc, len(doc.lines[el]) + 1)
+        doc.apply_change(_change(sl, sc, el, ec, rnd.choice(pieces)), v)
+        ref = Document("x", doc.text)
+        assert (doc.spans is None) == (ref.spans is None)
+        if doc.spans is not None:
+            assert _full_spans(doc) == _full_spans(ref)
+            assert doc.events() == ref.events()
+            assert diagnose(doc) == diagnose(ref)
+
+
+def test_events_are_retransformed_from_the_edit_only():
+    src = "def f(a) {\n    if a {\n        return {1: 2}\n    }\n}\n\n" * 500
+    doc = Document("x", src)
+    assert doc.events() == list(transform(logical_lines(lex(src))))
+    assert doc.retransformed == 3000
+
+    doc.apply_change(_change(2, 16, 2, 17, "3"), 1)
+    assert doc.events() == list(transform(logical_lines(lex(doc.text))))
+    assert doc.retransformed < 10
+    # an empty block: re-transformed up to its '}', which gets the 'pass'
+    doc.apply_change(_change(5, 0, 5, 0, "if b {\n\n}"), 2)
+    assert doc.events() == list(transform(logical_lines(lex(doc.text))))
+    assert doc.retransformed < 10
+    doc.apply_change(_change(3, 0, 3, 0, "}"), 3)
+    assert doc.events() is None
+    assert [x["message"] for x in diagnose(doc)] == [d.raw_message for d in check_text(doc.text).diagnostics]
+
+
+def test_diagnostics_match_typan_check():
+    for src in [
+        "if x {\nprint(1)\n}\n",
+        "if x {\n}\n}\n",
+        "if x {\nreturn 1\n}\n",
+        "if a {\n  b = = 1\n}\n",
+        "x = (1,\n",
+        "def f() {\n    if x {\n        y\n}\n}\n}\nz = 'open\n",
+    ]:
+        expected = [(d.lineno, d.raw_message) for d in check_text(src).diagnostics]
+        got = [(x["range"]["start"]["line"] + 1, x["message"]) for x in diagnose(Document("x", src))]
+        assert got == expected
+
+
+def test_diagnostics_both_stages():
+    assert diagnose(Document("x", "if x {\nprint(1)\n}\n")) == []
+    d = diagnose(Document("x", "if x {\n}\n}\n"))[0]
+    assert d["range"]["start"] == {"line": 2, "character": 0}
+    assert "Unmatched" in d["message"]
+    d = diagnose(Document("x", "if x {\nreturn 1\n}\n"))[0]
+    assert d["source"] == "typan (python)"
+    d = diagnose(Document("x", "if x {\n  y = = 1\n}\n"))[0]
+    assert d["range"]["start"] == {"line": 1, "character": 6}
+
+
+def _frame(msg):
+    buf = io.BytesIO()
+    write_message(buf, msg)
+    return buf.getvalue()
+
+
+def test_stdio_session_formatting_and_diagnostics():
+    uri = "file:///a.tp"
+    msgs = [
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}},
+        {"jsonrpc": "2.0", "method": "textDocument/didOpen",
+         "params": {"textDocument": {"uri": uri, "version": 1, "text": "if x{\nprint(1)\n}\n"}}},
+        {"jsonrpc": "2.0", "id": 2, "method": "textDocument/formatting", "params": {"textDocument": {"uri": uri}}},
+        {"jsonrpc": "2.0", "id": 3, "method": "shutdown"},
+        {"jsonrpc": "2.0", "method": "exit"},
+    ]
+    stdin = io.BytesIO(b"".join(_frame(m) for m in msgs))
+    stdout = io.BytesIO()
+    assert serve(stdin, stdout, debounce=0) == 0
+
+    stdout.seek(0)
+    replies = []
+    while (m := read_message(stdout)) is not None:
+        replies.append(m)
+
+    init = next(m for m in replies if m.get("id") == 1)
+    assert init["result"]["capabilities"]["textDocumentSync"]["change"] == 2
+    diag = next(m for m in replies if m.get("method") == "textDocument/publishDiagnostics")
+    assert diag["params"]["diagnostics"] == []
+    fmt = next(m for m in replies if m.get("id") == 2)
+    assert fmt["result"] == [{
+        "range": {"start": {"line": 0, "character": 0}, "end": {"line": 2, "character": 0}},
+        "newText": "if x {\n    print(1)\n",
+    }]
+
+
+def test_diagnostics_report_every_preprocess_error():
+    src = "def f() {\n    if x {\n        y\n}\n}\n}\nz = 'open\n"
+    doc = Document("x", src)
+    d = diagnose(doc)
+    # like typan-check: the brace errors before the unterminated string are reported too
+    assert [x["message"].split(" ")[0] for x in d] == ["Missing", "Unmatched", "Unmatched", "Unterminated"]
+    assert d[-1]["range"]["start"] == {"line": 6, "character": 4}
+
+    doc.set_text(src.replace("'open", "'closed'"), 2)
+    lines = [(x["range"]["start"]["line"], x["message"].split(" ")[0]) for x in diagnose(doc)]
+    assert lines == [(1, "Missing"), (4, "Unmatched"), (5, "Unmatched")]
+
+
+def test_handler_errors_become_jsonrpc_errors():
+    out = io.BytesIO()
+    server = LanguageServer(out, debounce=0)
+    assert server.handle({"jsonrpc": "2.0", "id": 7, "method": "textDocument/didOpen", "params": {}}) is True
+    assert server.handle({"jsonrpc": "2.0", "method": "textDocument/didChange", "params": {"x": 1}}) is True
+    out.seek(0)
+    reply = read_message(out)
+    assert reply["id"] == 7 and reply["error"]["code"] == -32602
+    assert "KeyError" in reply["error"]["message"]
+    assert read_message(out) is None  # notifications get no reply
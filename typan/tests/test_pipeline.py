@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import pytest
+
+import pipeline as pipeline_mod
+from check_text import check_text
+from formatter import first_unformatted_line, format_text
+from pipeline import PipelineResult
+from preprocess import preprocess_text
+
+
+@pytest.fixture
+def lex_calls(monkeypatch):
+    calls = []
+    real = pipeline_mod.lex
+    monkeypatch.setattr(pipeline_mod, "lex", lambda text: calls.append(text) or real(text))
+    return calls
+
+
+def test_pipeline_matches_preprocess_text():
+    src = "if x {\nd = {\n1: 2}\n} else { y }\n"
+    p = PipelineResult(src)
+    assert p.output == preprocess_text(src)
+    assert p.output is p.output
+    assert p.compile() is p.compile()
+
+
+def test_pipeline_error_is_cached_and_located(lex_calls):
+    p = PipelineResult("if x {\n}\n}\n")
+    for _ in range(2):
+        with pytest.raises(SyntaxError) as ei:
+            p.output
+        assert "line 3" in str(ei.value)
+    assert len(lex_calls) == 1
+
+
+def test_format_text_lexes_once(lex_calls):
+    assert format_text("if x{\nprint(1)\n}\n") == "if x {\n    print(1)\n}\n"
+    assert first_unformatted_line("if x {\n    print(1)\n}\n") is None
+    assert len(lex_calls) == 2
+
+
+def test_check_text_reuses_given_pipeline(lex_calls):
+    p = PipelineResult("x = 1\n")
+    p.tokens
+    assert check_text("x = 1\n", pipeline=p).ok
+    assert len(lex_calls) == 1
+
+
+def test_check_compile_skips_source_map_unless_there_is_an_error():
+    p = PipelineResult("def f() {\nreturn 1\n}\n")
+    code = p.compile(remap=False)
+    assert p._source_map is None and code.co_consts
+    assert p.compile() is not code  # .tp positions wanted: remapped now
+    assert p.compile(remap=False) is p.compile()
+
+    bad = PipelineResult("if a { b }\nif x {\nreturn 1\n}\n")  # 'return' is on output line 4
+    with pytest.raises(SyntaxError) as ei:
+        bad.compile(remap=False)
+    assert ei.value.lineno == 3 and ei.value.text == "return 1\n"
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import pytest
+
+from cache import ResultCache
+from errors import LimitExceeded, PreprocessError
+from instrument import profile
+from limits import Limits
+from preprocess import preprocess_text
+from preprocessor import Preprocessor, preprocess_many
+
+DOCS = [f"if x{i} {{\nprint({i})\n}}\n" for i in range(50)]
+
+
+def test_preprocess_matches_preprocess_text_and_caches():
+    pre = Preprocessor(indent="  ", cache=8)
+    assert pre(DOCS[0]) == preprocess_text(DOCS[0], indent="  ")
+    assert pre.preprocess(DOCS[0]) == preprocess_text(DOCS[0], indent="  ")
+    assert (pre.cache.hits, pre.cache.misses) == (1, 1)
+    assert Preprocessor(cache=0).cache is None
+
+
+def test_shared_cache():
+    cache = ResultCache(8)
+    Preprocessor(cache=cache)(DOCS[0])
+    Preprocessor(cache=cache)(DOCS[0])
+    assert cache.hits == 1
+
+    # same text, different options: no collisions
+    pres = [Preprocessor(cache=cache, indent="  "), Preprocessor(cache=cache, minify=True),
+            Preprocessor(cache=cache, limits=Limits(max_bytes=10**6))]
+    for pre in pres:
+        assert pre(DOCS[0]) == preprocess_text(DOCS[0], **pre.options)
+    assert cache.hits == 1
+    with Preprocessor(cache=cache, indent="  ") as pre:
+        assert list(pre.preprocess_many([DOCS[0]] * 3, jobs=2)) == [preprocess_text(DOCS[0], indent="  ")] * 3
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_preprocess_many_streams_in_order(jobs):
+    with Preprocessor(minify=True) as pre:
+        out = list(pre.preprocess_many(iter(DOCS), jobs=jobs, chunksize=7))
+    assert out == [preprocess_text(d, minify=True) for d in DOCS]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_errors_raise_or_are_returned_in_place(jobs):
+    docs = ["a = 1\n", "}\n", "x" * 100 + "\n", "b = 2\n"]
+    with Preprocessor(limits=Limits(max_bytes=50)) as pre:
+        out = list(pre.preprocess_many(docs, jobs=jobs, return_exceptions=True))
+        assert out[0] == "a = 1\n" and out[3] == "b = 2\n"
+        assert isinstance(out[1], PreprocessError) and out[1].lineno == 1
+        assert isinstance(out[2], LimitExceeded) and out[2].limit == "max_bytes"
+
+        results = pre.preprocess_many(docs, jobs=jobs)
+        assert next(results) == "a = 1\n"
+        with pytest.raises(PreprocessError):
+            next(results)
+
+
+def test_pool_uses_the_cache_and_is_reused():
+    with Preprocessor(cache=100) as pre:
+        first = list(pre.preprocess_many(DOCS, jobs=2, chunksize=10))
+        pool = pre._executor
+        assert pre.cache.misses == len(DOCS) and pre.cache.hits == 0
+        assert list(pre.preprocess_many(DOCS, jobs=2)) == first
+        assert pre.cache.hits == len(DOCS)
+        assert pre._executor is pool
+    assert pre._executor is None
+
+
+def test_worker_profiles_are_merged():
+    with profile() as prof:
+        list(preprocess_many(DOCS[:10], jobs=2, chunksize=3))
+    assert prof.sources == 10
+    assert prof.stages["lex"] > 0
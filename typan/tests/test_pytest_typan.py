@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+pytest_plugins = ["pytester"]
+
+TESTS = """\
+import helper
+
+def test_pass() {
+    assert helper.double(2) == 4
+}
+
+def test_fail() {
+    data = {"a": 1}
+    assert data["a"] == helper.double(1)
+}
+
+class TestGroup {
+    @pytest.mark.parametrize("n", [1, 2, 3])
+    def test_param(self, n) { assert n > 0 }
+}
+"""
+
+HELPER = "def double(x) {\n    return x * 2\n}\n"
+
+
+@pytest.fixture
+def suite(pytester):
+    pytester.makefile(".tp", test_suite="import pytest\n" + TESTS, helper=HELPER)
+    return pytester
+
+
+def test_collects_and_runs_tp_tests(suite):
+    result = suite.runpytest("-p", "pytest_typan")
+    result.assert_outcomes(passed=4, failed=1)
+    # rewritten assert, .tp filename and .tp line in the failure report
+    result.stdout.fnmatch_lines([
+        "*assert 1 == 2*",
+        "test_suite.tp:10: AssertionError",
+    ])
+
+
+def test_tp_py_suffix_and_python_files_patterns(pytester):
+    pytester.makefile(".tp.py", test_dual="def test_x() {\n    assert True\n}\n")
+    pytester.makefile(".tp", check_more="def test_y() {\n    assert True\n}\n")
+    pytester.makeini("[pytest]\npython_files = test_*.py check_*.py\n")
+    pytester.runpytest("-p", "pytest_typan").assert_outcomes(passed=2)
+
+
+def test_compiled_code_is_cached(suite):
+    suite.runpytest("-p", "pytest_typan").assert_outcomes(passed=4, failed=1)
+    cache = suite.path / ".pytest_cache" / "d" / "typan"
+    entries = sorted(p.name for p in cache.iterdir())
+    assert len(entries) == 1 and entries[0].endswith(".code")
+
+    suite.runpytest("-p", "pytest_typan").assert_outcomes(passed=4, failed=1)
+    assert sorted(p.name for p in cache.iterdir()) == entries
+
+    # an edit is a new key, never a stale hit
+    path = suite.path / "test_suite.tp"
+    path.write_text(path.read_text().replace("helper.double(1)", "1"), encoding="utf-8")
+    suite.runpytest("-p", "pytest_typan").assert_outcomes(passed=5)
+    assert len(list(cache.iterdir())) == 2
+
+
+def test_plain_assert_mode_and_no_cache(suite):
+    result = suite.runpytest("-p", "pytest_typan", "-p", "no:cacheprovider", "--assert=plain")
+    result.assert_outcomes(passed=4, failed=1)
+    assert not (suite.path / ".pytest_cache").exists()
+
+
+def test_brace_error_is_a_collection_error(pytester):
+    pytester.makefile(".tp", test_broken="def test_x() {\n    assert True\n")
+    result = pytester.runpytest("-p", "pytest_typan")
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines(["*test_broken.tp*", "*Missing closing*"])
+
+
+def test_importlib_mode_and_packages(pytester):
+    pytester.mkpydir("pkg")
+    pytester.makefile(".tp", **{"pkg/test_a": "def test_a() {\n    assert __name__.endswith('pkg.test_a')\n}\n"})
+    pytester.makefile(".tp", **{"other/test_a": "def test_b() {\n    assert True\n}\n"})
+    # same basename twice: only importlib mode can import both
+    pytester.runpytest("-p", "pytest_typan", "--import-mode=importlib").assert_outcomes(passed=2)
+    pytester.runpytest("-p", "pytest_typan", "pkg").assert_outcomes(passed=1)
+
+
+def test_cache_key_changes_with_pytest_version(monkeypatch):
+    import pytest_typan
+
+    monkeypatch.setattr(pytest_typan, "_fingerprint", None)
+    before = pytest_typan._pipeline_fingerprint()
+    monkeypatch.setattr(pytest_typan, "_fingerprint", None)
+    monkeypatch.setattr(pytest, "__version__", pytest.__version__ + ".post1")
+    assert pytest_typan._pipeline_fingerprint() != before
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import importer
+from reload import Reloader
+
+
+@pytest.fixture
+def tp_path(tmp_path: Path, monkeypatch):
+    importer.install()
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path
+    importer.uninstall()
+    for name in ("tp_mod_a", "tp_mod_b", "tp_pkg"):
+        sys.modules.pop(name, None)
+
+
+def bump(p: Path, s: str):
+    st = p.stat()
+    p.write_text(s, encoding="utf-8")
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_import_tp_module(tp_path: Path):
+    (tp_path / "tp_mod_a.tp").write_text("def f() {\nreturn 1\n}\n", encoding="utf-8")
+    mod = importlib.import_module("tp_mod_a")
+    assert mod.f() == 1
+    assert mod.__file__.endswith("tp_mod_a.tp")
+    assert importer.is_tp_module(mod)
+
+
+def test_reload_only_changed_modules(tp_path: Path, monkeypatch):
+    a = tp_path / "tp_mod_a.tp"
+    b = tp_path / "tp_mod_b.tp"
+    a.write_text("X = 1\n", encoding="utf-8")
+    b.write_text("Y = 1\n", encoding="utf-8")
+    mod_a = importlib.import_module("tp_mod_a")
+    importlib.import_module("tp_mod_b")
+
+    seen = []
+    r = Reloader(on_reload=lambda m: seen.append(m.__name__))
+    assert r.check() == []
+
+    calls = []
+    real = importer.preprocess_text
+    monkeypatch.setattr(importer, "preprocess_text", lambda s, **kw: calls.append(s) or real(s, **kw))
+
+    bump(a, "if True {\nX = 2\n}\n")
+    assert [m.__name__ for m in r.check()] == ["tp_mod_a"]
+    assert mod_a.X == 2
+    assert seen == ["tp_mod_a"]
+    assert len(calls) == 1
+
+    # touched but same content -> no reprocess
+    bump(a, a.read_text(encoding="utf-8"))
+    assert r.check() == []
+    assert len(calls) == 1
+
+
+def test_reload_error_keeps_module(tp_path: Path):
+    a = tp_path / "tp_mod_a.tp"
+    a.write_text("X = 1\n", encoding="utf-8")
+    mod_a = importlib.import_module("tp_mod_a")
+
+    errors = []
+    r = Reloader(on_error=lambda m, e: errors.append(e))
+    r.check()
+    bump(a, "}\n")
+    assert r.check() == []
+    assert isinstance(errors[0], SyntaxError)
+    assert sys.modules["tp_mod_a"] is mod_a
+    assert mod_a.X == 1
+
+
+def test_traceback_points_at_tp_line(tp_path: Path):
+    (tp_path / "tp_mod_b.tp").write_text(
+        "def f(x) {\n    if x { return 1 }\n}\n\ndef g() {\n    raise ValueError\n}\n",
+        encoding="utf-8",
+    )
+    mod = importlib.import_module("tp_mod_b")
+    with pytest.raises(ValueError) as info:
+        mod.g()
+    assert info.traceback[-1].lineno + 1 == 6
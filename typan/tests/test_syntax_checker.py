@@ -139,3 +139,98 @@ break
     d = diags[0]
     assert d.stage == "python"
     assert d.lineno is not None
+
+
+def test_python_error_points_at_the_tp_source():
+    # transformed: "if x:\n    y = = 1" - the diagnostic is on the .tp text instead
+    code = "if x { y = = 1 }\n"
+    for level in ("parse", "compile"):
+        ok, diags, _ = check_text(code, level=level)
+        assert ok is False
+        assert (diags[0].lineno, diags[0].col) == (1, 12)
+
+
+def test_levels_structure_parse_compile():
+    code = """\
+if x {
+return 1
+}
+"""
+    # 'return' outside function is a compile-time (symtable) error, not a parse error
+    ok, diags, transformed = check_text(code, level="structure")
+    assert ok is True and transformed is None
+    assert check_text(code, level="parse").ok is True
+    res = check_text(code, level="compile")
+    assert res.ok is False and res.code is None
+
+
+def test_structure_level_reports_preprocess_errors():
+    ok, diags, transformed = check_text("if x {\n}\n}\n", level="structure")
+    assert ok is False
+    assert diags[0].stage == "preprocess"
+    assert "Unmatched" in diags[0].message
+    assert "line 3" in diags[0].message
+
+
+def test_parse_level_catches_syntax_errors():
+    assert check_text("def f {\npass\n}\n", level="parse").ok is False
+
+
+def test_compile_level_returns_code_object():
+    res = check_text("if True {\nx = 41 + 1\n}\n")
+    ns: dict = {}
+    exec(res.code, ns)
+    assert ns["x"] == 42
+
+
+def test_unknown_level():
+    with pytest.raises(ValueError):
+        check_text("x = 1\n", level="nope")
+
+
+def test_reports_every_preprocess_error_in_one_run():
+    code = """\
+def f() {
+    if x {
+        y = 1
+}
+def g() {
+    if a { b } else { c }
+}
+}
+def h() {
+    return (
+}
+"""
+    ok, diags, transformed = check_text(code)
+    assert ok is False and transformed is None
+    pre = [d for d in diags if d.stage == "preprocess"]
+    assert [(d.lineno, d.raw_message.split(" ")[0]) for d in pre] == [
+        (2, "Missing"),
+        (6, "Inline"),
+        (8, "Unmatched"),
+        (9, "Missing"),  # the '}' after `return (` is inside the parens
+    ]
+    # plus the first Python error of the recovered output
+    assert diags[-1].stage == "python"
+    assert "line 8, col 1\n}\n^" in pre[2].message
+
+
+def test_unterminated_string_is_located_and_skips_python_stage():
+    ok, diags, _ = check_text("if x {\ns = 'abc\n}\n}\n")
+    assert [d.stage for d in diags] == ["preprocess", "preprocess"]
+    assert (diags[0].lineno, diags[0].col) == (2, 5)
+    assert "Unterminated string" in diags[0].message
+
+
+def test_preprocess_error_renders_lazily_and_pickles():
+    import pickle
+
+    from errors import PreprocessError
+
+    e = PreprocessError("Unmatched '}'", 2, 1)
+    assert str(e) == "Unmatched '}' at line 2, col 1"
+    e.with_source("x = 1\n}\n")
+    assert str(e).endswith("\n}\n^")
+    e2 = pickle.loads(pickle.dumps(e))
+    assert (e2.msg, e2.lineno, e2.offset, str(e2)) == (e.msg, 2, 1, str(e))
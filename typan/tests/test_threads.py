@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import batch
+import emit
+import formatter
+import lex
+import transform
+from batch import make_executor, run_pool
+from benchmarks.corpus import SHAPES, generate
+from check_text import check_text
+from formatter import format_text
+from preprocess import preprocess_text
+from preprocessor import Preprocessor
+
+
+@pytest.fixture
+def fast_switching():
+    # switch threads every few bytecodes so any shared state would get interleaved
+    old = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(old)
+
+
+def test_module_tables_are_immutable():
+    for table in (lex._STRING_PREFIX_CHARS, transform.BLOCK_HEADS, transform._CONTINUATION_HEADS,
+                  emit._COMPOUND_HEADS, formatter.BLOCK_HEADS):
+        assert isinstance(table, frozenset)
+
+
+@pytest.mark.parametrize("fn", [preprocess_text, format_text, lambda s: check_text(s).diagnostics])
+def test_pipeline_is_reentrant(fn, fast_switching):
+    sources = [generate(shape, 2048, seed=i) for i, shape in enumerate(sorted(SHAPES))] * 4
+    sources += ["}\n", "if x {\n", "s = 'abc\n"]
+    expected = []
+    for src in sources:
+        try:
+            expected.append(fn(src))
+        except SyntaxError as e:
+            expected.append(str(e))
+
+    def run(src):
+        try:
+            return fn(src)
+        except SyntaxError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        assert list(ex.map(run, sources)) == expected
+
+
+def test_free_threaded_builds_get_a_thread_pool(monkeypatch):
+    monkeypatch.setattr(batch, "free_threaded", lambda: True)
+    with make_executor(2) as ex:
+        assert type(ex).__name__ == "ThreadPoolExecutor"
+    with make_executor(2, threads=False) as ex:
+        assert type(ex).__name__ == "ProcessPoolExecutor"
+    monkeypatch.setattr(batch, "free_threaded", lambda: False)
+    with make_executor(2) as ex:
+        assert type(ex).__name__ == "ProcessPoolExecutor"
+
+
+def test_run_pool_on_threads(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch, "free_threaded", lambda: True)
+    paths = []
+    for i in range(6):
+        p = tmp_path / f"m{i}.tp"
+        p.write_text(f"if x {{\nprint({i})\n}}\n", encoding="utf-8")
+        paths.append(p)
+
+    def convert(path):  # a closure: would not pickle into a process pool
+        with open(path, encoding="utf-8") as f:
+            return preprocess_text(f.read())
+
+    assert list(run_pool(convert, paths, jobs=3)) == [preprocess_text(p.read_text()) for p in paths]
+
+
+def test_preprocessor_on_threads():
+    docs = [f"if x{i} {{\nprint({i})\n}}\n" for i in range(40)] + ["}\n"]
+    with Preprocessor(threads=True, cache=16) as pre:
+        out = list(pre.preprocess_many(docs, jobs=3, chunksize=5, return_exceptions=True))
+        assert type(pre._executor).__name__ == "ThreadPoolExecutor"
+    assert out[:-1] == [preprocess_text(d) for d in docs[:-1]]
+    assert isinstance(out[-1], SyntaxError)
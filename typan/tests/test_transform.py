@@ -0,0 +1,50 @@
+# tests/test_transform.py
+from __future__ import annotations
+
+import pytest
+
+from lex import lex
+from lines import logical_lines
+from transform import E_OPEN, E_LINE, E_CLOSE, transform, _block_head_end, _literal_brace
+
+
+def events(code: str):
+    return [(kind, payload if kind == E_CLOSE else "".join(t[1] for t in payload).strip())
+            for kind, payload in transform(logical_lines(lex(code)))]
+
+
+def first_brace_is_literal(header: str) -> bool:
+    tokens = list(lex(header))
+    i = next(k for k, tok in enumerate(tokens) if tok[1] == "{")
+    return _literal_brace(tokens, i, _block_head_end(tokens))
+
+
+@pytest.mark.parametrize("header", [
+    "if k in {1, 2}",          # after an expression keyword
+    "if x == {1}",             # after an operator
+    "if {a} <= s",             # right after a head taking an expression
+    'case {"k": 1}',
+    "while not {}",
+])
+def test_brace_in_expression_position_is_a_literal(header):
+    assert first_brace_is_literal(header + " {")
+
+
+@pytest.mark.parametrize("header", [
+    "if x {",
+    "if n == 2 {",             # a digit ends the value
+    "if x is ... {",
+    "for v in f() {",
+    "else {",
+    "def f(a) {",
+])
+def test_brace_after_a_value_opens_the_block(header):
+    assert not first_brace_is_literal(header)
+
+
+def test_literal_braces_in_header_and_nested_in_brackets():
+    assert events("if k in {1, 2} { a = {3} }\n") == [
+        (E_OPEN, "if k in {1, 2}"), (E_LINE, "a = {3}"), (E_CLOSE, (4, "}", 1, 26)),
+    ]
+    assert events("for v in d.get(k, {}) {\nb()\n}\n")[0] == (E_OPEN, "for v in d.get(k, {})")
+    assert events("if f([{}]) { x }\n")[:2] == [(E_OPEN, "if f([{}])"), (E_LINE, "x")]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from cli import main
+from watch import WatchState, diff_snapshots, output_name, rebuild, remove, scan
+
+
+def write(p: Path, s: str):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(s, encoding="utf-8", newline="\n")
+
+
+def test_output_name():
+    assert output_name("a.tp") == "a.py"
+    assert output_name("a.tp.py") == "a.py"
+
+
+def test_scan_and_diff(tmp_path: Path):
+    write(tmp_path / "a.tp", "x = 1\n")
+    write(tmp_path / "sub" / "b.tp.py", "y = 1\n")
+    write(tmp_path / "c.py", "z = 1\n")
+    old = scan(tmp_path)
+    assert sorted(Path(p).name for p in old) == ["a.tp", "b.tp.py"]
+
+    a = str(tmp_path / "a.tp")
+    st = os.stat(a)
+    os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    os.remove(tmp_path / "sub" / "b.tp.py")
+    changed, removed = diff_snapshots(old, scan(tmp_path))
+    assert changed == [a]
+    assert removed == [str(tmp_path / "sub" / "b.tp.py")]
+
+
+def test_rebuild_only_changed_content_and_survives_errors(tmp_path: Path):
+    src = tmp_path / "src"
+    out = tmp_path / "out"
+    write(src / "a.tp", "if x {\nprint(1)\n}\n")
+    write(src / "bad.tp", "}\n")
+    state = WatchState(src=src, out=out)
+    logs: list[str] = []
+
+    rebuilt, failed = rebuild(state, sorted(scan(src)), logs.append)
+    assert (rebuilt, failed) == (1, 1)
+    assert (out / "a.py").read_text(encoding="utf-8") == "if x:\n    print(1)\n"
+    assert any("Unmatched" in m for m in logs)
+
+    # same content -> skipped by hash
+    assert rebuild(state, [str(src / "a.tp")], logs.append) == (0, 0)
+
+    # not UTF-8: reported and counted, the watcher keeps going
+    (src / "latin.tp").write_bytes(b"s = '\xe9'\n")
+    assert rebuild(state, [str(src / "latin.tp"), str(src / "a.tp")], logs.append) == (0, 1)
+    assert any("not valid UTF-8" in m for m in logs)
+
+
+def test_removed_source_deletes_its_output(tmp_path: Path):
+    src = tmp_path / "src"
+    out = tmp_path / "out"
+    write(src / "a.tp", "x = 1\n")
+    write(out / "old.py", "stale\n")
+    state = WatchState(src=src, out=out)
+    logs: list[str] = []
+    rebuild(state, [str(src / "a.tp")], logs.append)
+    assert (out / "a.py").exists()
+
+    (src / "a.tp").unlink()
+    remove(state, [str(src / "a.tp"), str(src / "old.tp")], logs.append)
+    assert not (out / "a.py").exists()
+    assert (out / "old.py").exists()  # not ours: only reported
+    assert any("stale output left" in m and "old.py" in m for m in logs)
+
+
+def test_cli_watch_once(tmp_path: Path):
+    write(tmp_path / "a.tp", "if x {\n}\n")
+    assert main(["watch", str(tmp_path), "-o", str(tmp_path / "out"), "--once"]) == 0
+    assert (tmp_path / "out" / "a.py").read_text(encoding="utf-8") == "if x:\n    pass\n"